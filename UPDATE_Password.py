@@ -98,7 +98,7 @@ def update_admin_credentials():
             print(f"   ADMIN_USERNAME = '{new_username}'")
             print(f"   ADMIN_EMAIL = '{new_email or admin.email}'")
             print("3. Keep the new password secure")
-            print("4. Restart the application if it's running")
+            print("4. Running workers pick up the change immediately (no restart needed)")
             print("=" * 60)
             
     except Exception as e:
@@ -1,25 +1,32 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_migrate import Migrate
 from config import Config
 from datetime import datetime
 
 # Initialize extensions
 db = SQLAlchemy()
 login_manager = LoginManager()
+migrate = Migrate()
 
 def create_app(config_class=Config):
     """
     Application factory function to create and configure the Flask app
     """
     # Create Flask app instance
-    app = Flask(__name__)
+    # Static files live next to the templates
+    app = Flask(__name__, static_folder='templates/static')
     
     # Load configuration
     app.config.from_object(config_class)
     
     # Initialize extensions with app
+    from app.database import configure_database, init_database
+    configure_database(app)
     db.init_app(app)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
     login_manager.init_app(app)
     
     # Configure login manager
@@ -32,50 +39,46 @@ def create_app(config_class=Config):
     app.register_blueprint(main_bp)
     app.register_blueprint(admin_bp, url_prefix='/admin')
     
-    # Context processors - ADD THEM HERE
+    # CLI commands
+    from app.customers import customers_cli
+    from app.jobs import jobs_cli
+    from app.ledger import ledger_cli
+    from app.rollup import rollup_cli
+    from app.search import search_cli, init_search
+    from app.tracking import init_tracking
+    from app.perf import init_perf
+    from app.auth import init_auth
+    from app.analytics import init_analytics
+    from app.schema import ensure_schema
+    from app.assets import init_assets
+    from app.conditional import init_conditional
+    from app.notifications import init_notifications
+    from app.templating import init_templating
+    app.cli.add_command(customers_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(search_cli)
+    
+    # Context processor: holds no state of its own, so it is safe under
+    # threads and greenlets alike. Flask already exposes `config` to templates.
     @app.context_processor
     def inject_now():
         """Inject current datetime into all templates"""
         return {'now': datetime.utcnow()}
     
-    @app.context_processor
-    def inject_config():
-        """Inject config into all templates"""
-        return {'config': app.config}
-    
-    
-    
-    # Create database tables
+    # Check the schema version (migrating if allowed) instead of create_all
     with app.app_context():
-        db.create_all()
-
-        # Add context processors using lambda functions
-    @app.context_processor
-    def inject_variables():
-        from datetime import datetime
-        return {
-            'now': datetime.utcnow(),
-            'config': app.config
-        }
-    
-
-        # Create default admin user if not exists
-        if app.config.get('CREATE_DEFAULT_ADMIN', False):
-           from app.models import Admin
-           from werkzeug.security import generate_password_hash
-        
-        admin = Admin.query.filter_by(username='admin').first()
-        if not admin:
-            default_admin = Admin(
-                username=app.config['ADMIN_USERNAME'],
-                email=app.config['ADMIN_EMAIL'],
-                password_hash=generate_password_hash(app.config['ADMIN_PASSWORD'])
-            )
-            db.session.add(default_admin)
-            db.session.commit()
-            print("✓ Default admin user created!")
-            print(f"  Username: {app.config['ADMIN_USERNAME']}")
-            print(f"  Password: {app.config['ADMIN_PASSWORD']}")
-            print("  ⚠️  Change this password after first login!")
+        init_database(app)
+        if ensure_schema(app):
+            init_search(app)
+        init_tracking(app)
+        init_perf(app)
+        init_auth(app)
+        init_assets(app)
+        init_templating(app)
+        init_conditional(app)
+        init_notifications(app)
+        init_analytics(app)
     
     return app
\ No newline at end of file
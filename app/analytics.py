@@ -0,0 +1,143 @@
+from datetime import datetime, time
+from flask import current_app
+from sqlalchemy import func, select
+from app import db
+from app.cache import TTLCache
+from app.history import hours_between
+from app.models import Repair
+
+# Percentiles reported for turnaround (completed_at - created_at)
+PERCENTILES = (('p50', 0.50), ('p90', 0.90), ('p99', 0.99))
+GROUPINGS = ('device_type', 'brand', 'month')
+
+# Databases with percentile_cont() ... WITHIN GROUP; others use a single
+# pass in Python over rows the database has sorted
+SQL_PERCENTILE_DIALECTS = ('postgresql',)
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+def _group_key(group_by):
+    if group_by == 'month':
+        if _dialect() == 'postgresql':
+            return func.to_char(Repair.completed_at, 'YYYY-MM')
+        return func.strftime('%Y-%m', Repair.completed_at)
+    if group_by in ('device_type', 'brand'):
+        return getattr(Repair, group_by)
+    raise ValueError(f'Unknown grouping: {group_by}')
+
+def _completed_between(query, start, end, device_type):
+    """Repairs completed in [start, end); a plain completed_at range for its index"""
+    query = query.where(
+        Repair.completed_at >= datetime.combine(start, time.min),
+        Repair.completed_at < datetime.combine(end, time.min),
+        Repair.created_at.isnot(None)
+    )
+    if device_type:
+        query = query.where(Repair.device_type == device_type)
+    return query
+
+def interpolated(values, fraction):
+    """percentile_cont() over already sorted values: linear between closest ranks"""
+    position = fraction * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def _summary(key, count, mean, percentiles):
+    row = {'key': key, 'count': count, 'mean_hours': round(mean, 1)}
+    for (name, _), value in zip(PERCENTILES, percentiles):
+        row[f'{name}_hours'] = round(value, 1)
+    return row
+
+def _sql_percentiles(key, hours, start, end, device_type):
+    keys = [key] if key is not None else []
+    query = select(*keys, func.count(), func.avg(hours), *[
+        func.percentile_cont(fraction).within_group(hours) for _, fraction in PERCENTILES
+    ])
+    if keys:
+        query = query.group_by(key).order_by(key)
+    query = _completed_between(query, start, end, device_type)
+
+    results = []
+    for row in db.session.execute(query):
+        group, (count, mean, *percentiles) = (row[0], row[1:]) if keys else ('all', row)
+        if count:
+            results.append(_summary(group, count, float(mean), [float(value) for value in percentiles]))
+    return results
+
+def _single_pass_percentiles(key, hours, start, end, device_type):
+    """
+    Pure-Python fallback (a per-row loop, not vectorized): one pass over
+    turnaround values the database has already sorted by (group, hours).
+    Each group's percentiles are read off by rank when the group ends, so
+    nothing is re-sorted and only one group is held at a time.
+    """
+    keys = [key] if key is not None else []
+    query = select(*keys, hours).order_by(*keys, hours)
+    query = _completed_between(query, start, end, device_type)
+
+    results, current, values = [], None, []
+
+    def close():
+        if values:
+            results.append(_summary(current, len(values), sum(values) / len(values),
+                                    [interpolated(values, fraction) for _, fraction in PERCENTILES]))
+
+    for row in db.session.execute(query.execution_options(yield_per=5000)):
+        group, value = (row[0], row[1]) if keys else ('all', row[0])
+        if group != current:
+            close()
+            current, values = group, []
+        values.append(max(float(value), 0.0))
+    close()
+    return results
+
+def turnaround_percentiles(start, end, group_by='device_type', device_type=None):
+    """
+    Turnaround hours of repairs completed in [start, end), per device type,
+    brand or completion month (group_by=None for one overall row keyed 'all'):
+    [{key, count, mean_hours, p50_hours, p90_hours, p99_hours}]
+    """
+    key = _group_key(group_by) if group_by else None
+    hours = hours_between(Repair.created_at, Repair.completed_at)
+    if _dialect() in SQL_PERCENTILE_DIALECTS:
+        return _sql_percentiles(key, hours, start, end, device_type)
+    return _single_pass_percentiles(key, hours, start, end, device_type)
+
+def turnaround_report(start, end, device_type=None):
+    """
+    Overall and per-grouping turnaround for a period, cached per period.
+    Periods that ended before today keep for ANALYTICS_CACHE_TTL_CLOSED;
+    one still running is recomputed after ANALYTICS_CACHE_TTL.
+    """
+    cache = current_app.extensions.get('analytics_cache')
+    cache_key = (start, end, device_type)
+    report = cache.get(cache_key) if cache is not None else None
+    if report is not None:
+        return report
+
+    overall = turnaround_percentiles(start, end, None, device_type)
+    report = {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'overall': overall[0] if overall else None,
+        'computed_at': datetime.utcnow().isoformat(timespec='seconds')
+    }
+    for group_by in GROUPINGS:
+        report[group_by] = turnaround_percentiles(start, end, group_by, device_type)
+
+    if cache is not None:
+        # Stored timestamps are UTC, so the period closes at UTC midnight
+        closed = end <= datetime.utcnow().date()
+        config = current_app.config
+        cache.set(cache_key, report, ttl=config.get('ANALYTICS_CACHE_TTL_CLOSED', 86400) if closed
+                  else config.get('ANALYTICS_CACHE_TTL', 300))
+    return report
+
+def init_analytics(app):
+    """Per-worker cache of turnaround reports, keyed by period"""
+    app.extensions['analytics_cache'] = TTLCache(
+        maxsize=app.config.get('ANALYTICS_CACHE_SIZE', 64),
+        ttl=app.config.get('ANALYTICS_CACHE_TTL', 300)
+    )
@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fingerprinted copies and the manifest live here, inside the static folder
+BUILD_DIR = 'build'
+MANIFEST_FILE = 'manifest.json'
+# Text assets get .gz/.br siblings; images and fonts are already compressed
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+# A hashed file never changes, so browsers may keep it for a year without asking
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def fingerprint(path, length=12):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+def _write_compressed(path, data):
+    """Write .gz (and .br if brotli is installed) next to path when it saves bytes"""
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+
+def build_assets(static_dir, echo=print):
+    """
+    Copy every static file to build/ under a content-hashed name, pre-compress
+    the text ones and write build/manifest.json (original path -> hashed path).
+    Returns the manifest.
+    """
+    build_dir = os.path.join(static_dir, BUILD_DIR)
+    shutil.rmtree(build_dir, ignore_errors=True)
+    manifest = {}
+
+    for root, dirs, files in os.walk(static_dir):
+        if root == static_dir and BUILD_DIR in dirs:
+            dirs.remove(BUILD_DIR)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            stem, ext = os.path.splitext(logical)
+            hashed = f"{BUILD_DIR}/{stem}.{fingerprint(source)}{ext}"
+
+            target = os.path.join(static_dir, *hashed.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+            if ext.lower() in COMPRESSIBLE:
+                with open(source, 'rb') as f:
+                    _write_compressed(target, f.read())
+
+            manifest[logical] = hashed
+            echo(f"  {logical} -> {hashed}")
+
+    with open(os.path.join(build_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    if brotli is None:
+        echo("  brotli not installed - wrote gzip variants only")
+    return manifest
+
+class AssetManifest:
+    """Fingerprinted asset names for one static folder (empty if not built)"""
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        path = os.path.join(static_dir, BUILD_DIR, MANIFEST_FILE)
+        try:
+            with open(path) as f:
+                self.files = json.load(f)
+        except (OSError, ValueError):
+            self.files = {}
+        self.hashed = set(self.files.values())
+
+    def resolve(self, filename):
+        return self.files.get(filename, filename)
+
+def asset_url(endpoint, **values):
+    """url_for() that points static files at their fingerprinted copies"""
+    if endpoint == 'static' and 'filename' in values:
+        assets = current_app.extensions.get('assets')
+        if assets is not None:
+            values['filename'] = assets.resolve(values['filename'])
+    return url_for(endpoint, **values)
+
+def serve_static(filename):
+    """
+    Static view: fingerprinted files are sent pre-compressed when the client
+    accepts it, with an immutable year-long Cache-Control. Anything else
+    goes through Flask's normal static handling.
+    """
+    assets = current_app.extensions.get('assets')
+    if assets is None or filename not in assets.hashed:
+        return current_app.send_static_file(filename)
+
+    encoding, suffix = None, ''
+    for name, extension in ENCODINGS:
+        if request.accept_encodings[name] and os.path.exists(
+                os.path.join(assets.static_dir, filename + extension)):
+            encoding, suffix = name, extension
+            break
+
+    response = send_from_directory(
+        assets.static_dir, filename + suffix,
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        max_age=31536000
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    return response
+
+def init_assets(app):
+    """Load the asset manifest and serve static files through serve_static"""
+    app.extensions['assets'] = AssetManifest(app.static_folder)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.view_functions['static'] = serve_static
@@ -0,0 +1,117 @@
+import os
+import tempfile
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.cache import TTLCache, read_stamp, touch_stamp
+from app.models import Admin
+
+# Admin columns copied into the cached identity (never the password hash)
+IDENTITY_FIELDS = ('id', 'username', 'email', 'created_at')
+# Changes to these flush every worker's cache
+CREDENTIAL_FIELDS = ('username', 'password_hash', 'email')
+
+class CachedAdmin(UserMixin):
+    """
+    Detached, read-only copy of an Admin used as current_user.
+    Use Admin.query for anything that needs to write.
+    """
+    __slots__ = IDENTITY_FIELDS
+
+    def __init__(self, admin):
+        for field in IDENTITY_FIELDS:
+            object.__setattr__(self, field, getattr(admin, field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CachedAdmin is read-only; load Admin to make changes')
+
+    def __repr__(self):
+        return f'<Admin {self.username} (cached)>'
+
+class AdminIdentityCache:
+    """
+    TTL cache of admin identities for the Flask-Login user loader.
+    Other processes (other workers, UPDATE_Password.py) signal credential
+    changes by touching a stamp file; a changed mtime flushes the cache.
+    """
+
+    def __init__(self, ttl=30, stamp_file=None):
+        self.cache = TTLCache(maxsize=256, ttl=ttl)
+        self.stamp_file = stamp_file
+        self._stamp = self._read_stamp()
+
+    def _read_stamp(self):
+        return read_stamp(self.stamp_file)
+
+    def get(self, user_id):
+        stamp = self._read_stamp()
+        if stamp != self._stamp:
+            self.cache.clear()
+            self._stamp = stamp
+        return self.cache.get_or_load(user_id, lambda: self._load(user_id))
+
+    def _load(self, user_id):
+        admin = db.session.get(Admin, user_id)
+        return CachedAdmin(admin) if admin else None
+
+    def invalidate(self, user_id=None):
+        """Drop one identity (or all) here and signal other processes"""
+        if user_id is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate(user_id)
+        touch_stamp(self.stamp_file)
+        self._stamp = self._read_stamp()
+
+def default_stamp_file():
+    return os.path.join(tempfile.gettempdir(), 'mafadza_admin_identity.stamp')
+
+def load_admin(user_id):
+    """Flask-Login user loader body: cached identity or None"""
+    cache = current_app.extensions.get('admin_cache')
+    if cache is None:
+        return db.session.get(Admin, user_id)
+    return cache.get(user_id)
+
+@event.listens_for(Admin, 'after_update')
+def _remember_credential_change(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in CREDENTIAL_FIELDS):
+        session = state.session
+        if session is not None:
+            session.info.setdefault('changed_admin_ids', set()).add(target.id)
+
+@event.listens_for(Admin, 'after_delete')
+def _remember_admin_delete(mapper, connection, target):
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault('changed_admin_ids', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_admins(session):
+    changed = session.info.pop('changed_admin_ids', None)
+    if not changed:
+        return
+    try:
+        cache = current_app.extensions.get('admin_cache')
+    except RuntimeError:
+        cache = None
+    if cache is not None:
+        for admin_id in changed:
+            cache.invalidate(admin_id)
+    else:
+        # Outside the app (e.g. a script): still tell running workers
+        touch_stamp(default_stamp_file())
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_credential_changes(session):
+    session.info.pop('changed_admin_ids', None)
+
+def init_auth(app):
+    """Attach the admin identity cache to the app"""
+    app.extensions['admin_cache'] = AdminIdentityCache(
+        ttl=app.config.get('ADMIN_CACHE_TTL', 30),
+        stamp_file=app.config.get('ADMIN_CACHE_STAMP_FILE') or default_stamp_file()
+    )
@@ -0,0 +1,106 @@
+import math
+from app import db
+from app.models import Customer, Repair, Payment
+from app.rollup import record_new_repairs
+from app.utils import generate_tracking_id, normalize_phone
+
+REQUIRED_FIELDS = ('name', 'phone', 'device_type', 'brand', 'model', 'problem')
+
+def parse_booking(data):
+    """
+    Validate one booking (form or JSON fields) and return a clean dict.
+    Raises ValueError with a user-facing message.
+    """
+    data = {key: (value.strip() if isinstance(value, str) else value) for key, value in data.items()}
+
+    missing = [field for field in REQUIRED_FIELDS if not data.get(field)]
+    if missing:
+        raise ValueError(f"Please fill in all required fields ({', '.join(missing)})")
+
+    phone_normalized = normalize_phone(data['phone'])
+    if phone_normalized is None:
+        raise ValueError('Please enter a valid phone number')
+
+    try:
+        deposit = float(data.get('deposit') or 0.0)
+    except (TypeError, ValueError):
+        raise ValueError('Deposit must be a number')
+    if not math.isfinite(deposit):
+        raise ValueError('Deposit must be a number')
+    if deposit < 0:
+        raise ValueError('Deposit cannot be negative')
+
+    return {
+        'name': data['name'],
+        'phone': data['phone'],
+        'phone_normalized': phone_normalized,
+        'email': data.get('email'),
+        'address': data.get('address', ''),
+        'device_type': data['device_type'],
+        'brand': data['brand'],
+        'model': data['model'],
+        'serial_number': data.get('serial_number', ''),
+        'problem': data['problem'],
+        'deposit': deposit,
+        'payment_method': data.get('payment_method') or 'Cash',
+        'payment_reference': data.get('payment_reference', '')
+    }
+
+def create_bookings(bookings):
+    """
+    Add customers, repairs and deposit payments for parsed bookings to the
+    session as one unit of work: one customer lookup, one flush, and no
+    commit, so the caller decides the transaction boundary.
+    Returns the new repairs in input order.
+    """
+    # Tracking IDs are reserved in their own short transaction, so take them
+    # before this session starts writing
+    tracking_ids = [generate_tracking_id() for _ in bookings]
+
+    # Returning customers are matched on the normalized (indexed) phone
+    phones = {booking['phone_normalized'] for booking in bookings}
+    customers = {
+        customer.phone_normalized: customer
+        for customer in Customer.query.filter(Customer.phone_normalized.in_(phones))
+    }
+
+    repairs = []
+    for booking, tracking_id in zip(bookings, tracking_ids):
+        customer = customers.get(booking['phone_normalized'])
+        if customer is None:
+            customer = Customer(
+                name=booking['name'],
+                phone=booking['phone'],
+                email=booking['email'],
+                address=booking['address']
+            )
+            customers[booking['phone_normalized']] = customer
+            db.session.add(customer)
+
+        repair = Repair(
+            tracking_id=tracking_id,
+            customer=customer,
+            device_type=booking['device_type'],
+            brand=booking['brand'],
+            model=booking['model'],
+            serial_number=booking['serial_number'],
+            problem_description=booking['problem'],
+            status='Received'
+        )
+        db.session.add(repair)
+
+        # If deposit was paid, create payment record
+        if booking['deposit'] > 0:
+            db.session.add(Payment(
+                repair=repair,
+                amount=booking['deposit'],
+                payment_method=booking['payment_method'],
+                reference=booking['payment_reference'],
+                notes='Initial deposit'
+            ))
+
+        repairs.append(repair)
+
+    db.session.flush()
+    record_new_repairs(repairs)
+    return repairs
@@ -0,0 +1,75 @@
+import hashlib
+import os
+from datetime import timezone
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+# Revalidate on every use; pages differ per login, so never shared caches
+CACHE_CONTROL = 'private, no-cache'
+
+def etag_for(*parts):
+    """Strong ETag over the given values"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def page_etag(*parts):
+    """
+    ETag for a rendered page: the data it shows plus everything else the
+    HTML depends on (templates and assets as deployed, login state, and
+    pending flash messages, which only show up in a fresh render)
+    """
+    return etag_for(current_app.extensions.get('page_version'),
+                    current_user.is_authenticated, session.get('_flashes'), *parts)
+
+def _http_time(value):
+    """HTTP dates are UTC with whole seconds; updated_at is naive UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def is_fresh(etag, last_modified=None):
+    """
+    True when a GET/HEAD request's validators match, so a 304 can be sent
+    without rendering. If-None-Match wins over If-Modified-Since.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # A date can't tell that flash messages are waiting (page ETags can)
+        if session.get('_flashes'):
+            return False
+        return request.if_modified_since >= _http_time(last_modified)
+    return False
+
+def with_validators(response, etag, last_modified=None):
+    """Attach ETag, Last-Modified and revalidation headers to a response"""
+    response = make_response(response)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_time(last_modified)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.vary.add('Cookie')
+    return response
+
+def not_modified(etag, last_modified=None):
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+def _page_version(app):
+    """Digest of the deployed templates and asset manifest"""
+    digest = hashlib.sha1()
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    for root, dirs, files in os.walk(template_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.html'):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    assets = app.extensions.get('assets')
+    if assets is not None:
+        digest.update(repr(sorted(assets.files.items())).encode())
+    return digest.hexdigest()[:16]
+
+def init_conditional(app):
+    """Compute the page version that salts page ETags (after init_assets)"""
+    app.extensions['page_version'] = _page_version(app)
@@ -0,0 +1,91 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, func, select
+from app import db
+from app.models import Customer, Repair
+from app.schema import SchemaOutOfDate, check_schema
+from app.search import rebuild_index
+from app.utils import normalize_phone
+
+customers_cli = AppGroup('customers', help='Customer data maintenance.')
+
+customer_table = Customer.__table__
+repair_table = Repair.__table__
+
+def merge_duplicate_customers(connection):
+    """
+    Normalize every customer's phone, merge customers that share a normalized
+    number into the oldest one and re-point their repairs. Rows whose key is
+    missing (NULL) or out of date are filled in too. Runs in the caller's
+    transaction on `connection`, so migrations can use it as well.
+    Returns (customers_merged, repairs_moved).
+    """
+    keepers = {}
+    changed = []
+    merged = moved = 0
+    rows = connection.execute(
+        select(customer_table.c.id, customer_table.c.phone, customer_table.c.phone_normalized,
+               customer_table.c.email, customer_table.c.address)
+        .order_by(customer_table.c.id)
+    ).all()
+
+    for row in rows:
+        key = normalize_phone(row.phone)
+        if key is None:
+            continue
+        keeper_id = keepers.get(key)
+        if keeper_id is None:
+            keepers[key] = row.id
+            if row.phone_normalized != key:
+                changed.append({'b_id': row.id, 'b_key': key})
+            continue
+
+        moved += connection.execute(
+            repair_table.update().where(repair_table.c.customer_id == row.id)
+            .values(customer_id=keeper_id)
+        ).rowcount
+        connection.execute(customer_table.update().where(customer_table.c.id == keeper_id).values(
+            email=func.coalesce(customer_table.c.email, row.email),
+            address=func.coalesce(customer_table.c.address, row.address)
+        ))
+        # Deleted before any keeper claims its unique normalized value
+        connection.execute(customer_table.delete().where(customer_table.c.id == row.id))
+        merged += 1
+
+    if changed:
+        # Clear first: a key can move from one surviving row to another
+        connection.execute(
+            customer_table.update().where(customer_table.c.id == bindparam('b_id'))
+            .values(phone_normalized=None),
+            changed
+        )
+        connection.execute(
+            customer_table.update().where(customer_table.c.id == bindparam('b_id'))
+            .values(phone_normalized=bindparam('b_key')),
+            changed
+        )
+    return merged, moved
+
+@customers_cli.command('dedupe')
+@click.option('--dry-run', is_flag=True, help='Report what would be merged without saving.')
+def dedupe_command(dry_run):
+    """Normalize phone numbers and merge duplicate customers"""
+    try:
+        check_schema()
+    except SchemaOutOfDate as e:
+        raise click.ClickException(f"{e}. Run `flask db upgrade` first.")
+
+    with db.engine.connect() as connection:
+        transaction = connection.begin()
+        merged, moved = merge_duplicate_customers(connection)
+        if dry_run:
+            transaction.rollback()
+        else:
+            transaction.commit()
+
+    if not dry_run and merged:
+        # Repairs changed hands outside the ORM's search index hooks
+        rebuild_index()
+
+    prefix = 'Would merge' if dry_run else '✓ Merged'
+    click.echo(f"{prefix} {merged} duplicate customer(s), re-pointing {moved} repair(s)")
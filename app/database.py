@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from app import db
+
+# One writer at a time per process on SQLite; other processes wait on busy_timeout
+_write_lock = threading.RLock()
+
+def is_sqlite(uri):
+    return uri.startswith('sqlite')
+
+def is_memory_sqlite(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+def running_under_gevent():
+    """True inside a gevent worker (the socket module has been patched)"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+def worker_concurrency(config):
+    """Requests one worker can have in flight at once"""
+    if config.get('WEB_WORKER_CLASS') == 'gevent':
+        return config.get('WEB_CONNECTIONS', 50)
+    return config.get('WEB_THREADS', 1)
+
+def engine_options(config):
+    """
+    Default SQLALCHEMY_ENGINE_OPTIONS sized for one worker's concurrency.
+    Greenlets beyond DB_POOL_MAX wait for a pooled connection.
+    Anything set explicitly in SQLALCHEMY_ENGINE_OPTIONS wins.
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    pool_size = config.get('DB_POOL_SIZE') or min(worker_concurrency(config),
+                                                  config.get('DB_POOL_MAX', 10))
+    options = {}
+
+    if is_sqlite(uri):
+        if not is_memory_sqlite(uri):
+            options.update(
+                pool_size=pool_size,
+                max_overflow=2,
+                pool_timeout=10,
+                # Threads share the pool; pysqlite's own busy wait matches busy_timeout
+                connect_args={
+                    'check_same_thread': False,
+                    'timeout': config['SQLITE_PRAGMAS'].get('busy_timeout', 5000) / 1000
+                }
+            )
+    else:
+        options.update(
+            pool_size=pool_size,
+            max_overflow=config.get('DB_MAX_OVERFLOW', 2),
+            pool_pre_ping=True,
+            pool_recycle=1800
+        )
+
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return on_connect
+
+def _gevent_wait(connection, timeout=None):
+    """psycopg2 wait callback that yields to other greenlets on socket I/O"""
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            return
+        if state == extensions.POLL_READ:
+            wait_read(connection.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(connection.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f'Bad result from poll: {state}')
+
+def make_psycopg_green():
+    """
+    Let psycopg2 queries wait cooperatively under gevent; without this every
+    query blocks the whole worker. Returns False if psycopg2 isn't installed.
+    """
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return False
+    extensions.set_wait_callback(_gevent_wait)
+    return True
+
+def configure_database(app):
+    """Call before db.init_app: fill in engine options for this worker"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+def init_database(app):
+    """Inside an app context: apply the tuned SQLite pragmas on every connection"""
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if is_sqlite(uri) and app.config.get('SQLITE_TUNED', True):
+        event.listen(db.engine, 'connect', _apply_pragmas(app.config['SQLITE_PRAGMAS']))
+        # Connections opened before the listener existed
+        db.engine.dispose()
+    if running_under_gevent():
+        if is_sqlite(uri):
+            app.logger.warning('SQLite queries block the whole gevent worker; '
+                               'use gthread workers with SQLite')
+        else:
+            make_psycopg_green()
+
+def _is_locked(error):
+    message = str(error.orig if getattr(error, 'orig', None) is not None else error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+def write_transaction(work):
+    """
+    Run `work()` (which stages changes on db.session) and commit it.
+    On SQLite the write is serialized within the process, and a "database is
+    locked" failure is rolled back and retried with jittered backoff, so
+    `work` must be safe to run again from scratch.
+    """
+    serialize = is_sqlite(current_app.config['SQLALCHEMY_DATABASE_URI'])
+    retries = current_app.config.get('DB_WRITE_RETRIES', 5)
+
+    for attempt in range(retries + 1):
+        try:
+            if serialize:
+                with _write_lock:
+                    result = work()
+                    db.session.commit()
+            else:
+                result = work()
+                db.session.commit()
+            return result
+        except OperationalError as e:
+            db.session.rollback()
+            if not _is_locked(e) or attempt == retries:
+                raise
+        time.sleep(min(0.05 * 2 ** attempt, 1.0) * (0.5 + random.random()))
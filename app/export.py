@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from app import db
+from app.models import Customer, Payment, Repair
+
+# Rows fetched per round trip and written per yielded chunk
+CHUNK_SIZE = 1000
+
+REPAIR_COLUMNS = (
+    ('tracking_id', Repair.tracking_id),
+    ('created_at', Repair.created_at),
+    ('status', Repair.status),
+    ('device_type', Repair.device_type),
+    ('brand', Repair.brand),
+    ('model', Repair.model),
+    ('serial_number', Repair.serial_number),
+    ('problem_description', Repair.problem_description),
+    ('customer_name', Customer.name),
+    ('customer_phone', Customer.phone),
+    ('customer_email', Customer.email),
+    ('estimated_cost', Repair.estimated_cost),
+    ('actual_cost', Repair.actual_cost),
+    ('deposit_paid', Repair.deposit_paid),
+    ('is_paid', Repair.is_paid),
+    ('total_paid', Repair.total_paid),
+    ('balance_due', Repair.balance_due),
+    ('updated_at', Repair.updated_at),
+    ('completed_at', Repair.completed_at),
+)
+
+PAYMENT_COLUMNS = (
+    ('payment_id', Payment.id),
+    ('created_at', Payment.created_at),
+    ('tracking_id', Repair.tracking_id),
+    ('customer_name', Customer.name),
+    ('amount', Payment.amount),
+    ('payment_method', Payment.payment_method),
+    ('reference', Payment.reference),
+    ('notes', Payment.notes),
+    ('voided_at', Payment.voided_at),
+)
+
+def repair_rows(filters=None):
+    """Plain column tuples for repairs (no ORM objects), fetched in chunks"""
+    query = db.session.query(*[column for _, column in REPAIR_COLUMNS]) \
+        .outerjoin(Customer, Customer.id == Repair.customer_id)
+    if filters:
+        query = query.filter(*filters)
+    return query.order_by(Repair.id).execution_options(yield_per=CHUNK_SIZE)
+
+def payment_rows(start=None, end=None):
+    """Plain column tuples for payments in [start, end), fetched in chunks"""
+    query = db.session.query(*[column for _, column in PAYMENT_COLUMNS]) \
+        .join(Repair, Repair.id == Payment.repair_id) \
+        .outerjoin(Customer, Customer.id == Repair.customer_id)
+    if start:
+        query = query.filter(Payment.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        query = query.filter(Payment.created_at < datetime.combine(end, datetime.min.time()))
+    return query.order_by(Payment.id).execution_options(yield_per=CHUNK_SIZE)
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _csv_chunks(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_value(value) for value in row])
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+def _jsonl_chunks(header, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(header, (_value(value) for value in row)))))
+        if len(lines) >= CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def _gzip(chunks):
+    """
+    Gzip stream that emits every chunk as it comes: a sync flush per chunk
+    ends on a byte boundary, so the client can decompress what it has so far
+    instead of waiting for zlib's internal buffer to fill
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def stream_export(columns, rows, fmt='csv', compress=False):
+    """
+    Generator of encoded chunks for a CSV or JSONL export, optionally gzipped.
+    Memory use is bounded by CHUNK_SIZE rows regardless of table size.
+    """
+    header = [name for name, _ in columns]
+    chunks = _jsonl_chunks(header, rows) if fmt == 'jsonl' else _csv_chunks(header, rows)
+    encoded = (chunk.encode('utf-8') for chunk in chunks)
+    return _gzip(encoded) if compress else encoded
@@ -0,0 +1,145 @@
+from datetime import datetime
+from sqlalchemy import case, event, func, insert, inspect, literal, literal_column, select
+from sqlalchemy.orm import Session
+from sqlalchemy.types import DateTime
+from app import db
+from app.models import Repair, RepairStatusEvent
+
+events = RepairStatusEvent.__table__
+
+# Statuses a repair doesn't leave in the normal course of things: an open
+# interval in one of these is finished work, not time spent waiting
+TERMINAL_STATUSES = ('Completed', 'Ready for Pickup')
+
+def _record(session, target, at):
+    session.info.setdefault('status_events', []).append({
+        'repair_id': target.id,
+        'status': target.status or 'Received',
+        'at': at,
+        'changed_by': target.updated_by
+    })
+
+@event.listens_for(Repair, 'after_insert')
+def _repair_opened(mapper, connection, target):
+    session = inspect(target).session
+    if session is not None:
+        _record(session, target, target.created_at or datetime.utcnow())
+
+@event.listens_for(Repair, 'after_update')
+def _repair_status_changed(mapper, connection, target):
+    session = inspect(target).session
+    if session is not None and inspect(target).attrs.status.history.has_changes():
+        _record(session, target, target.updated_at or datetime.utcnow())
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _write_status_events(session, flush_context):
+    """One multi-row insert per flush, in the transaction that changed the repairs"""
+    rows = session.info.pop('status_events', None)
+    if rows:
+        session.connection().execute(insert(events), rows)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_status_events(session):
+    session.info.pop('status_events', None)
+
+def hours_between(start, end):
+    """end - start in hours, in the database's own date arithmetic"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return func.extract('epoch', end - start) / 3600.0
+    if dialect in ('mysql', 'mariadb'):
+        return func.timestampdiff(literal_column('SECOND'), start, end) / 3600.0
+    return (func.julianday(end) - func.julianday(start)) * 24.0
+
+def status_intervals(repair_id=None):
+    """
+    One row per stay in a status: (repair_id, status, entered_at, left_at),
+    left_at from LEAD() over the repair's events (NULL while still there)
+    """
+    left_at = func.lead(events.c.at, type_=DateTime).over(
+        partition_by=events.c.repair_id, order_by=(events.c.at, events.c.id)
+    )
+    query = select(events.c.repair_id, events.c.status, events.c.changed_by,
+                   events.c.at.label('entered_at'), left_at.label('left_at'))
+    if repair_id is not None:
+        query = query.where(events.c.repair_id == repair_id)
+    return query.subquery('intervals')
+
+def _stay_hours(intervals, now):
+    """Hours spent in the status: closed stays, and open ones still in progress"""
+    return case(
+        (intervals.c.left_at.isnot(None), hours_between(intervals.c.entered_at, intervals.c.left_at)),
+        (intervals.c.status.in_(TERMINAL_STATUSES), None),
+        else_=hours_between(intervals.c.entered_at, literal(now, DateTime))
+    )
+
+def time_in_status(start=None, end=None, device_type=None, now=None):
+    """
+    Per status, over stays that began in [start, end): how many, how many are
+    still open, and average/longest/total hours. Slowest (by average) first.
+    """
+    now = now or datetime.utcnow()
+    intervals = status_intervals()
+    hours = _stay_hours(intervals, now)
+
+    query = select(
+        intervals.c.status,
+        func.count().label('stays'),
+        func.count(case((intervals.c.left_at.is_(None), 1))).label('open'),
+        func.avg(hours).label('avg_hours'),
+        func.max(hours).label('max_hours'),
+        func.sum(hours).label('total_hours')
+    ).group_by(intervals.c.status)
+
+    if start:
+        query = query.where(intervals.c.entered_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        query = query.where(intervals.c.entered_at < datetime.combine(end, datetime.min.time()))
+    if device_type:
+        query = query.join(Repair, Repair.id == intervals.c.repair_id) \
+            .where(Repair.device_type == device_type)
+
+    rows = db.session.execute(query).all()
+    return sorted((_rounded(row._asdict()) for row in rows),
+                  key=lambda row: row['avg_hours'] or 0.0, reverse=True)
+
+def bottlenecks(now=None, limit=None):
+    """
+    Where open repairs are sitting right now: per non-terminal status, the
+    repairs currently in it and how long they have waited so far. Largest
+    total wait first.
+    """
+    now = now or datetime.utcnow()
+    latest = select(
+        events.c.repair_id, events.c.status, events.c.at,
+        func.row_number().over(
+            partition_by=events.c.repair_id, order_by=(events.c.at.desc(), events.c.id.desc())
+        ).label('position')
+    ).subquery('latest')
+    waited = hours_between(latest.c.at, literal(now, DateTime))
+
+    query = select(
+        latest.c.status,
+        func.count().label('repairs'),
+        func.avg(waited).label('avg_hours'),
+        func.max(waited).label('max_hours'),
+        func.sum(waited).label('total_hours')
+    ).where(latest.c.position == 1, latest.c.status.notin_(TERMINAL_STATUSES)) \
+        .group_by(latest.c.status).order_by(func.sum(waited).desc())
+    if limit:
+        query = query.limit(limit)
+    return [_rounded(row._asdict()) for row in db.session.execute(query)]
+
+def repair_timeline(repair_id, now=None):
+    """A repair's status history: [{status, entered_at, left_at, hours, changed_by}]"""
+    now = now or datetime.utcnow()
+    intervals = status_intervals(repair_id)
+    query = select(intervals, _stay_hours(intervals, now).label('hours')) \
+        .order_by(intervals.c.entered_at)
+    return [_rounded(row._asdict()) for row in db.session.execute(query)]
+
+def _rounded(row):
+    for name, value in row.items():
+        if isinstance(value, float):
+            row[name] = round(value, 2)
+    return row
@@ -0,0 +1,334 @@
+import json
+import os
+import random
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select, update
+from app import db
+from app.database import write_transaction
+from app.models import Job
+
+jobs_cli = AppGroup('jobs', help='Inspect and manage the background job queue.')
+
+QUEUED, RUNNING, DONE, DEAD = 'queued', 'running', 'done', 'dead'
+
+# Task functions by name, filled in by @task
+TASKS = {}
+
+def task(name):
+    """Register a function as a job task: @task('rollup.rebuild')"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+def enqueue(task_name, payload=None, key=None, delay=0, max_attempts=None):
+    """
+    Stage a job on db.session; the caller commits, so the job only exists if
+    the rest of its transaction does. If a queued job already has `key`,
+    that job is returned instead (brought forward if this one is due sooner).
+    """
+    if task_name not in TASKS:
+        raise ValueError(f'Unknown task: {task_name}')
+    run_at = datetime.utcnow() + timedelta(seconds=delay)
+
+    if key is not None:
+        existing = Job.query.filter_by(key=key, status=QUEUED).first()
+        if existing is not None:
+            if run_at < existing.run_at:
+                existing.run_at = run_at
+            return existing
+
+    job = Job(
+        task=task_name,
+        payload=json.dumps(payload) if payload else None,
+        key=key,
+        status=QUEUED,
+        attempts=0,
+        max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 5),
+        run_at=run_at
+    )
+    db.session.add(job)
+    return job
+
+def retry_delay(attempts, config):
+    """Exponential backoff with jitter after the given number of failed attempts"""
+    base = config.get('JOB_RETRY_BASE', 10)
+    ceiling = config.get('JOB_RETRY_MAX', 3600)
+    return min(ceiling, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+def release_expired(now=None):
+    """
+    Jobs whose lease ran out (their worker died or hung) go back on the
+    queue, or to dead once they have used up their attempts
+    """
+    def work():
+        moment = now or datetime.utcnow()
+        expired = (Job.status == RUNNING, Job.locked_until < moment)
+        buried = db.session.execute(
+            update(Job).where(*expired, Job.attempts >= Job.max_attempts)
+            .values(status=DEAD, last_error='Lease expired', finished_at=moment, locked_until=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        requeued = db.session.execute(
+            update(Job).where(*expired)
+            .values(status=QUEUED, locked_by=None, locked_until=None, run_at=moment)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        return requeued, buried
+    return write_transaction(work)
+
+def claim(worker_id, limit=1, lease_seconds=None):
+    """
+    Lease up to `limit` due jobs to worker_id and return their ids, oldest
+    first. Row locks are skipped where the database has them (PostgreSQL);
+    everywhere the status check in the UPDATE keeps a job to one worker.
+    """
+    lease = timedelta(seconds=lease_seconds or current_app.config.get('JOB_LEASE_SECONDS', 300))
+
+    def work():
+        now = datetime.utcnow()
+        candidates = db.session.execute(
+            select(Job.id).where(Job.status == QUEUED, Job.run_at <= now)
+            .order_by(Job.run_at, Job.id).limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+
+        claimed = []
+        for job_id in candidates:
+            leased = db.session.execute(
+                update(Job).where(Job.id == job_id, Job.status == QUEUED)
+                .values(status=RUNNING, locked_by=worker_id, locked_until=now + lease,
+                        attempts=Job.attempts + 1, started_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if leased:
+                claimed.append(job_id)
+        return claimed
+    return write_transaction(work)
+
+def _settle(job_id, worker_id, **values):
+    """Record a job's outcome, provided worker_id still holds its lease"""
+    return write_transaction(lambda: db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == RUNNING, Job.locked_by == worker_id)
+        .values(locked_until=None, **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount)
+
+def run_job(job_id, worker_id):
+    """
+    Run one leased job inside the current app context and record the result.
+    Returns the job's new status, or None if the lease was lost.
+    """
+    row = db.session.execute(
+        select(Job.task, Job.payload, Job.attempts, Job.max_attempts)
+        .where(Job.id == job_id, Job.status == RUNNING, Job.locked_by == worker_id)
+    ).first()
+    db.session.rollback()
+    if row is None:
+        return None
+
+    func = TASKS.get(row.task)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task: {row.task}')
+        func(**json.loads(row.payload or '{}'))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc(limit=5)
+        now = datetime.utcnow()
+        if func is None or row.attempts >= row.max_attempts:
+            status, values = DEAD, {'finished_at': now}
+        else:
+            delay = retry_delay(row.attempts, current_app.config)
+            status, values = QUEUED, {'locked_by': None, 'run_at': now + timedelta(seconds=delay)}
+        current_app.logger.warning(f"Job {job_id} ({row.task}) failed on attempt "
+                                   f"{row.attempts}/{row.max_attempts}, now {status}")
+        return status if _settle(job_id, worker_id, status=status, last_error=error, **values) else None
+
+    if not _settle(job_id, worker_id, status=DONE, last_error=None, finished_at=datetime.utcnow()):
+        return None
+    return DONE
+
+def retry_dead(job_id=None):
+    """Put one dead job (or all of them) back on the queue with fresh attempts"""
+    query = Job.query.filter(Job.status == DEAD)
+    if job_id is not None:
+        query = query.filter(Job.id == job_id)
+    return write_transaction(lambda: query.update({
+        Job.status: QUEUED, Job.attempts: 0, Job.locked_by: None,
+        Job.run_at: datetime.utcnow(), Job.finished_at: None
+    }, synchronize_session=False))
+
+def purge_finished(older_than):
+    """Delete done jobs that finished before now - older_than"""
+    cutoff = datetime.utcnow() - older_than
+    return write_transaction(lambda: Job.query.filter(
+        Job.status == DONE, Job.finished_at < cutoff
+    ).delete(synchronize_session=False))
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def _seconds(start, end):
+    return max((end - start).total_seconds(), 0.0)
+
+def queue_stats(window=timedelta(hours=1), sample=1000):
+    """Queue depth by status and task, plus wait and run times of recently finished jobs"""
+    now = datetime.utcnow()
+    by_status = dict(db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+    by_task = db.session.query(Job.task, Job.status, func.count(Job.id)) \
+        .filter(Job.status.in_((QUEUED, RUNNING, DEAD))) \
+        .group_by(Job.task, Job.status).all()
+    oldest_due = db.session.query(func.min(Job.run_at)) \
+        .filter(Job.status == QUEUED, Job.run_at <= now).scalar()
+    due = Job.query.filter(Job.status == QUEUED, Job.run_at <= now).count()
+
+    finished = db.session.query(Job.run_at, Job.started_at, Job.finished_at) \
+        .filter(Job.status == DONE, Job.finished_at >= now - window) \
+        .order_by(Job.finished_at.desc()).limit(sample).all()
+    waits = sorted(_seconds(run_at, started_at) for run_at, started_at, _ in finished)
+    runs = sorted(_seconds(started_at, finished_at) for _, started_at, finished_at in finished)
+
+    tasks = {}
+    for name, status, count in by_task:
+        tasks.setdefault(name, {QUEUED: 0, RUNNING: 0, DEAD: 0})[status] = count
+
+    return {
+        'depth': {status: by_status.get(status, 0) for status in (QUEUED, RUNNING, DONE, DEAD)},
+        'due': due,
+        'oldest_due_seconds': round(_seconds(oldest_due, now), 1) if oldest_due else 0.0,
+        'tasks': tasks,
+        'finished': {
+            'window_seconds': int(window.total_seconds()),
+            'count': len(finished),
+            'wait_p50_seconds': round(_percentile(waits, 0.50), 3),
+            'wait_p95_seconds': round(_percentile(waits, 0.95), 3),
+            'run_p50_seconds': round(_percentile(runs, 0.50), 3),
+            'run_p95_seconds': round(_percentile(runs, 0.95), 3),
+            'run_max_seconds': round(runs[-1], 3) if runs else 0.0
+        }
+    }
+
+def _run_in_thread(app, job_id, worker_id):
+    with app.app_context():
+        return run_job(job_id, worker_id)
+
+# The app each pool process builds for itself (see _init_process)
+_process_app = None
+
+def _init_process(config_class):
+    global _process_app
+    from app import create_app
+    _process_app = create_app(config_class)
+
+def _run_in_process(job_id, worker_id):
+    with _process_app.app_context():
+        return run_job(job_id, worker_id)
+
+class Worker:
+    """
+    Polls the queue and runs due jobs on a thread or process pool, never
+    leasing more jobs than it has free slots
+    """
+
+    def __init__(self, app, pool='thread', concurrency=2, poll_interval=1.0, config_class=None):
+        self.app = app
+        self.pool = pool
+        self.concurrency = max(concurrency, 1)
+        self.poll_interval = poll_interval
+        self.config_class = config_class
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.processed = 0
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Stop leasing new jobs; running ones are allowed to finish"""
+        self._stopping.set()
+
+    def _executor(self):
+        if self.pool == 'process':
+            return ProcessPoolExecutor(self.concurrency, initializer=_init_process,
+                                       initargs=(self.config_class,))
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+
+    def _submit(self, executor, job_id):
+        if self.pool == 'process':
+            return executor.submit(_run_in_process, job_id, self.worker_id)
+        return executor.submit(_run_in_thread, self.app, job_id, self.worker_id)
+
+    def _collect(self, futures):
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                self.app.logger.exception('Job runner crashed; its lease will expire')
+            self.processed += 1
+
+    def run(self, once=False):
+        """Work until stop() (or, with once, until nothing is due or running)"""
+        in_flight = set()
+        with self._executor() as executor:
+            while not self._stopping.is_set():
+                finished = {future for future in in_flight if future.done()}
+                self._collect(finished)
+                in_flight -= finished
+
+                claimed = []
+                free = self.concurrency - len(in_flight)
+                if free > 0:
+                    with self.app.app_context():
+                        release_expired()
+                        claimed = claim(self.worker_id, free)
+                        db.session.remove()
+                    in_flight.update(self._submit(executor, job_id) for job_id in claimed)
+
+                if claimed and len(in_flight) < self.concurrency:
+                    continue
+                if in_flight:
+                    wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                elif once:
+                    break
+                else:
+                    self._stopping.wait(self.poll_interval)
+
+            wait(in_flight)
+            self._collect(in_flight)
+        return self.processed
+
+@jobs_cli.command('stats')
+def stats_command():
+    """Show queue depth and recent job latency"""
+    stats = queue_stats()
+    depth = stats['depth']
+    click.echo(f"queued {depth[QUEUED]} (due {stats['due']}, oldest {stats['oldest_due_seconds']}s), "
+               f"running {depth[RUNNING]}, done {depth[DONE]}, dead {depth[DEAD]}")
+    for name, counts in sorted(stats['tasks'].items()):
+        click.echo(f"  {name}: " + ', '.join(f"{status} {count}" for status, count in counts.items()))
+    finished = stats['finished']
+    click.echo(f"last hour: {finished['count']} done, wait p95 {finished['wait_p95_seconds']}s, "
+               f"run p95 {finished['run_p95_seconds']}s")
+
+@jobs_cli.command('retry')
+@click.argument('job_id', type=int, required=False)
+def retry_command(job_id):
+    """Requeue a dead job (or every dead job)"""
+    count = retry_dead(job_id)
+    click.echo(f"✓ Requeued {count} dead job(s)")
+
+@jobs_cli.command('purge')
+@click.option('--days', default=7, show_default=True, help='Keep done jobs this many days.')
+def purge_command(days):
+    """Delete old finished jobs"""
+    count = purge_finished(timedelta(days=days))
+    click.echo(f"✓ Deleted {count} finished job(s)")
@@ -0,0 +1,211 @@
+import math
+import sys
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, case, event, func, inspect, select
+from sqlalchemy.orm import Session, joinedload
+from app import db
+from app.jobs import task
+from app.models import Payment, Repair
+
+ledger_cli = AppGroup('ledger', help='Maintain per-repair payment totals.')
+
+# Balances below half a cent are rounding noise, not money owed
+BALANCE_EPSILON = 0.005
+
+repair_table = Repair.__table__
+
+def billable_amount(repair):
+    """What the customer owes in total: the actual cost once set, else the estimate"""
+    if (repair.actual_cost or 0.0) > 0:
+        return repair.actual_cost
+    return repair.estimated_cost or 0.0
+
+def _billable_sql(columns):
+    return case(
+        (func.coalesce(columns.actual_cost, 0) > 0, columns.actual_cost),
+        else_=func.coalesce(columns.estimated_cost, 0)
+    )
+
+def _ledger_values(columns, total):
+    """
+    Repair columns that follow total_paid, as SQL: balance_due is what is
+    still owed (never below zero: a deposit taken before anything is billed
+    is money held, not a debt), is_paid is whether the bill is covered, and
+    deposit_paid mirrors total_paid for the older forms and exports
+    """
+    billable = _billable_sql(columns)
+    owed = billable - total
+    return {
+        'total_paid': total,
+        'balance_due': case((owed > 0, owed), else_=0.0),
+        'is_paid': and_(billable > 0, owed <= BALANCE_EPSILON),
+        'deposit_paid': total
+    }
+
+def _counted(amount, voided_at):
+    """A payment's contribution to the ledger"""
+    return 0.0 if voided_at is not None else (amount or 0.0)
+
+def _previous(state, name):
+    history = state.attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(state.obj(), name)
+
+def _apply(connection, session, repair_id, delta):
+    """Move a repair's total_paid (and balance_due) by delta inside the flush"""
+    if repair_id is None or not delta:
+        return
+    connection.execute(
+        repair_table.update()
+        .where(repair_table.c.id == repair_id)
+        .values(**_ledger_values(repair_table.c, repair_table.c.total_paid + delta),
+                # A payment is not an edit to the repair itself
+                updated_at=repair_table.c.updated_at)
+    )
+    if session is not None:
+        session.info.setdefault('ledger_repair_ids', set()).add(repair_id)
+
+@event.listens_for(Payment, 'after_insert')
+def _payment_inserted(mapper, connection, target):
+    _apply(connection, inspect(target).session, target.repair_id,
+           _counted(target.amount, target.voided_at))
+
+@event.listens_for(Payment, 'after_update')
+def _payment_updated(mapper, connection, target):
+    state = inspect(target)
+    old_repair_id = _previous(state, 'repair_id')
+    old = _counted(_previous(state, 'amount'), _previous(state, 'voided_at'))
+    new = _counted(target.amount, target.voided_at)
+
+    if old_repair_id != target.repair_id:
+        _apply(connection, state.session, old_repair_id, -old)
+        _apply(connection, state.session, target.repair_id, new)
+    else:
+        _apply(connection, state.session, target.repair_id, new - old)
+
+@event.listens_for(Payment, 'after_delete')
+def _payment_deleted(mapper, connection, target):
+    _apply(connection, inspect(target).session, target.repair_id,
+           -_counted(target.amount, target.voided_at))
+
+@event.listens_for(Repair, 'before_insert')
+def _repair_opened(mapper, connection, target):
+    billable = billable_amount(target)
+    target.total_paid = target.total_paid or 0.0
+    target.balance_due = max(billable - target.total_paid, 0.0)
+    target.is_paid = billable > 0 and billable - target.total_paid <= BALANCE_EPSILON
+    target.deposit_paid = target.total_paid
+
+@event.listens_for(Repair, 'before_update')
+def _repair_costs_changed(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.actual_cost.history.has_changes() or \
+            state.attrs.estimated_cost.history.has_changes():
+        # total_paid is read in SQL: payments may have moved it during this flush
+        billable = billable_amount(target)
+        owed = billable - repair_table.c.total_paid
+        target.balance_due = case((owed > 0, owed), else_=0.0)
+        target.is_paid = owed <= BALANCE_EPSILON if billable > 0 else False
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_ledger_totals(session, flush_context):
+    """Loaded repairs reread their totals after payments changed them in SQL"""
+    repair_ids = session.info.pop('ledger_repair_ids', None)
+    if not repair_ids:
+        return
+    mapper = inspect(Repair)
+    for repair_id in repair_ids:
+        repair = session.identity_map.get(mapper.identity_key_from_primary_key((repair_id,)))
+        if repair is not None:
+            session.expire(repair, ['total_paid', 'balance_due'])
+
+def add_payment(repair, amount, payment_method=None, reference=None, notes=None):
+    """Stage a payment against a repair (the caller commits)"""
+    if amount is None or not math.isfinite(amount):
+        raise ValueError('Please enter a valid amount')
+    if amount <= 0:
+        raise ValueError('Payment amount must be greater than zero')
+    payment = Payment(
+        repair_id=repair.id,
+        amount=round(amount, 2),
+        payment_method=payment_method or 'Cash',
+        reference=reference or None,
+        notes=notes or None
+    )
+    db.session.add(payment)
+    return payment
+
+def void_payment(payment, reason=None):
+    """Stage voiding a payment; it stays on record but stops counting"""
+    if payment.voided_at is not None:
+        raise ValueError('Payment is already void')
+    payment.voided_at = datetime.utcnow()
+    payment.void_reason = reason or None
+    return payment
+
+def outstanding_balances(status=None, limit=None):
+    """Repairs with money still owed, largest first (served by ix_repair_balance_due)"""
+    query = Repair.query.options(joinedload(Repair.customer)) \
+        .filter(Repair.balance_due > BALANCE_EPSILON)
+    if status:
+        query = query.filter(Repair.status == status)
+    query = query.order_by(Repair.balance_due.desc(), Repair.id)
+    return query.limit(limit) if limit else query
+
+def outstanding_total(status=None):
+    """(repairs owing, total owed)"""
+    query = db.session.query(func.count(Repair.id), func.coalesce(func.sum(Repair.balance_due), 0.0)) \
+        .filter(Repair.balance_due > BALANCE_EPSILON)
+    if status:
+        query = query.filter(Repair.status == status)
+    count, total = query.one()
+    return int(count), round(float(total), 2)
+
+def _paid_subquery():
+    return select(func.coalesce(func.sum(Payment.amount), 0.0)) \
+        .where(Payment.repair_id == repair_table.c.id, Payment.voided_at.is_(None)) \
+        .scalar_subquery()
+
+def find_drift():
+    """Repairs whose stored totals disagree with their payments: [(id, stored, expected)]"""
+    paid = _paid_subquery()
+    rows = db.session.execute(
+        select(repair_table.c.id, repair_table.c.total_paid, paid)
+        .where(func.abs(repair_table.c.total_paid - paid) > BALANCE_EPSILON)
+    ).all()
+    return [(repair_id, stored, expected) for repair_id, stored, expected in rows]
+
+@task('ledger.rebuild')
+def rebuild():
+    """Recompute every repair's total_paid, balance_due and is_paid from its payments"""
+    db.session.execute(repair_table.update().values(
+        **_ledger_values(repair_table.c, _paid_subquery()),
+        updated_at=repair_table.c.updated_at
+    ))
+    db.session.commit()
+
+@ledger_cli.command('rebuild')
+def rebuild_command():
+    """Recompute payment totals and balances for every repair"""
+    rebuild()
+    count, total = outstanding_total()
+    click.echo(f"✓ Ledger rebuilt: {count} repair(s) owing R{total:.2f}")
+
+@ledger_cli.command('check')
+@click.option('--fix', is_flag=True, help='Rebuild the ledger if drift is found.')
+def check_command(fix):
+    """Compare stored payment totals with the payments table"""
+    drift = find_drift()
+    if not drift:
+        click.echo("✓ Payment totals are in sync")
+        return
+
+    for repair_id, stored, expected in drift:
+        click.echo(f"✗ repair {repair_id}: stored R{stored:.2f}, payments R{expected:.2f}")
+
+    if fix:
+        rebuild()
+        click.echo(f"✓ Rebuilt the ledger after {len(drift)} drifted repair(s)")
+    else:
+        sys.exit(1)
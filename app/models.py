@@ -1,6 +1,7 @@
 from datetime import datetime
 from app import db, login_manager
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class Admin(db.Model, UserMixin):
@@ -34,6 +35,7 @@ class Customer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20), nullable=False)
+    phone_normalized = db.Column(db.String(16), unique=True, index=True)  # E.164, lookup key
     email = db.Column(db.String(120))
     address = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -41,6 +43,13 @@ class Customer(db.Model):
     # Relationships
     repairs = db.relationship('Repair', backref='customer', lazy=True)
     
+    @validates('phone')
+    def validate_phone(self, key, phone):
+        """Keep the normalized lookup key in step with the phone as entered"""
+        from app.utils import normalize_phone
+        self.phone_normalized = normalize_phone(phone)
+        return phone
+    
     def __repr__(self):
         return f'<Customer {self.name}>'
 
@@ -48,6 +57,14 @@ class Repair(db.Model):
     """
     Main repair tracking model
     """
+    __table_args__ = (
+        # Sort key for keyset pagination; also serves plain created_at ranges
+        db.Index('ix_repair_created_at_id', 'created_at', 'id'),
+        # Date-range reports filtered by status or device type
+        db.Index('ix_repair_status_created_at', 'status', 'created_at'),
+        db.Index('ix_repair_device_type_created_at', 'device_type', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     tracking_id = db.Column(db.String(50), unique=True, nullable=False, index=True)
     
@@ -67,10 +84,14 @@ class Repair(db.Model):
     deposit_paid = db.Column(db.Float, default=0.0)
     is_paid = db.Column(db.Boolean, default=False)
     
+    # Ledger totals, kept in step with non-void payments (see app/ledger.py)
+    total_paid = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    balance_due = db.Column(db.Float, nullable=False, default=0.0, server_default='0', index=True)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    completed_at = db.Column(db.DateTime, index=True)
     
     # Admin who last updated
     updated_by = db.Column(db.Integer, db.ForeignKey('admin.id'))
@@ -99,17 +120,139 @@ class Payment(db.Model):
     Payment tracking model
     """
     id = db.Column(db.Integer, primary_key=True)
-    repair_id = db.Column(db.Integer, db.ForeignKey('repair.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    # active_history: the old value is loaded on assignment even once expired,
+    # so the ledger (app/ledger.py) can take it back off the right repair
+    repair_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('repair.id'), nullable=False, index=True), active_history=True)
+    amount = db.column_property(db.Column(db.Float, nullable=False), active_history=True)
     payment_method = db.Column(db.String(20))  # Cash, Ecocash, Bank Transfer, etc.
     reference = db.Column(db.String(100))
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Voided payments stay on record but no longer count towards the ledger
+    voided_at = db.column_property(db.Column(db.DateTime), active_history=True)
+    void_reason = db.Column(db.String(200))
+    
     def __repr__(self):
         return f'<Payment ${self.amount} for Repair {self.repair_id}>'
 
+class RepairStatusEvent(db.Model):
+    """
+    Append-only log of repair status changes (see app/history.py)
+    """
+    __tablename__ = 'repair_status_event'
+    __table_args__ = (
+        # A repair's history in order: the window functions' partition and sort
+        db.Index('ix_repair_status_event_repair_at', 'repair_id', 'at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    repair_id = db.Column(db.Integer, db.ForeignKey('repair.id'), nullable=False)
+    status = db.Column(db.String(30), nullable=False)
+    at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    changed_by = db.Column(db.Integer, db.ForeignKey('admin.id'))
+    
+    def __repr__(self):
+        return f'<RepairStatusEvent {self.repair_id} {self.status} at {self.at}>'
+
+class RepairDailyStats(db.Model):
+    """
+    Daily rollup of repair counts and revenue per device type and status
+    """
+    __tablename__ = 'repair_daily_stats'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'device_type', 'status', name='uq_repair_daily_stats_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    device_type = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(30), nullable=False)
+    repair_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<RepairDailyStats {self.day} {self.device_type} {self.status}>'
+
+class TrackingSequence(db.Model):
+    """
+    Per-day counter behind tracking ID allocation
+    """
+    __tablename__ = 'tracking_sequence'
+    
+    day = db.Column(db.String(8), primary_key=True)  # YYYYMMDD
+    next_value = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<TrackingSequence {self.day}: {self.next_value}>'
+
+class Notification(db.Model):
+    """
+    Customer notification outbox, written with the change it reports and
+    sent later by the notifications.send job (see app/notifications.py)
+    """
+    __table_args__ = (
+        # Sender: due pending rows; coalescing: a repair's pending row per channel
+        db.Index('ix_notification_state_send_after', 'state', 'send_after'),
+        db.Index('ix_notification_repair_channel', 'repair_id', 'channel'),
+        # Rate limit: sent in the last minute per channel
+        db.Index('ix_notification_channel_sent_at', 'channel', 'sent_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    repair_id = db.Column(db.Integer, db.ForeignKey('repair.id'), nullable=False)
+    channel = db.Column(db.String(10), nullable=False)  # email, sms
+    recipient = db.Column(db.String(120), nullable=False)
+    event = db.Column(db.String(20), nullable=False)  # booked, status
+    repair_status = db.Column(db.String(30))  # latest status when coalesced
+    state = db.Column(db.String(10), nullable=False, default='pending')  # pending, sending, sent, skipped, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    send_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    repair = db.relationship('Repair')
+    
+    def __repr__(self):
+        return f'<Notification {self.channel} {self.event} for Repair {self.repair_id}>'
+
+class Job(db.Model):
+    """
+    Background job, leased and run by worker.py (see app/jobs.py)
+    """
+    __table_args__ = (
+        # Claim query: next due job in a state
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text)  # JSON keyword arguments
+    # Enqueueing a key that is already queued reuses that job
+    key = db.Column(db.String(200), index=True)
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued, running, done, dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    last_error = db.Column(db.Text)
+    
+    # Lease: the worker holding the job and when its claim runs out
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.task} {self.status}>'
+
 # Flask-Login user loader
 @login_manager.user_loader
 def load_user(user_id):
-    return Admin.query.get(int(user_id))
\ No newline at end of file
+    # Served from a short-lived identity cache (see app/auth.py)
+    from app.auth import load_admin
+    return load_admin(int(user_id))
\ No newline at end of file
@@ -0,0 +1,295 @@
+import importlib
+import smtplib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from flask import current_app
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import joinedload
+from app import db
+from app.database import write_transaction
+from app.jobs import enqueue, retry_delay, task
+from app.models import Notification, Repair
+
+PENDING, SENDING, SENT, SKIPPED, FAILED = 'pending', 'sending', 'sent', 'skipped', 'failed'
+SENDER_TASK = 'notifications.send'
+
+# A row left in `sending` this long (its sender died) is picked up again
+SENDING_LEASE = timedelta(minutes=5)
+
+class SMTPProvider:
+    """
+    Email over SMTP. Any SMTP server works, including a local debugging
+    one (python -m aiosmtpd -n -l localhost:1025) in development.
+    """
+    channel = 'email'
+
+    def __init__(self, config):
+        self.host = config.get('MAIL_SERVER') or 'localhost'
+        self.port = config.get('MAIL_PORT', 1025)
+        self.use_tls = config.get('MAIL_USE_TLS', False)
+        self.username = config.get('MAIL_USERNAME')
+        self.password = config.get('MAIL_PASSWORD')
+        self.sender = config.get('MAIL_SENDER') or config['BUSINESS_INFO']['email']
+        self.rate_per_minute = config.get('MAIL_RATE_PER_MINUTE', 60)
+
+    @contextmanager
+    def connect(self):
+        """One SMTP session for a whole batch; yields send(recipient, subject, body)"""
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+
+            def send(recipient, subject, body):
+                message = EmailMessage()
+                message['From'] = self.sender
+                message['To'] = recipient
+                message['Subject'] = subject
+                message.set_content(body)
+                smtp.send_message(message)
+
+            yield send
+        finally:
+            try:
+                smtp.quit()
+            except smtplib.SMTPException:
+                smtp.close()
+
+class LogSMSProvider:
+    """Writes text messages to the app log; stands in until an SMS gateway is set up"""
+    channel = 'sms'
+
+    def __init__(self, config):
+        self.rate_per_minute = config.get('SMS_RATE_PER_MINUTE', 30)
+
+    @contextmanager
+    def connect(self):
+        yield lambda recipient, subject, body: current_app.logger.info(f"SMS to {recipient}: {body}")
+
+def load_sms_provider(config):
+    """
+    SMS_PROVIDER: empty for no SMS, 'log', or 'package.module:ClassName' for a
+    class taking the config, with the same rate_per_minute/connect() interface
+    """
+    name = config.get('SMS_PROVIDER')
+    if not name:
+        return None
+    if name == 'log':
+        return LogSMSProvider(config)
+    module_name, _, class_name = name.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)(config)
+
+def _providers():
+    return current_app.extensions.get('notification_providers', {})
+
+def _recipients(repair):
+    customer = repair.customer
+    if customer is None:
+        return []
+    addresses = {'email': customer.email, 'sms': customer.phone_normalized}
+    return [(channel, addresses[channel]) for channel in _providers() if addresses.get(channel)]
+
+def queue_notification(repair, event='status'):
+    """
+    Stage a notification about `repair` in the current transaction. A repair
+    with one still pending on a channel has that row updated to its latest
+    status instead, so a burst of changes ends up as one message.
+    """
+    config = current_app.config
+    worth_sending = event == 'booked' or repair.status in config.get('NOTIFY_STATUSES', ())
+    delay = config.get('NOTIFY_COALESCE_SECONDS', 60)
+    staged = False
+
+    for channel, recipient in _recipients(repair):
+        pending = Notification.query.filter_by(repair_id=repair.id, channel=channel, state=PENDING).first()
+        if pending is not None:
+            pending.event = event if event == 'booked' else pending.event
+            pending.repair_status = repair.status
+            pending.recipient = recipient
+            staged = True
+        elif worth_sending:
+            db.session.add(Notification(
+                repair_id=repair.id,
+                channel=channel,
+                recipient=recipient,
+                event=event,
+                repair_status=repair.status,
+                state=PENDING,
+                attempts=0,
+                send_after=datetime.utcnow() + timedelta(seconds=delay)
+            ))
+            staged = True
+
+    if staged:
+        enqueue(SENDER_TASK, key=SENDER_TASK, delay=delay)
+    return staged
+
+def render_message(notification, repair):
+    """(subject, body) for a notification"""
+    business = current_app.config['BUSINESS_INFO']
+    name = repair.customer.name if repair.customer else 'there'
+    device = f"{repair.brand} {repair.model}"
+
+    if notification.event == 'booked':
+        subject = f"Repair booked: {repair.tracking_id}"
+        text = f"we have received your {device}. Your tracking ID is {repair.tracking_id}."
+    elif notification.repair_status == 'Ready for Pickup':
+        subject = f"{repair.tracking_id}: ready for pickup"
+        text = (f"your {device} is ready for pickup at {business['address']} "
+                f"({business['working_hours']}).")
+    else:
+        subject = f"{repair.tracking_id}: {notification.repair_status}"
+        text = f"your {device} repair is now: {notification.repair_status}."
+
+    if notification.channel == 'sms':
+        return subject, f"{business['name']}: {text[0].upper()}{text[1:]}"
+    return subject, f"Hi {name},\n\n{text[0].upper()}{text[1:]}\n\n{business['name']}\n{business['phone']}\n"
+
+def _rate_window(channel, now):
+    """(messages sent on a channel in the last minute, when the oldest of them was sent)"""
+    return db.session.query(func.count(Notification.id), func.min(Notification.sent_at)).filter(
+        Notification.channel == channel,
+        Notification.sent_at > now - timedelta(minutes=1)
+    ).one()
+
+def _claim(channel, limit, now):
+    """Move up to `limit` due rows on a channel to `sending` for this sender"""
+    def work():
+        due = or_(
+            (Notification.state == PENDING) & (Notification.send_after <= now),
+            (Notification.state == SENDING) & (Notification.send_after < now - SENDING_LEASE)
+        )
+        candidates = db.session.query(Notification.id) \
+            .filter(Notification.channel == channel, due) \
+            .order_by(Notification.send_after, Notification.id).limit(limit).all()
+
+        claimed = []
+        for (notification_id,) in candidates:
+            if db.session.execute(
+                update(Notification).where(Notification.id == notification_id, due)
+                .values(state=SENDING, send_after=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount:
+                claimed.append(notification_id)
+        return claimed
+    return write_transaction(work)
+
+def _already_told(notification):
+    """True when the last message sent for this repair and channel said the same"""
+    last = db.session.query(Notification.event, Notification.repair_status).filter(
+        Notification.repair_id == notification.repair_id,
+        Notification.channel == notification.channel,
+        Notification.state == SENT
+    ).order_by(Notification.sent_at.desc()).first()
+    return last is not None and tuple(last) == (notification.event, notification.repair_status)
+
+def _deliver(provider, notifications):
+    """Send a claimed batch over one provider connection; {id: error or None or SKIPPED}"""
+    notify_statuses = current_app.config.get('NOTIFY_STATUSES', ())
+    outcome, to_send = {}, []
+    for notification in notifications:
+        if notification.event == 'status' and (
+                notification.repair_status not in notify_statuses or _already_told(notification)):
+            outcome[notification.id] = SKIPPED
+        else:
+            to_send.append(notification)
+
+    if not to_send:
+        return outcome
+    try:
+        with provider.connect() as send:
+            for notification in to_send:
+                subject, body = render_message(notification, notification.repair)
+                try:
+                    send(notification.recipient, subject, body)
+                    outcome[notification.id] = None
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, ValueError) as e:
+                    outcome[notification.id] = repr(e)
+    except (OSError, smtplib.SMTPException) as e:
+        # Connection-level failure: everything not yet sent is retried
+        for notification in to_send:
+            outcome.setdefault(notification.id, repr(e))
+    return outcome
+
+def _record(outcome, now):
+    config = current_app.config
+    max_attempts = config.get('NOTIFY_MAX_ATTEMPTS', 5)
+
+    def work():
+        for notification in Notification.query.filter(Notification.id.in_(outcome)):
+            result = outcome[notification.id]
+            if result is None:
+                notification.state, notification.sent_at = SENT, now
+            elif result == SKIPPED:
+                notification.state = SKIPPED
+            else:
+                notification.attempts += 1
+                notification.last_error = result
+                if notification.attempts >= max_attempts:
+                    notification.state = FAILED
+                else:
+                    notification.state = PENDING
+                    notification.send_after = now + timedelta(
+                        seconds=retry_delay(notification.attempts, config))
+    write_transaction(work)
+
+def _earliest(*moments):
+    moments = [moment for moment in moments if moment is not None]
+    return min(moments) if moments else None
+
+def _next_due(channel):
+    """When the next row on a channel becomes due: pending, or stranded in sending"""
+    pending = db.session.query(func.min(Notification.send_after)) \
+        .filter(Notification.channel == channel, Notification.state == PENDING).scalar()
+    stranded = db.session.query(func.min(Notification.send_after)) \
+        .filter(Notification.channel == channel, Notification.state == SENDING).scalar()
+    return _earliest(pending, stranded and stranded + SENDING_LEASE)
+
+@task(SENDER_TASK)
+def send_pending():
+    """
+    Send every due notification: per channel, at most the provider's
+    remaining per-minute allowance, over one connection. Queues itself
+    again for whatever is left. Returns {channel: messages sent}.
+    """
+    batch_size = current_app.config.get('NOTIFY_BATCH_SIZE', 50)
+    sent, next_run = {}, None
+
+    for channel, provider in _providers().items():
+        while True:
+            now = datetime.utcnow()
+            recent, oldest = _rate_window(channel, now)
+            allowance = provider.rate_per_minute - recent
+            if allowance <= 0:
+                # Due rows wait until the oldest send leaves the one-minute window
+                next_run = _earliest(next_run, oldest + timedelta(minutes=1))
+                break
+            ids = _claim(channel, min(batch_size, allowance), now)
+            if not ids:
+                # Retries and coalescing windows still running
+                next_run = _earliest(next_run, _next_due(channel))
+                break
+            notifications = Notification.query.options(
+                joinedload(Notification.repair).joinedload(Repair.customer)
+            ).filter(Notification.id.in_(ids)).all()
+            outcome = _deliver(provider, notifications)
+            _record(outcome, now)
+            sent[channel] = sent.get(channel, 0) + sum(1 for result in outcome.values() if result is None)
+
+    if next_run is not None:
+        delay = max((next_run - datetime.utcnow()).total_seconds(), 0)
+        write_transaction(lambda: enqueue(SENDER_TASK, key=SENDER_TASK, delay=delay))
+    return sent
+
+def init_notifications(app):
+    """Notification providers by channel: SMTP email and SMS, each when configured"""
+    providers = {}
+    if app.config.get('MAIL_ENABLED', False):
+        providers['email'] = SMTPProvider(app.config)
+    sms = load_sms_provider(app.config)
+    if sms is not None:
+        providers['sms'] = sms
+    app.extensions['notification_providers'] = providers
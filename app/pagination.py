@@ -0,0 +1,46 @@
+from datetime import datetime
+from sqlalchemy import and_, or_
+from app.models import Repair
+
+CURSOR_SEPARATOR = '~'
+
+def encode_cursor(repair):
+    """Encode a repair's (created_at, id) sort key as a URL-safe cursor"""
+    return f"{repair.created_at.isoformat()}{CURSOR_SEPARATOR}{repair.id}"
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor back into (created_at, id).
+    Returns None for a missing or malformed cursor so callers fall back
+    to the first page.
+    """
+    if not cursor:
+        return None
+    try:
+        created_at, repair_id = cursor.rsplit(CURSOR_SEPARATOR, 1)
+        return datetime.fromisoformat(created_at), int(repair_id)
+    except ValueError:
+        return None
+
+def keyset_page(query, cursor=None, per_page=50):
+    """
+    Return (repairs, next_cursor) for the page after `cursor`, newest first.
+    Seeks on (created_at, id) instead of using OFFSET, so every page costs
+    the same no matter how deep into the history it is.
+    """
+    position = decode_cursor(cursor)
+    if position:
+        created_at, repair_id = position
+        query = query.filter(or_(
+            Repair.created_at < created_at,
+            and_(Repair.created_at == created_at, Repair.id < repair_id)
+        ))
+
+    rows = query.order_by(Repair.created_at.desc(), Repair.id.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1])
+
+    return rows, next_cursor
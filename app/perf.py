@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from app import db
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class EndpointStats:
+    """Latency histogram and SQL totals for one endpoint"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.sampled = 0
+        self.sql_count = 0
+        self.sql_ms = 0.0
+
+    def percentile(self, fraction):
+        """Upper bucket bound holding the given fraction of requests"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                return float(LATENCY_BUCKETS_MS[index]) if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'histogram': [
+                {'le_ms': bound, 'count': count}
+                for bound, count in zip(LATENCY_BUCKETS_MS + (None,), self.buckets)
+            ],
+            'sampled': self.sampled,
+            'sql_per_request': round(self.sql_count / self.sampled, 2) if self.sampled else 0.0,
+            'sql_ms_per_request': round(self.sql_ms / self.sampled, 2) if self.sampled else 0.0
+        }
+
+class PerfRecorder:
+    """
+    Per-endpoint request metrics. Latency is recorded for every request;
+    SQL statement accounting only runs on the sampled fraction.
+    """
+
+    def __init__(self, sample_rate=0.25):
+        self.sample_rate = sample_rate
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, elapsed_ms, sql=None):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            if sql is not None:
+                stats.sampled += 1
+                stats.sql_count += sql[0]
+                stats.sql_ms += sql[1]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'since': self.started,
+                'sample_rate': self.sample_rate,
+                'endpoints': {name: stats.to_dict() for name, stats in sorted(self._endpoints.items())}
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.started = time.time()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and g.get('_perf_sql') is not None:
+        conn.info.setdefault('_perf_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and g.get('_perf_sql') is not None:
+        started = conn.info.get('_perf_started')
+        if started:
+            g._perf_sql[0] += 1
+            g._perf_sql[1] += (time.perf_counter() - started.pop()) * 1000
+
+def init_perf(app):
+    """Register request timing hooks and SQL accounting on the app's engine"""
+    if not app.config.get('PERF_ENABLED', True):
+        return
+
+    recorder = PerfRecorder(app.config.get('PERF_SAMPLE_RATE', 0.25))
+    app.extensions['perf'] = recorder
+
+    engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_perf_timer():
+        g._perf_started = time.perf_counter()
+        g._perf_sql = [0, 0.0] if random.random() < recorder.sample_rate else None
+
+    @app.after_request
+    def record_perf(response):
+        started = g.pop('_perf_started', None)
+        if started is None:
+            return response
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        sql = g.pop('_perf_sql', None)
+        recorder.record(request.endpoint or 'unmatched', elapsed_ms, sql)
+
+        if sql is not None:
+            response.headers.add(
+                'Server-Timing',
+                f'app;dur={elapsed_ms:.1f}, db;dur={sql[1]:.1f};desc="{sql[0]} queries"'
+            )
+        return response
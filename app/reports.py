@@ -0,0 +1,87 @@
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Repair
+
+def month_range(year, month):
+    """Half-open [first day, first day of next month) for a month"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+# Years a report can cover; date() itself stops at 9999
+MIN_YEAR, MAX_YEAR = 1900, 9998
+
+def _parse_date(value, name):
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} date '{value}' (expected YYYY-MM-DD)")
+    if not MIN_YEAR <= day.year <= MAX_YEAR:
+        raise ValueError(f"The {name} date must be between {MIN_YEAR} and {MAX_YEAR}")
+    return day
+
+def report_period(args):
+    """
+    Work out the report period from request args.
+    Returns (start, end, label) where [start, end) is a half-open day range:
+    `start`/`end` (inclusive YYYY-MM-DD) take priority, otherwise `month`/`year`.
+    A `start` on its own runs up to and including today (UTC, like the
+    stored timestamps). Raises ValueError with a user-facing message for
+    an `end` without a `start`, a reversed range or an out-of-range month/year.
+    """
+    if args.get('start') or args.get('end'):
+        if not args.get('start'):
+            raise ValueError('Please give a start date for the range')
+        start = _parse_date(args['start'], 'start')
+        if args.get('end'):
+            end = _parse_date(args['end'], 'end')
+        else:
+            end = max(start, datetime.utcnow().date())
+        if start > end:
+            raise ValueError('The start date must not be after the end date')
+        return start, end + timedelta(days=1), f"{start:%d %b %Y} – {end:%d %b %Y}"
+
+    today = datetime.now()
+    month = args.get('month', today.month, type=int)
+    year = args.get('year', today.year, type=int)
+    if not 1 <= month <= 12:
+        raise ValueError(f'Month must be between 1 and 12, not {month}')
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        raise ValueError(f'Year must be between {MIN_YEAR} and {MAX_YEAR}, not {year}')
+    start, end = month_range(year, month)
+    return start, end, f"{month}/{year}"
+
+def range_filters(start, end, status=None, device_type=None):
+    """
+    Criteria on the raw created_at column (no functions wrapped around it),
+    so (created_at), (status, created_at) and (device_type, created_at)
+    indexes can serve the range
+    """
+    filters = [
+        Repair.created_at >= datetime.combine(start, time.min),
+        Repair.created_at < datetime.combine(end, time.min)
+    ]
+    if status:
+        filters.append(Repair.status == status)
+    if device_type:
+        filters.append(Repair.device_type == device_type)
+    return filters
+
+def repairs_between(start, end, status=None, device_type=None):
+    """Repairs created in [start, end), with customers loaded in the same query"""
+    return Repair.query.options(joinedload(Repair.customer)) \
+        .filter(*range_filters(start, end, status, device_type)) \
+        .order_by(Repair.created_at.desc())
+
+def query_plan(query):
+    """Return the database's plan for a query as a list of lines"""
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+        return [row[-1] for row in rows]
+    rows = db.session.execute(text(f"EXPLAIN {statement}")).all()
+    return [row[0] for row in rows]
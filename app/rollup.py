@@ -0,0 +1,210 @@
+import sys
+from datetime import date, datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.jobs import task
+from app.models import Repair, RepairDailyStats
+from app.stats import summarize
+
+rollup_cli = AppGroup('rollup', help='Maintain the daily repair statistics rollup.')
+
+def _day(value):
+    """Normalize a datetime/date/ISO string to a date"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def _upsert_dialect():
+    dialect = db.session.get_bind().dialect.name
+    return {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}.get(dialect)
+
+def apply_delta(day, device_type, status, count_delta=0, revenue_delta=0.0):
+    """
+    Add deltas to one (day, device_type, status) bucket in the current
+    transaction, creating the bucket if it does not exist yet. One
+    INSERT ... ON CONFLICT DO UPDATE, so two transactions creating the same
+    bucket at once both land instead of one failing on the unique constraint.
+    """
+    if day is None or (not count_delta and not revenue_delta):
+        return
+
+    dialect_insert = _upsert_dialect()
+    if dialect_insert is not None:
+        table = RepairDailyStats.__table__
+        statement = dialect_insert(table).values(
+            day=day,
+            device_type=device_type,
+            status=status,
+            repair_count=count_delta,
+            revenue=revenue_delta
+        )
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['day', 'device_type', 'status'],
+            set_={
+                'repair_count': table.c.repair_count + statement.excluded.repair_count,
+                'revenue': table.c.revenue + statement.excluded.revenue
+            }
+        ))
+        return
+
+    # Databases without ON CONFLICT: update, then create the missing bucket
+    updated = RepairDailyStats.query.filter_by(
+        day=day, device_type=device_type, status=status
+    ).update({
+        RepairDailyStats.repair_count: RepairDailyStats.repair_count + count_delta,
+        RepairDailyStats.revenue: RepairDailyStats.revenue + revenue_delta
+    }, synchronize_session=False)
+
+    if not updated:
+        db.session.add(RepairDailyStats(
+            day=day,
+            device_type=device_type,
+            status=status,
+            repair_count=count_delta,
+            revenue=revenue_delta
+        ))
+        db.session.flush()
+
+def record_new_repair(repair):
+    """Count a freshly created (flushed) repair in its bucket"""
+    record_new_repairs([repair])
+
+def record_new_repairs(repairs):
+    """Count a batch of new repairs with one update per touched bucket"""
+    deltas = {}
+    for repair in repairs:
+        key = (
+            _day(repair.created_at or datetime.utcnow()),
+            repair.device_type,
+            repair.status or 'Received'
+        )
+        count, revenue = deltas.get(key, (0, 0.0))
+        deltas[key] = (count + 1, revenue + (repair.actual_cost or 0.0))
+
+    for (day, device_type, status), (count, revenue) in deltas.items():
+        apply_delta(day, device_type, status, count, revenue)
+
+def record_repair_change(repair, old_status, old_cost):
+    """Move a repair between buckets after a status and/or cost change"""
+    day = _day(repair.created_at)
+    old_status = old_status or 'Received'
+    new_status = repair.status or 'Received'
+    old_cost = old_cost or 0.0
+    new_cost = repair.actual_cost or 0.0
+
+    if old_status == new_status:
+        apply_delta(day, repair.device_type, new_status, 0, new_cost - old_cost)
+    else:
+        apply_delta(day, repair.device_type, old_status, -1, -old_cost)
+        apply_delta(day, repair.device_type, new_status, 1, new_cost)
+
+def rollup_stats(start=None, end=None, status=None, device_type=None):
+    """
+    Stats dictionary for the half-open day range [start, end), read from
+    the rollup table instead of the repairs table
+    """
+    query = db.session.query(
+        RepairDailyStats.status,
+        func.sum(RepairDailyStats.repair_count),
+        func.coalesce(func.sum(RepairDailyStats.revenue), 0.0)
+    )
+    if start is not None:
+        query = query.filter(RepairDailyStats.day >= start)
+    if end is not None:
+        query = query.filter(RepairDailyStats.day < end)
+    if status:
+        query = query.filter(RepairDailyStats.status == status)
+    if device_type:
+        query = query.filter(RepairDailyStats.device_type == device_type)
+    return summarize(query.group_by(RepairDailyStats.status).all())
+
+def expected_buckets():
+    """Recompute every bucket from the repairs table"""
+    day = func.date(Repair.created_at)
+    rows = db.session.query(
+        day,
+        Repair.device_type,
+        func.coalesce(Repair.status, 'Received'),
+        func.count(Repair.id),
+        func.coalesce(func.sum(Repair.actual_cost), 0.0)
+    ).filter(Repair.created_at.isnot(None)).group_by(
+        day, Repair.device_type, func.coalesce(Repair.status, 'Received')
+    ).all()
+
+    return {
+        (_day(d), device_type, status): (int(count), float(revenue))
+        for d, device_type, status, count, revenue in rows
+    }
+
+def stored_buckets():
+    """Read every non-empty bucket from the rollup table"""
+    return {
+        (row.day, row.device_type, row.status): (row.repair_count, row.revenue)
+        for row in RepairDailyStats.query.all()
+        if row.repair_count or row.revenue
+    }
+
+def find_drift():
+    """Return {bucket: (expected, stored)} for buckets that disagree"""
+    expected = expected_buckets()
+    stored = stored_buckets()
+    drift = {}
+
+    for key in set(expected) | set(stored):
+        want = expected.get(key, (0, 0.0))
+        have = stored.get(key, (0, 0.0))
+        if want[0] != have[0] or round(want[1] - have[1], 2) != 0:
+            drift[key] = (want, have)
+
+    return drift
+
+@task('rollup.rebuild')
+def rebuild():
+    """Replace the rollup table with buckets recomputed from repairs"""
+    RepairDailyStats.query.delete(synchronize_session=False)
+    buckets = expected_buckets()
+    db.session.bulk_insert_mappings(RepairDailyStats, [
+        {
+            'day': day,
+            'device_type': device_type,
+            'status': status,
+            'repair_count': count,
+            'revenue': revenue
+        }
+        for (day, device_type, status), (count, revenue) in buckets.items()
+    ])
+    db.session.commit()
+    return len(buckets)
+
+@rollup_cli.command('rebuild')
+def rebuild_command():
+    """Rebuild the daily rollup from scratch"""
+    count = rebuild()
+    click.echo(f"✓ Rebuilt repair_daily_stats ({count} buckets)")
+
+@rollup_cli.command('check')
+@click.option('--fix', is_flag=True, help='Rebuild the rollup if drift is found.')
+def check_command(fix):
+    """Compare the rollup with the repairs table"""
+    drift = find_drift()
+    if not drift:
+        click.echo("✓ repair_daily_stats is in sync")
+        return
+
+    for (day, device_type, status), (want, have) in sorted(drift.items(), key=lambda item: str(item[0])):
+        click.echo(f"✗ {day} {device_type} {status}: expected {want[0]} / {want[1]:.2f}, "
+                   f"stored {have[0]} / {have[1]:.2f}")
+
+    if fix:
+        rebuild()
+        click.echo(f"✓ Rebuilt repair_daily_stats after {len(drift)} drifted bucket(s)")
+    else:
+        sys.exit(1)
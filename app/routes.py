@@ -1,9 +1,25 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app, abort, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import Admin, Customer, Repair, Payment
-from app.utils import generate_tracking_id, calculate_stats
+from app.models import Admin, Customer, Repair, Payment, Job
+from app.utils import calculate_stats
+from app.pagination import keyset_page
+from app.export import REPAIR_COLUMNS, PAYMENT_COLUMNS, repair_rows, payment_rows, stream_export
+from app.reports import report_period, range_filters, repairs_between
+from app.search import search_repairs
+from app.tracking import tracking_view, invalidate_tracking
+from app.booking import parse_booking, create_bookings
+from app.database import write_transaction
+from app.rollup import record_repair_change, rollup_stats
+from app.conditional import page_etag, etag_for, is_fresh, not_modified, with_validators
+from app.history import bottlenecks, repair_timeline, time_in_status
+from app.analytics import GROUPINGS, turnaround_report
+from app.jobs import DEAD, enqueue, queue_stats, retry_dead
+from app.notifications import queue_notification
+from app.ledger import add_payment as stage_payment, void_payment as stage_void, outstanding_balances, outstanding_total
 from datetime import datetime, timedelta
+import functools
 import json
 
 # Create blueprints
@@ -23,61 +39,21 @@ def index():
 def book_repair():
     """Booking form for customers"""
     if request.method == 'POST':
-        # Get form data
-        name = request.form.get('name')
-        phone = request.form.get('phone')
-        email = request.form.get('email')
-        device_type = request.form.get('device_type')
-        brand = request.form.get('brand')
-        model = request.form.get('model')
-        problem = request.form.get('problem')
-        deposit = request.form.get('deposit', 0.0)
-        
-        # Validate required fields
-        if not all([name, phone, device_type, brand, model, problem]):
-            flash('Please fill in all required fields', 'danger')
+        try:
+            booking = parse_booking(request.form.to_dict())
+        except ValueError as e:
+            flash(str(e), 'danger')
             return render_template('book_repair.html')
         
         try:
-            # Create or find customer
-            customer = Customer.query.filter_by(phone=phone).first()
-            if not customer:
-                customer = Customer(
-                    name=name,
-                    phone=phone,
-                    email=email,
-                    address=request.form.get('address', '')
-                )
-                db.session.add(customer)
-                db.session.commit()
-            
-            # Create repair record
-            repair = Repair(
-                tracking_id=generate_tracking_id(),
-                customer_id=customer.id,
-                device_type=device_type,
-                brand=brand,
-                model=model,
-                serial_number=request.form.get('serial_number', ''),
-                problem_description=problem,
-                deposit_paid=float(deposit) if deposit else 0.0,
-                status='Received'
-            )
+            # Customer, repair, deposit and the confirmation in the outbox go
+            # in as a single transaction; the worker sends the message
+            def book():
+                repair = create_bookings([booking])[0]
+                queue_notification(repair, 'booked')
+                return repair
             
-            db.session.add(repair)
-            db.session.commit()
-            
-            # If deposit was paid, create payment record
-            if deposit and float(deposit) > 0:
-                payment = Payment(
-                    repair_id=repair.id,
-                    amount=float(deposit),
-                    payment_method=request.form.get('payment_method', 'Cash'),
-                    reference=request.form.get('payment_reference', ''),
-                    notes='Initial deposit'
-                )
-                db.session.add(payment)
-                db.session.commit()
+            repair = write_transaction(book)
             
             flash(f'Repair booked successfully! Your Tracking ID: {repair.tracking_id}', 'success')
             return redirect(url_for('main.booking_success', tracking_id=repair.tracking_id))
@@ -91,25 +67,41 @@ def book_repair():
 @main_bp.route('/booking-success/<tracking_id>')
 def booking_success(tracking_id):
     """Display success page after booking"""
-    repair = Repair.query.filter_by(tracking_id=tracking_id).first_or_404()
-    return render_template('booking_success.html', repair=repair)
+    repair = tracking_view(tracking_id)
+    if repair is None:
+        abort(404)
+    
+    etag = page_etag('booking_success', repair.tracking_id, repair.updated_at)
+    if is_fresh(etag, repair.updated_at):
+        return not_modified(etag, repair.updated_at)
+    return with_validators(render_template('booking_success.html', repair=repair),
+                           etag, repair.updated_at)
 
 @main_bp.route('/track-repair', methods=['GET', 'POST'])
 def track_repair():
     """Track repair status"""
     repair = None
     
-    if request.method == 'POST':
-        tracking_id = request.form.get('tracking_id', '').strip().upper()
-        
+    # Shared links use ?tracking_id=..., the form posts it
+    tracking_id = request.values.get('tracking_id', '').strip().upper()
+    
+    if request.method == 'POST' or tracking_id:
         if tracking_id:
-            repair = Repair.query.filter_by(tracking_id=tracking_id).first()
+            repair = tracking_view(tracking_id)
             if not repair:
                 flash('Invalid tracking ID. Please check and try again.', 'danger')
         else:
             flash('Please enter a tracking ID', 'warning')
     
-    return render_template('track_repair.html', repair=repair)
+    if repair is None or request.method == 'POST':
+        return render_template('track_repair.html', repair=repair)
+    
+    # Shared links and polling clients revalidate for almost nothing
+    etag = page_etag('track_repair', repair.tracking_id, repair.updated_at)
+    if is_fresh(etag, repair.updated_at):
+        return not_modified(etag, repair.updated_at)
+    return with_validators(render_template('track_repair.html', repair=repair),
+                           etag, repair.updated_at)
 
 # ======================
 # ADMIN ROUTES
@@ -149,24 +141,16 @@ def logout():
 @login_required
 def dashboard():
     """Admin dashboard"""
-    # Get recent repairs
-    recent_repairs = Repair.query.order_by(Repair.created_at.desc()).limit(10).all()
-    
-    # Get all repairs for statistics
-    all_repairs = Repair.query.all()
+    # Recent repairs: left as a query, it only runs when the cached fragment is stale
+    recent_repairs = Repair.query.order_by(Repair.created_at.desc()).limit(10)
     
-    # Calculate statistics
-    stats = calculate_stats(all_repairs)
-    
-    # Get repairs by status
-    status_counts = {}
-    for status in ['Received', 'Diagnosing', 'Waiting for Parts', 'Repairing', 'Testing', 'Completed', 'Ready for Pickup']:
-        status_counts[status] = Repair.query.filter_by(status=status).count()
+    # Statistics and the status breakdown come from one grouped query, run
+    # at most once per request and only when a cached fragment is stale
+    load_stats = functools.cache(calculate_stats)
     
     return render_template('admin/dashboard.html', 
                          repairs=recent_repairs, 
-                         stats=stats,
-                         status_counts=status_counts)
+                         load_stats=load_stats)
 
 @admin_bp.route('/repairs')
 @login_required
@@ -174,22 +158,39 @@ def repairs():
     """List all repairs with filtering"""
     status_filter = request.args.get('status', 'all')
     search_query = request.args.get('search', '')
-    
-    query = Repair.query
-    
-    if status_filter != 'all':
-        query = query.filter_by(status=status_filter)
+    cursor = request.args.get('after')
+    per_page = request.args.get('per_page', current_app.config['REPAIRS_PER_PAGE'], type=int)
+    per_page = max(1, min(per_page or 1, 500))
+    page = max(request.args.get('page', 1, type=int) or 1, 1)
+    next_cursor = next_page = None
     
     if search_query:
-        query = query.filter(
-            (Repair.tracking_id.contains(search_query)) |
-            (Repair.model.contains(search_query)) |
-            (Repair.brand.contains(search_query))
+        # Ranked full-text search, paginated by page number
+        repairs, has_next = search_repairs(
+            search_query,
+            status=None if status_filter == 'all' else status_filter,
+            page=page,
+            per_page=per_page
         )
+        next_page = page + 1 if has_next else None
+    else:
+        # Load customers in the same query to avoid one lazy load per row
+        query = Repair.query.options(joinedload(Repair.customer))
+        
+        if status_filter != 'all':
+            query = query.filter_by(status=status_filter)
+        
+        repairs, next_cursor = keyset_page(query, cursor, per_page)
     
-    repairs = query.order_by(Repair.created_at.desc()).all()
-    
-    return render_template('admin/repairs.html', repairs=repairs, status_filter=status_filter)
+    return render_template('admin/repairs.html',
+                         repairs=repairs,
+                         status_filter=status_filter,
+                         search_query=search_query,
+                         per_page=per_page,
+                         cursor=cursor,
+                         next_cursor=next_cursor,
+                         page=page,
+                         next_page=next_page)
 
 @admin_bp.route('/repair/<int:repair_id>', methods=['GET', 'POST'])
 @login_required
@@ -198,54 +199,354 @@ def repair_detail(repair_id):
     repair = Repair.query.get_or_404(repair_id)
     
     if request.method == 'POST':
-        # Update repair details
-        repair.status = request.form.get('status', repair.status)
-        repair.internal_notes = request.form.get('internal_notes', repair.internal_notes)
-        repair.estimated_cost = float(request.form.get('estimated_cost', 0) or 0)
-        repair.actual_cost = float(request.form.get('actual_cost', 0) or 0)
-        repair.is_paid = 'is_paid' in request.form
-        
-        if repair.status == 'Completed' and not repair.completed_at:
-            repair.completed_at = datetime.utcnow()
-        
-        repair.updated_by = current_user.id
-        repair.updated_at = datetime.utcnow()
+        def apply_changes():
+            old_status, old_cost = repair.status, repair.actual_cost
+            
+            # Update repair details
+            repair.status = request.form.get('status', repair.status)
+            repair.internal_notes = request.form.get('internal_notes', repair.internal_notes)
+            repair.estimated_cost = float(request.form.get('estimated_cost', 0) or 0)
+            repair.actual_cost = float(request.form.get('actual_cost', 0) or 0)
+            
+            if repair.status == 'Completed' and not repair.completed_at:
+                repair.completed_at = datetime.utcnow()
+            
+            repair.updated_by = current_user.id
+            repair.updated_at = datetime.utcnow()
+            
+            record_repair_change(repair, old_status, old_cost)
+            if repair.status != old_status:
+                # Outbox row in the same transaction; sent (coalesced) by the worker
+                queue_notification(repair)
         
-        db.session.commit()
+        write_transaction(apply_changes)
+        invalidate_tracking(repair.tracking_id)
         flash('Repair updated successfully!', 'success')
     
-    return render_template('admin/repair_detail.html', repair=repair)
+    payments = Payment.query.filter_by(repair_id=repair.id).order_by(Payment.created_at).all()
+    return render_template('admin/repair_detail.html', repair=repair, payments=payments,
+                           timeline=repair_timeline(repair.id))
+
+@admin_bp.route('/repair/<int:repair_id>/payments', methods=['POST'])
+@login_required
+def add_payment(repair_id):
+    """Record a payment; the repair's ledger totals follow automatically"""
+    repair = db.session.get(Repair, repair_id) or abort(404)
+    
+    try:
+        amount = float(request.form.get('amount') or 0)
+    except ValueError:
+        flash('Please enter a valid amount', 'danger')
+        return redirect(url_for('admin.repair_detail', repair_id=repair_id))
+    
+    try:
+        write_transaction(lambda: stage_payment(
+            repair,
+            amount,
+            payment_method=request.form.get('payment_method'),
+            reference=request.form.get('reference'),
+            notes=request.form.get('notes')
+        ))
+        flash(f'Payment of R{amount:.2f} recorded', 'success')
+    except ValueError as e:
+        flash(str(e), 'danger')
+    
+    return redirect(url_for('admin.repair_detail', repair_id=repair_id))
+
+@admin_bp.route('/payments/<int:payment_id>/void', methods=['POST'])
+@login_required
+def void_payment(payment_id):
+    """Void a payment (kept on record, no longer counted)"""
+    payment = db.session.get(Payment, payment_id) or abort(404)
+    
+    try:
+        write_transaction(lambda: stage_void(payment, request.form.get('reason')))
+        flash('Payment voided', 'info')
+    except ValueError as e:
+        flash(str(e), 'warning')
+    
+    return redirect(url_for('admin.repair_detail', repair_id=payment.repair_id))
+
+@admin_bp.route('/api/outstanding')
+@login_required
+def api_outstanding():
+    """Repairs with a balance due, largest first, plus the overall total"""
+    status = request.args.get('status') or None
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    count, total = outstanding_total(status)
+    
+    return jsonify({
+        'count': count,
+        'total_due': total,
+        'repairs': [{
+            'tracking_id': repair.tracking_id,
+            'customer': repair.customer.name if repair.customer else None,
+            'status': repair.status,
+            'total_paid': round(repair.total_paid, 2),
+            'balance_due': round(repair.balance_due, 2)
+        } for repair in outstanding_balances(status, limit)]
+    })
 
 @admin_bp.route('/api/stats')
 @login_required
 def api_stats():
     """API endpoint for statistics data"""
-    # Get repairs from last 30 days
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_repairs = Repair.query.filter(Repair.created_at >= thirty_days_ago).all()
+    # Get repairs from last 30 days (whole days, read from the daily rollup)
+    start = (datetime.utcnow() - timedelta(days=30)).date()
     
-    stats = calculate_stats(recent_repairs)
+    # Every rollup change comes with a repair insert/update, so the newest
+    # updated_at (an index lookup) versions the stats
+    changed = db.session.query(db.func.max(Repair.updated_at)).scalar()
+    etag = etag_for('api_stats', start, changed)
+    if is_fresh(etag, changed):
+        return not_modified(etag, changed)
     
-    return jsonify(stats)
+    stats = rollup_stats(start=start)
+    return with_validators(jsonify(stats), etag, changed)
+
+@admin_bp.route('/api/repairs/bulk', methods=['POST'])
+@login_required
+def api_bulk_intake():
+    """
+    Book a batch of repairs (JSON array of bookings) in one transaction.
+    Nothing is saved unless every booking is valid.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, list) or not payload:
+        return jsonify({'error': 'Expected a non-empty JSON array of bookings'}), 400
+    
+    limit = current_app.config['BULK_INTAKE_MAX']
+    if len(payload) > limit:
+        return jsonify({'error': f'At most {limit} bookings per request'}), 413
+    
+    bookings, errors = [], []
+    for index, item in enumerate(payload):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError('Each booking must be a JSON object')
+            bookings.append(parse_booking(item))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    
+    if errors:
+        return jsonify({'errors': errors}), 400
+    
+    # Booking confirmations go in the outbox with the repairs, as for the form
+    def book():
+        repairs = create_bookings(bookings)
+        for repair in repairs:
+            queue_notification(repair, 'booked')
+        return repairs
+    
+    try:
+        repairs = write_transaction(book)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'An error occurred: {str(e)}'}), 500
+    
+    return jsonify({
+        'created': len(repairs),
+        'tracking_ids': [repair.tracking_id for repair in repairs]
+    }), 201
+
+@admin_bp.route('/api/cache')
+@login_required
+def api_cache():
+    """Hit/miss counters for this worker's in-process caches"""
+    return jsonify({
+        'tracking': current_app.extensions['tracking_cache'].stats(),
+        'analytics': current_app.extensions['analytics_cache'].stats()
+    })
+
+@admin_bp.route('/api/status-times')
+@login_required
+def api_status_times():
+    """Time spent per status for stays begun in a period, and where open repairs sit now"""
+    start, end = _export_period()
+    device_filter = request.args.get('device_type') or None
+    return jsonify({
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'time_in_status': time_in_status(start, end, device_filter),
+        'bottlenecks': bottlenecks()
+    })
+
+def _analytics_period():
+    """Requested period, or the twelve months up to and including today"""
+    if any(key in request.args for key in ('start', 'end', 'month', 'year')):
+        start, end, label = report_period(request.args)
+        return start, end, label
+    today = datetime.utcnow().date()
+    year, month = divmod(today.year * 12 + today.month - 12, 12)
+    start = today.replace(year=year, month=month + 1, day=1)
+    return start, today + timedelta(days=1), f"{start:%b %Y} – {today:%d %b %Y}"
+
+@admin_bp.route('/api/turnaround')
+@login_required
+def api_turnaround():
+    """Turnaround percentiles for a period: overall and by device type, brand and month"""
+    try:
+        start, end, _ = _analytics_period()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(turnaround_report(start, end, request.args.get('device_type') or None))
+
+@admin_bp.route('/api/perf')
+@login_required
+def api_perf():
+    """Per-endpoint latency histograms and SQL accounting for this worker"""
+    recorder = current_app.extensions.get('perf')
+    if recorder is None:
+        return jsonify({'error': 'Performance metrics are disabled'}), 404
+    
+    snapshot = recorder.snapshot()
+    if request.args.get('reset') == '1':
+        recorder.reset()
+    return jsonify(snapshot)
+
+# Maintenance jobs the admin jobs page can start: task -> label
+MAINTENANCE_TASKS = {
+    'rollup.rebuild': 'Rebuild statistics rollup',
+    'ledger.rebuild': 'Rebuild payment ledger',
+    'search.rebuild': 'Rebuild search index'
+}
+
+@admin_bp.route('/jobs')
+@login_required
+def jobs():
+    """Background queue depth, latency and dead jobs"""
+    dead_jobs = Job.query.filter_by(status=DEAD).order_by(Job.finished_at.desc()).limit(50).all()
+    return render_template('admin/jobs.html', stats=queue_stats(), dead_jobs=dead_jobs,
+                           maintenance_tasks=MAINTENANCE_TASKS)
+
+@admin_bp.route('/jobs/enqueue', methods=['POST'])
+@login_required
+def enqueue_job():
+    """Queue a maintenance job for the worker and return straight away"""
+    task_name = request.form.get('task')
+    if task_name not in MAINTENANCE_TASKS:
+        abort(400)
+    
+    # Keyed by task, so repeated clicks share one queued job
+    write_transaction(lambda: enqueue(task_name, key=task_name))
+    flash(f'{MAINTENANCE_TASKS[task_name]} queued', 'info')
+    return redirect(url_for('admin.jobs'))
+
+@admin_bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+@login_required
+def retry_job(job_id):
+    """Give a dead job a fresh set of attempts"""
+    if retry_dead(job_id):
+        flash(f'Job {job_id} requeued', 'info')
+    else:
+        flash(f'Job {job_id} is not dead', 'warning')
+    return redirect(url_for('admin.jobs'))
+
+@admin_bp.route('/api/jobs')
+@login_required
+def api_jobs():
+    """Queue depth by status and task, and wait/run times of recent jobs"""
+    return jsonify(queue_stats())
 
 @admin_bp.route('/reports')
 @login_required
 def reports():
-    """Generate reports"""
-    # Get date range from request or default to current month
-    month = request.args.get('month', datetime.now().month)
-    year = request.args.get('year', datetime.now().year)
+    """Generate reports for a month or an arbitrary date range"""
+    try:
+        start, end, period_label = report_period(request.args)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('admin.reports'))
+    status_filter = request.args.get('status') or None
+    device_filter = request.args.get('device_type') or None
     
-    # Get repairs for the selected month
-    repairs = Repair.query.filter(
-        db.extract('month', Repair.created_at) == month,
-        db.extract('year', Repair.created_at) == year
-    ).all()
+    # Half-open created_at range, served by the created_at indexes. Left as a
+    # query so it only runs when the cached table fragment is stale.
+    repairs = repairs_between(start, end, status_filter, device_filter)
     
-    stats = calculate_stats(repairs)
+    # Totals come from the daily rollup (~1 row per day) rather than the repairs table
+    stats = rollup_stats(start, end, status_filter, device_filter)
     
     return render_template('admin/reports.html', 
                          repairs=repairs, 
                          stats=stats,
-                         month=month,
-                         year=year)
\ No newline at end of file
+                         # Called inside its cached fragment, so only on a miss
+                         status_times=lambda: time_in_status(start, end, device_filter),
+                         month=start.month,
+                         year=start.year,
+                         start=start,
+                         end=end - timedelta(days=1),
+                         period_label=period_label,
+                         status_filter=status_filter,
+                         device_filter=device_filter)
+
+@admin_bp.route('/analytics')
+@login_required
+def analytics():
+    """Median, p90 and p99 turnaround by device type, brand and month"""
+    try:
+        start, end, period_label = _analytics_period()
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('admin.analytics'))
+    device_filter = request.args.get('device_type') or None
+    return render_template('admin/analytics.html',
+                         report=turnaround_report(start, end, device_filter),
+                         groupings=GROUPINGS,
+                         start=start,
+                         end=end - timedelta(days=1),
+                         period_label=period_label,
+                         device_filter=device_filter)
+
+def _export_response(name, columns, rows):
+    """Stream an export as CSV (default) or JSONL, gzipped with ?gzip=1"""
+    fmt = 'jsonl' if request.args.get('format') == 'jsonl' else 'csv'
+    compress = request.args.get('gzip') in ('1', 'true', 'yes')
+    
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    mimetype = 'application/x-ndjson' if fmt == 'jsonl' else 'text/csv'
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    return Response(
+        stream_with_context(stream_export(columns, rows, fmt, compress)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+def _export_period():
+    """Date range for an export, or (None, None) for all history; 400 for a bad range"""
+    if any(key in request.args for key in ('start', 'end', 'month', 'year')):
+        try:
+            start, end, _ = report_period(request.args)
+        except ValueError as e:
+            abort(400, description=str(e))
+        return start, end
+    return None, None
+
+@admin_bp.route('/export/repairs')
+@login_required
+def export_repairs():
+    """Stream repairs (with customer details) as CSV or JSONL"""
+    start, end = _export_period()
+    status_filter = request.args.get('status') or None
+    device_filter = request.args.get('device_type') or None
+    
+    if start:
+        filters = range_filters(start, end, status_filter, device_filter)
+    else:
+        filters = []
+        if status_filter:
+            filters.append(Repair.status == status_filter)
+        if device_filter:
+            filters.append(Repair.device_type == device_filter)
+    
+    return _export_response('repairs', REPAIR_COLUMNS, repair_rows(filters))
+
+@admin_bp.route('/export/payments')
+@login_required
+def export_payments():
+    """Stream payments (with tracking ID and customer) as CSV or JSONL"""
+    start, end = _export_period()
+    return _export_response('payments', PAYMENT_COLUMNS, payment_rows(start, end))
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from app import db
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, upgrade from one process
+    fcntl = None
+
+# Head revision in migrations/versions. Boot only compares this string with
+# the database's alembic_version, so bump it with every new migration.
+SCHEMA_VERSION = '0010_ledger_payment_flags'
+# Schema the app had before migrations existed (databases made by create_all)
+BASELINE_VERSION = '0001_baseline'
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+def schema_version():
+    """Revision stored in the database, or None if it was never migrated"""
+    try:
+        with db.engine.connect() as connection:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+def schema_is_current():
+    return schema_version() == SCHEMA_VERSION
+
+@contextmanager
+def _upgrade_lock():
+    """Keep workers booting together on one host from migrating at once"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(tempfile.gettempdir(), 'mafadza_schema.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def upgrade_database():
+    """
+    Bring the database up to SCHEMA_VERSION (inside an app context).
+    Databases created by create_all before migrations are stamped at the
+    baseline first. Returns the revision the database was at.
+    """
+    from flask_migrate import stamp, upgrade
+
+    with _upgrade_lock():
+        version = schema_version()
+        if version == SCHEMA_VERSION:
+            return version
+        if version is None and inspect(db.engine).has_table('repair'):
+            stamp(revision=BASELINE_VERSION)
+        upgrade()
+        # Drop connections that cached the old schema
+        db.engine.dispose()
+        return version
+
+def ensure_schema(app):
+    """
+    Boot path: one query comparing the stored schema version with the code's.
+    Behind and SCHEMA_AUTO_UPGRADE on: migrate now. Behind and off: log it
+    and return False (run `flask db upgrade` or `python init_db.py`).
+    """
+    version = schema_version()
+    if version == SCHEMA_VERSION:
+        return True
+
+    if app.config.get('SCHEMA_AUTO_UPGRADE', True):
+        upgrade_database()
+        return True
+
+    app.logger.error(f"Database schema is at {version or 'no version'}, this code needs "
+                     f"{SCHEMA_VERSION}. Run `flask db upgrade` before serving traffic.")
+    return False
+
+def check_schema():
+    """Raise SchemaOutOfDate unless the database is at SCHEMA_VERSION"""
+    version = schema_version()
+    if version != SCHEMA_VERSION:
+        raise SchemaOutOfDate(f"Database schema is at {version or 'no version'}, "
+                              f"expected {SCHEMA_VERSION}")
+    return version
@@ -0,0 +1,265 @@
+import re
+import click
+from flask import current_app, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import joinedload
+from app import db
+from app.jobs import task
+from app.models import Customer, Repair
+
+search_cli = AppGroup('search', help='Maintain the repair full-text search index.')
+
+# Engines (by URL) that have a full-text index; anything else uses LIKE
+_indexed_engines = {}
+
+# Repair/Customer columns that feed the index
+REPAIR_FIELDS = ('tracking_id', 'device_type', 'brand', 'model', 'problem_description', 'customer_id')
+CUSTOMER_FIELDS = ('name', 'phone', 'phone_normalized')
+
+# A query made only of these, with at least this many digits, is a phone number
+PHONE_QUERY = re.compile(r'[\d\s+().-]+')
+PHONE_MIN_DIGITS = 7
+
+# The customer_phone field holds the number as entered with its punctuation
+# stripped, its E.164 digits and its national (0...) form, so '+27 71 599 1599',
+# '0715991599' and '27715991599' all find the same customer
+SQLITE_PHONE = """
+replace(replace(replace(replace(replace(replace(coalesce(c.phone, ''),
+    ' ', ''), '+', ''), '-', ''), '(', ''), ')', ''), '.', '') || ' ' ||
+coalesce(substr(c.phone_normalized, 2), '') || ' ' ||
+CASE WHEN c.phone_normalized LIKE '+' || :country_code || '%'
+     THEN '0' || substr(c.phone_normalized, length(:country_code) + 2) ELSE '' END
+"""
+
+POSTGRES_PHONE = """
+regexp_replace(coalesce(c.phone, ''), '\\D', '', 'g') || ' ' ||
+coalesce(substr(c.phone_normalized, 2), '') || ' ' ||
+CASE WHEN c.phone_normalized LIKE '+' || :country_code || '%'
+     THEN '0' || substr(c.phone_normalized, length(:country_code) + 2) ELSE '' END
+"""
+
+SQLITE_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS repair_search USING fts5(
+    tracking_id, device_type, brand, model, customer_name, customer_phone, problem_description,
+    tokenize = 'unicode61', prefix = '2 3 4'
+)
+"""
+
+SQLITE_DELETE = "DELETE FROM repair_search WHERE rowid IN (SELECT r.id FROM repair r WHERE {where})"
+
+SQLITE_INSERT = """
+INSERT INTO repair_search (rowid, tracking_id, device_type, brand, model,
+                           customer_name, customer_phone, problem_description)
+SELECT r.id, r.tracking_id, r.device_type, r.brand, r.model, c.name, {phone}, r.problem_description
+FROM repair r LEFT JOIN customer c ON c.id = r.customer_id
+WHERE {where}
+"""
+
+SQLITE_QUERY = """
+SELECT r.id FROM repair_search s JOIN repair r ON r.id = s.rowid
+WHERE repair_search MATCH :match {status_clause}
+ORDER BY bm25(repair_search, 10.0, 1.0, 3.0, 3.0, 5.0, 5.0, 1.0), r.created_at DESC
+LIMIT :limit OFFSET :offset
+"""
+
+POSTGRES_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS repair_search (
+        repair_id INTEGER PRIMARY KEY REFERENCES repair (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_repair_search_document ON repair_search USING GIN (document)",
+)
+
+POSTGRES_DELETE = "DELETE FROM repair_search WHERE repair_id IN (SELECT r.id FROM repair r WHERE {where})"
+
+POSTGRES_INSERT = """
+INSERT INTO repair_search (repair_id, document)
+SELECT r.id,
+       setweight(to_tsvector('simple', coalesce(r.tracking_id, '')), 'A') ||
+       setweight(to_tsvector('simple', coalesce(c.name, '') || ' ' || {phone}), 'A') ||
+       setweight(to_tsvector('simple', coalesce(r.brand, '') || ' ' || coalesce(r.model, '') || ' ' ||
+                                       coalesce(r.device_type, '')), 'B') ||
+       setweight(to_tsvector('simple', coalesce(r.problem_description, '')), 'C')
+FROM repair r LEFT JOIN customer c ON c.id = r.customer_id
+WHERE {where}
+ON CONFLICT (repair_id) DO UPDATE SET document = EXCLUDED.document
+"""
+
+POSTGRES_QUERY = """
+SELECT r.id FROM repair_search s JOIN repair r ON r.id = s.repair_id
+WHERE s.document @@ to_tsquery('simple', :match) {status_clause}
+ORDER BY ts_rank(s.document, to_tsquery('simple', :match)) DESC, r.created_at DESC
+LIMIT :limit OFFSET :offset
+"""
+
+def _backend(bind):
+    """Return 'sqlite', 'postgresql' or None for the given engine/connection"""
+    engine = getattr(bind, 'engine', bind)
+    return _indexed_engines.get(str(engine.url))
+
+def _phone_digits(search_query):
+    """The digits of a phone-number-shaped query ('+27 71-599 1599'), else None"""
+    if not search_query or not PHONE_QUERY.fullmatch(search_query.strip()):
+        return None
+    digits = re.sub(r'\D', '', search_query)
+    return digits if len(digits) >= PHONE_MIN_DIGITS else None
+
+def _terms(search_query):
+    """Split user input into plain word tokens; a phone number is one token"""
+    digits = _phone_digits(search_query)
+    if digits:
+        return [digits]
+    return re.findall(r'\w+', search_query or '')
+
+def _country_code():
+    return current_app.config['DEFAULT_COUNTRY_CODE'] if has_app_context() else '27'
+
+def _match_expression(backend, terms):
+    """Build a prefix-matching query for every term (all terms must match)"""
+    if backend == 'sqlite':
+        return ' '.join(f'"{term}"*' for term in terms)
+    return ' & '.join(f'{term}:*' for term in terms)
+
+def _reindex(connection, where, params):
+    """Rewrite the index rows for the repairs selected by `where`"""
+    backend = _backend(connection)
+    params = dict(params, country_code=_country_code())
+    if backend == 'sqlite':
+        connection.execute(text(SQLITE_DELETE.format(where=where)), params)
+        connection.execute(text(SQLITE_INSERT.format(where=where, phone=SQLITE_PHONE)), params)
+    elif backend == 'postgresql':
+        connection.execute(text(POSTGRES_INSERT.format(where=where, phone=POSTGRES_PHONE)), params)
+
+def init_search(app):
+    """
+    Create the full-text index for the app's database if it is missing.
+    SQLite gets an FTS5 table, PostgreSQL a tsvector table with a GIN index.
+    """
+    engine = db.engine
+    dialect = engine.dialect.name
+
+    with engine.begin() as connection:
+        if dialect == 'sqlite':
+            existed = inspect(connection).has_table('repair_search')
+            try:
+                connection.execute(text(SQLITE_DDL))
+            except Exception as e:
+                app.logger.warning(f"FTS5 unavailable, repair search falls back to LIKE: {e}")
+                return
+        elif dialect == 'postgresql':
+            existed = inspect(connection).has_table('repair_search')
+            for statement in POSTGRES_DDL:
+                connection.execute(text(statement))
+        else:
+            return
+
+        _indexed_engines[str(engine.url)] = dialect
+        if not existed:
+            _reindex(connection, '1 = 1', {})
+
+@task('search.rebuild')
+def rebuild_index():
+    """Rebuild the whole index from the repairs and customers tables"""
+    with db.engine.begin() as connection:
+        backend = _backend(connection)
+        if backend == 'sqlite':
+            connection.execute(text("DELETE FROM repair_search"))
+        elif backend == 'postgresql':
+            connection.execute(text("TRUNCATE repair_search"))
+        _reindex(connection, '1 = 1', {})
+    return backend
+
+def search_repairs(search_query, status=None, page=1, per_page=50):
+    """
+    Ranked search over tracking ID, device, customer name/phone and problem
+    description. Returns (repairs, has_next) for the requested page.
+    """
+    terms = _terms(search_query)
+    if not terms:
+        return [], False
+
+    backend = _backend(db.engine)
+    offset = (page - 1) * per_page
+
+    if backend is None:
+        return _like_search(search_query, status, offset, per_page)
+
+    sql = SQLITE_QUERY if backend == 'sqlite' else POSTGRES_QUERY
+    sql = sql.format(status_clause='AND r.status = :status' if status else '')
+    ids = db.session.execute(text(sql), {
+        'match': _match_expression(backend, terms),
+        'status': status,
+        'limit': per_page + 1,
+        'offset': offset
+    }).scalars().all()
+
+    has_next = len(ids) > per_page
+    ids = ids[:per_page]
+    if not ids:
+        return [], False
+
+    by_id = {
+        repair.id: repair
+        for repair in Repair.query.options(joinedload(Repair.customer)).filter(Repair.id.in_(ids))
+    }
+    return [by_id[repair_id] for repair_id in ids if repair_id in by_id], has_next
+
+def _like_search(search_query, status, offset, per_page):
+    """Unindexed fallback for databases without a full-text backend"""
+    query = Repair.query.options(joinedload(Repair.customer)).outerjoin(Customer)
+    digits = _phone_digits(search_query)
+    if digits:
+        # National or international, the significant digits sit inside the E.164 form
+        query = query.filter(Customer.phone_normalized.like(f"%{digits.lstrip('0')}%"))
+    else:
+        pattern = '%' + re.sub(r'([\\%_])', r'\\\1', search_query) + '%'
+        query = query.filter(
+            Repair.tracking_id.ilike(pattern, escape='\\') |
+            Repair.model.ilike(pattern, escape='\\') |
+            Repair.brand.ilike(pattern, escape='\\') |
+            Repair.problem_description.ilike(pattern, escape='\\') |
+            Customer.name.ilike(pattern, escape='\\') |
+            Customer.phone.ilike(pattern, escape='\\')
+        )
+    if status:
+        query = query.filter(Repair.status == status)
+
+    rows = query.order_by(Repair.created_at.desc(), Repair.id.desc()) \
+        .offset(offset).limit(per_page + 1).all()
+    return rows[:per_page], len(rows) > per_page
+
+def _changed(target, fields):
+    """True if any of `fields` changed in the flush being processed"""
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+@event.listens_for(Repair, 'after_insert')
+def _index_new_repair(mapper, connection, target):
+    _reindex(connection, 'r.id = :id', {'id': target.id})
+
+@event.listens_for(Repair, 'after_update')
+def _index_updated_repair(mapper, connection, target):
+    if _changed(target, REPAIR_FIELDS):
+        _reindex(connection, 'r.id = :id', {'id': target.id})
+
+@event.listens_for(Repair, 'after_delete')
+def _unindex_repair(mapper, connection, target):
+    if _backend(connection) == 'sqlite':
+        connection.execute(text("DELETE FROM repair_search WHERE rowid = :id"), {'id': target.id})
+
+@event.listens_for(Customer, 'after_update')
+def _index_customer_repairs(mapper, connection, target):
+    if _changed(target, CUSTOMER_FIELDS):
+        _reindex(connection, 'r.customer_id = :id', {'id': target.id})
+
+@search_cli.command('reindex')
+def reindex_command():
+    """Rebuild the repair search index"""
+    backend = rebuild_index()
+    if backend:
+        click.echo(f"✓ Rebuilt repair_search ({backend})")
+    else:
+        click.echo("✗ No full-text backend for this database; search uses LIKE")
@@ -0,0 +1,55 @@
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import Repair
+
+# Status groupings used by the dashboard cards
+COMPLETED_STATUSES = ('Completed', 'Ready for Pickup')
+WAITING_STATUS = 'Waiting for Parts'
+
+def status_rows(filters=None):
+    """
+    Return (status, count, revenue) rows from a single grouped query
+    """
+    query = db.session.query(
+        Repair.status,
+        func.count(Repair.id),
+        func.coalesce(func.sum(Repair.actual_cost), 0.0)
+    )
+    if filters:
+        query = query.filter(*filters)
+    return query.group_by(Repair.status).all()
+
+def summarize(rows):
+    """Fold (status, count, revenue) rows into the stats dictionary"""
+    stats = {
+        'total': 0,
+        'completed': 0,
+        'in_progress': 0,
+        'waiting_parts': 0,
+        'revenue': 0.0,
+        'by_status': {status: 0 for status in current_app.config['STATUS_OPTIONS']}
+    }
+
+    for status, count, revenue in rows:
+        count = int(count or 0)
+        status = status or 'Unknown'
+        stats['total'] += count
+        stats['revenue'] += float(revenue or 0)
+        stats['by_status'][status] = stats['by_status'].get(status, 0) + count
+
+        if status in COMPLETED_STATUSES:
+            stats['completed'] += count
+        elif status == WAITING_STATUS:
+            stats['waiting_parts'] += count
+        else:
+            stats['in_progress'] += count
+
+    return stats
+
+def repair_stats(filters=None):
+    """
+    Compute totals, revenue and the per-status breakdown in SQL.
+    `filters` is an optional list of SQLAlchemy criteria on Repair.
+    """
+    return summarize(status_rows(filters))
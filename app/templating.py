@@ -0,0 +1,101 @@
+import os
+import tempfile
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.cache import TTLCache, read_stamp, touch_stamp
+from app.models import Customer, Repair
+
+class FragmentCache:
+    """
+    Rendered template fragments, per worker. Repair and customer commits
+    clear it here and touch a stamp file that clears it in other workers;
+    the TTL bounds staleness across hosts.
+    """
+
+    def __init__(self, maxsize=256, ttl=300, stamp_file=None):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.stamp_file = stamp_file
+        self._stamp = read_stamp(stamp_file)
+
+    def get_or_render(self, key, render):
+        stamp = read_stamp(self.stamp_file)
+        if stamp != self._stamp:
+            self.cache.clear()
+            self._stamp = stamp
+        return self.cache.get_or_load(key, render)
+
+    def invalidate(self):
+        self.cache.clear()
+        touch_stamp(self.stamp_file)
+        self._stamp = read_stamp(self.stamp_file)
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache 'name', key_part, ... %}...{% endcache %}
+    The name and key parts identify the fragment; everything the block shows
+    must follow from them or from repair/customer data.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render', [nodes.List(key)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        cache = current_app.extensions.get('fragment_cache')
+        if cache is None:
+            return caller()
+        return cache.get_or_render(repr(tuple(key)), lambda: Markup(caller()))
+
+@event.listens_for(Repair, 'after_insert')
+@event.listens_for(Repair, 'after_update')
+@event.listens_for(Repair, 'after_delete')
+@event.listens_for(Customer, 'after_update')
+@event.listens_for(Customer, 'after_delete')
+def _mark_fragments_stale(mapper, connection, target):
+    session = inspect(target).session
+    if session is not None:
+        session.info['fragments_stale'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_fragments(session):
+    if not session.info.pop('fragments_stale', False):
+        return
+    try:
+        cache = current_app.extensions.get('fragment_cache')
+    except RuntimeError:
+        cache = None
+    if cache is not None:
+        cache.invalidate()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_fragment_writes(session):
+    session.info.pop('fragments_stale', None)
+
+def init_templating(app):
+    """Persistent Jinja bytecode cache and the {% cache %} fragment cache"""
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if directory is None:
+        directory = os.path.join(tempfile.gettempdir(), 'mafadza-jinja')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        # Compiled templates shared by every worker (and restart) on the host
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.extensions['fragment_cache'] = FragmentCache(
+        maxsize=app.config.get('FRAGMENT_CACHE_SIZE', 256),
+        ttl=app.config.get('FRAGMENT_CACHE_TTL', 300),
+        stamp_file=app.config.get('FRAGMENT_CACHE_STAMP_FILE') or
+            os.path.join(tempfile.gettempdir(), 'mafadza_fragments.stamp')
+    )
@@ -0,0 +1,171 @@
+import os
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.cache import TTLCache, read_stamp, touch_stamp
+from app.models import Repair, TrackingSequence
+
+TRACKING_PREFIX = 'MFZ'
+SUFFIX_WIDTH = 4
+
+# Everything the public tracking pages render, detached from the session
+TrackingView = namedtuple('TrackingView', [
+    'tracking_id', 'status', 'status_color', 'device_type', 'brand', 'model',
+    'created_at', 'updated_at', 'completed_at'
+])
+
+def format_tracking_id(day, value):
+    """
+    Format MFZYYYYMMDDXXXX. The suffix is zero-padded to four digits and
+    simply grows wider on days with more than 9999 bookings; the date part
+    has a fixed width, so wider IDs can never collide with other days.
+    """
+    return f"{TRACKING_PREFIX}{day}{str(value).zfill(SUFFIX_WIDTH)}"
+
+class TrackingIdAllocator:
+    """
+    Hands out tracking IDs from a per-day database sequence.
+
+    Each process reserves a block of values at a time in its own short
+    transaction, so most IDs are served from memory. Blocks are never
+    returned, which leaves gaps after restarts but never duplicates.
+    """
+
+    def __init__(self, engine, block_size=20):
+        self.engine = engine
+        self.block_size = max(int(block_size), 1)
+        self._lock = threading.Lock()
+        self._day = None
+        self._next = 0
+        self._end = 0
+        self._pid = None
+
+    def allocate(self, now=None):
+        """Return the next unused tracking ID for today"""
+        day = (now or datetime.now()).strftime('%Y%m%d')
+
+        with self._lock:
+            # A forked worker must not reuse its parent's block
+            if self._day != day or self._pid != os.getpid() or self._next >= self._end:
+                self._next, self._end = self._reserve(day)
+                self._day, self._pid = day, os.getpid()
+
+            value = self._next
+            self._next += 1
+
+        return format_tracking_id(day, value)
+
+    def _reserve(self, day):
+        """Reserve [start, end) for `day` in its own committed transaction"""
+        table = TrackingSequence.__table__
+
+        while True:
+            try:
+                with self.engine.begin() as connection:
+                    updated = connection.execute(
+                        update(table)
+                        .where(table.c.day == day)
+                        .values(next_value=table.c.next_value + self.block_size)
+                    ).rowcount
+
+                    if updated:
+                        end = connection.execute(
+                            select(table.c.next_value).where(table.c.day == day)
+                        ).scalar_one()
+                        return end - self.block_size, end
+
+                    start = self._first_free_value(connection, day)
+                    connection.execute(
+                        insert(table).values(day=day, next_value=start + self.block_size)
+                    )
+                    return start, start + self.block_size
+            except IntegrityError:
+                # Another worker created today's row first; take the update path
+                continue
+
+    def _first_free_value(self, connection, day):
+        """
+        First value for a new day's sequence, past any IDs already issued
+        for that day (e.g. by the old random generator)
+        """
+        prefix = f"{TRACKING_PREFIX}{day}"
+        existing = connection.execute(
+            select(Repair.tracking_id).where(Repair.tracking_id.like(f"{prefix}%"))
+        ).scalars()
+
+        highest = 0
+        for tracking_id in existing:
+            suffix = tracking_id[len(prefix):]
+            if suffix.isdigit():
+                highest = max(highest, int(suffix))
+        return highest + 1
+
+def _load_tracking_view(tracking_id):
+    repair = Repair.query.filter_by(tracking_id=tracking_id).first()
+    if repair is None:
+        return None
+    return TrackingView(
+        tracking_id=repair.tracking_id,
+        status=repair.status,
+        status_color=repair.get_status_color(),
+        device_type=repair.device_type,
+        brand=repair.brand,
+        model=repair.model,
+        created_at=repair.created_at,
+        updated_at=repair.updated_at,
+        completed_at=repair.completed_at
+    )
+
+class TrackingViewCache:
+    """
+    Tracking views, per worker. Invalidating one drops it here and touches a
+    stamp file whose changed mtime flushes the cache in the other workers
+    on the host; the TTL bounds staleness across hosts.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, stamp_file=None):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.stamp_file = stamp_file
+        self._stamp = read_stamp(stamp_file)
+
+    def get_or_load(self, tracking_id, loader):
+        stamp = read_stamp(self.stamp_file)
+        if stamp != self._stamp:
+            self.cache.clear()
+            self._stamp = stamp
+        return self.cache.get_or_load(tracking_id, loader)
+
+    def invalidate(self, tracking_id):
+        self.cache.invalidate(tracking_id)
+        touch_stamp(self.stamp_file)
+        self._stamp = read_stamp(self.stamp_file)
+
+    def stats(self):
+        return self.cache.stats()
+
+def tracking_view(tracking_id):
+    """Cached view model for the public tracking pages, or None if unknown"""
+    cache = current_app.extensions['tracking_cache']
+    return cache.get_or_load(tracking_id, lambda: _load_tracking_view(tracking_id))
+
+def invalidate_tracking(tracking_id):
+    """Drop a repair's cached view after it has been changed, in every worker"""
+    current_app.extensions['tracking_cache'].invalidate(tracking_id)
+
+def init_tracking(app):
+    """Attach the tracking ID allocator and tracking view cache to the app"""
+    app.extensions['tracking_ids'] = TrackingIdAllocator(
+        db.engine,
+        app.config.get('TRACKING_ID_BLOCK_SIZE', 20)
+    )
+    app.extensions['tracking_cache'] = TrackingViewCache(
+        maxsize=app.config.get('TRACKING_CACHE_SIZE', 1024),
+        ttl=app.config.get('TRACKING_CACHE_TTL', 60),
+        stamp_file=app.config.get('TRACKING_CACHE_STAMP_FILE') or
+            os.path.join(tempfile.gettempdir(), 'mafadza_tracking.stamp')
+    )
@@ -1,19 +1,40 @@
-import random
-from datetime import datetime
-from flask import current_app
+import re
+from flask import current_app, has_app_context
 
 def generate_tracking_id():
     """
     Generate unique tracking ID in format: MFZYYYYMMDDXXXX
     Example: MFZ202412250015
+    IDs come from a per-day sequence (see app.tracking), so they never collide.
     """
-    today = datetime.now()
-    base_id = f"MFZ{today.strftime('%Y%m%d')}"
+    return current_app.extensions['tracking_ids'].allocate()
+
+def normalize_phone(phone, country_code=None):
+    """
+    Normalize a phone number to E.164 (e.g. '071 599 1599' -> '+27715991599').
+    National numbers get the configured DEFAULT_COUNTRY_CODE.
+    Returns None if the input cannot be a valid number.
+    """
+    if not phone:
+        return None
+    if country_code is None:
+        country_code = current_app.config['DEFAULT_COUNTRY_CODE'] if has_app_context() else '27'
     
-    # Generate random 4-digit number
-    random_suffix = str(random.randint(0, 9999)).zfill(4)
+    phone = phone.strip()
+    digits = re.sub(r'\D', '', phone)
     
-    return f"{base_id}{random_suffix}"
+    if phone.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = country_code + digits[1:]
+    elif not digits.startswith(country_code) or len(digits) <= 9:
+        digits = country_code + digits
+    
+    if not 8 <= len(digits) <= 15 or digits.startswith('0'):
+        return None
+    return f"+{digits}"
 
 def format_currency(amount):
     """Format amount as currency"""
@@ -36,24 +57,20 @@ def get_device_brands(device_type):
     else:
         return ['Apple', 'Samsung', 'Dell', 'HP', 'Lenovo', 'Other']
 
-def calculate_stats(repairs):
-    """Calculate repair statistics"""
-    stats = {
-        'total': len(repairs),
-        'completed': 0,
-        'in_progress': 0,
-        'waiting_parts': 0,
-        'revenue': 0
-    }
-    
+def calculate_stats(repairs=None, filters=None):
+    """
+    Calculate repair statistics.
+    With no `repairs` the numbers come from a single grouped SQL query
+    (optionally narrowed by `filters`); passing a list of Repair objects
+    keeps the old in-Python behaviour for callers that already have them.
+    """
+    from app.stats import repair_stats, summarize
+    if repairs is None:
+        return repair_stats(filters)
+
+    # Same (status, count, revenue) rows as the SQL path, so both return the same keys
+    totals = {}
     for repair in repairs:
-        if repair.status in ['Completed', 'Ready for Pickup']:
-            stats['completed'] += 1
-        elif repair.status == 'Waiting for Parts':
-            stats['waiting_parts'] += 1
-        else:
-            stats['in_progress'] += 1
-        
-        stats['revenue'] += repair.actual_cost or 0
-    
-    return stats
\ No newline at end of file
+        count, revenue = totals.get(repair.status, (0, 0.0))
+        totals[repair.status] = (count + 1, revenue + (repair.actual_cost or 0.0))
+    return summarize((status, count, revenue) for status, (count, revenue) in totals.items())
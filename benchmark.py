@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Route benchmark suite for MafadzaTechSolutions
+Generates a synthetic dataset per size, drives every main route through the
+Flask test client and reports latency, SQL query count and peak memory.
+Results are written as JSON so runs can be compared between commits.
+
+Usage:
+  python benchmark.py --sizes 10k,100k --output bench.json
+  python benchmark.py --sizes 10k --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from seed_data import generate, make_config, parse_size
+
+ADMIN_USERNAME = 'bench'
+ADMIN_PASSWORD = 'bench-password'
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_scenarios(tracking_ids, rng):
+    """(name, method, url, form data factory) for every route under test"""
+    booking_counter = iter(range(10**9))
+
+    def booking():
+        index = next(booking_counter)
+        return {
+            'name': 'Bench Customer',
+            'phone': f'07299{index:05d}',
+            'device_type': 'Phone',
+            'brand': 'Samsung',
+            'model': 'Galaxy S23',
+            'problem': 'Benchmark booking',
+            'deposit': '20'
+        }
+
+    now = datetime.utcnow()
+    return [
+        ('index', 'GET', lambda: '/', None),
+        ('track_repair', 'POST', lambda: '/track-repair',
+         lambda: {'tracking_id': rng.choice(tracking_ids)}),
+        ('booking_success', 'GET', lambda: f'/booking-success/{rng.choice(tracking_ids)}', None),
+        ('book_repair', 'POST', lambda: '/book-repair', booking),
+        ('dashboard', 'GET', lambda: '/admin/dashboard', None),
+        ('repairs', 'GET', lambda: '/admin/repairs', None),
+        ('repairs_search', 'GET', lambda: '/admin/repairs?search=galaxy screen', None),
+        ('reports', 'GET', lambda: f'/admin/reports?month={now.month}&year={now.year}', None),
+        ('api_stats', 'GET', lambda: '/admin/api/stats', None),
+    ]
+
+def run_scenario(client, counter, method, url, data, iterations):
+    """Time `iterations` requests, then one more under tracemalloc for peak memory"""
+    latencies, queries = [], []
+    status = None
+
+    for _ in range(iterations):
+        before = counter[0]
+        started = time.perf_counter()
+        response = client.open(url(), method=method, data=data() if data else None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(counter[0] - before)
+        status = response.status_code
+
+    tracemalloc.start()
+    client.open(url(), method=method, data=data() if data else None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': status,
+        'iterations': iterations,
+        'mean_ms': round(statistics.mean(latencies), 2),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'max_ms': round(max(latencies), 2),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+def benchmark_size(size, iterations, workdir, echo=print):
+    from sqlalchemy import event
+    from app import create_app, db
+    from app.models import Admin, Repair
+
+    database = os.path.join(workdir, f'bench_{size}.db')
+    if os.path.exists(database):
+        os.remove(database)
+
+    config = make_config(f'sqlite:///{database}')
+    config.PERF_ENABLED = False
+    app = create_app(config)
+
+    with app.app_context():
+        generate(size, echo=lambda message: echo(f"  {message}"))
+        admin = Admin(username=ADMIN_USERNAME, email='bench@example.com')
+        admin.set_password(ADMIN_PASSWORD)
+        db.session.add(admin)
+        db.session.commit()
+        tracking_ids = [row[0] for row in db.session.query(Repair.tracking_id).limit(5000)]
+
+        counter = [0]
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *args: counter.__setitem__(0, counter[0] + 1))
+
+    client = app.test_client()
+    client.post('/admin/login', data={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+
+    results = {}
+    for name, method, url, data in build_scenarios(tracking_ids, random.Random(7)):
+        results[name] = run_scenario(client, counter, method, url, data, iterations)
+        row = results[name]
+        echo(f"  {name:<16} p50 {row['p50_ms']:>8.2f} ms  p95 {row['p95_ms']:>8.2f} ms  "
+             f"{row['queries']:>3} queries  {row['peak_kb']:>9.1f} KB peak  [{row['status']}]")
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    return results
+
+def compare(previous, current, threshold=0.2, echo=print):
+    """Print routes whose p50 latency or query count got worse"""
+    regressions = 0
+    for size, routes in current['results'].items():
+        for name, row in routes.items():
+            old = previous.get('results', {}).get(size, {}).get(name)
+            if not old:
+                continue
+            if row['p50_ms'] > old['p50_ms'] * (1 + threshold) or row['queries'] > old['queries']:
+                regressions += 1
+                echo(f"✗ {size} {name}: p50 {old['p50_ms']} -> {row['p50_ms']} ms, "
+                     f"queries {old['queries']} -> {row['queries']}")
+    if not regressions:
+        echo("✓ No regressions against previous results")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the main routes at production-like sizes')
+    parser.add_argument('--sizes', default='10k', help='Comma separated sizes: 10k,100k,1m or integers')
+    parser.add_argument('--iterations', type=int, default=20, help='Requests per route')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='Previous results JSON to check for regressions')
+    parser.add_argument('--workdir', default=tempfile.gettempdir(), help='Where benchmark databases go')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MafadzaTechSolutions - Route Benchmarks")
+    print("=" * 60)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'iterations': args.iterations,
+        'results': {}
+    }
+
+    for label in args.sizes.split(','):
+        size = parse_size(label.strip())
+        print(f"\n{size:,} repairs")
+        report['results'][str(size)] = benchmark_size(size, args.iterations, args.workdir)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(json.load(f), report):
+                sys.exit(1)
+
+if __name__ == '__main__':
+    main()
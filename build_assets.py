@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Static asset build for MafadzaTechSolutions
+Writes content-hashed copies of app/templates/static into its build/ folder,
+with gzip and brotli variants and a manifest. Templates reference assets
+through asset_url(), which picks up the manifest when the app starts.
+
+Usage:
+  python build_assets.py
+"""
+
+import argparse
+import os
+
+from app.assets import build_assets
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'templates', 'static')
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint and pre-compress static assets')
+    parser.add_argument('--static-dir', default=STATIC_DIR, help='Static folder to build')
+    parser.add_argument('--quiet', action='store_true', help='Only print the summary')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MafadzaTechSolutions - Static Asset Build")
+    print("=" * 60)
+
+    manifest = build_assets(args.static_dir, echo=(lambda message: None) if args.quiet else print)
+    print(f"✓ {len(manifest)} asset(s) written to {os.path.join(args.static_dir, 'build')}")
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,30 @@ class Config:
         'sqlite:///' + os.path.join(basedir, 'mafadza_repairs.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Tuned SQLite mode: pragmas applied on every new connection
+    SQLITE_TUNED = os.environ.get('SQLITE_TUNED', 'True') == 'True'
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',       # readers don't block the writer
+        'busy_timeout': 5000,        # ms to wait for a lock before failing
+        'synchronous': 'NORMAL',     # safe with WAL, far fewer fsyncs
+        'mmap_size': 268435456       # 256 MB memory-mapped reads
+    }
+    
+    # Connection pool per worker: sized to its threads (or greenlets under gevent,
+    # see gunicorn.conf.py) unless set explicitly.
+    # Extra engine options can go in SQLALCHEMY_ENGINE_OPTIONS (see app/database.py).
+    WEB_WORKER_CLASS = os.environ.get('WEB_WORKER_CLASS', 'sync')
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 1))
+    WEB_CONNECTIONS = int(os.environ.get('WEB_CONNECTIONS', 50))
+    DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0)) or None
+    DB_WRITE_RETRIES = int(os.environ.get('DB_WRITE_RETRIES', 5))
+    
+    # Boot compares the stored schema version with the code's (app/schema.py).
+    # When behind: migrate in place, or with False only log it and leave
+    # `flask db upgrade` to the deploy step.
+    SCHEMA_AUTO_UPGRADE = os.environ.get('SCHEMA_AUTO_UPGRADE', 'True') == 'True'
+    
  # Admin credentials (CHANGE THESE IN PRODUCTION!)
     ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
     ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@mafadzatechsolutions.com')
@@ -21,6 +45,68 @@ class Config:
    # Create default admin? Set to False in production
     CREATE_DEFAULT_ADMIN = os.environ.get('CREATE_DEFAULT_ADMIN', 'True') == 'True' 
     
+    # Per-endpoint performance metrics (/admin/api/perf, Server-Timing header).
+    # Latency is always recorded; SQL accounting runs on this fraction of requests.
+    PERF_ENABLED = os.environ.get('PERF_ENABLED', 'True') == 'True'
+    PERF_SAMPLE_RATE = float(os.environ.get('PERF_SAMPLE_RATE', 0.25))
+    
+    # Cached admin identities for the login user loader. Credential changes
+    # flush every worker at once through the stamp file; the TTL bounds the rest.
+    ADMIN_CACHE_TTL = int(os.environ.get('ADMIN_CACHE_TTL', 30))
+    ADMIN_CACHE_STAMP_FILE = os.environ.get('ADMIN_CACHE_STAMP_FILE')
+    
+    # Compiled templates are kept on disk so new workers skip compilation
+    # (defaults to a folder in the temp dir; empty string turns it off)
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+    
+    # {% cache %} fragments in admin templates, flushed by repair/customer commits
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 256))
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 300))
+    FRAGMENT_CACHE_STAMP_FILE = os.environ.get('FRAGMENT_CACHE_STAMP_FILE')
+    
+    # Turnaround percentile reports (app/analytics.py), cached per period: a
+    # period that has ended keeps for a day, the current one for five minutes
+    ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE', 64))
+    ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', 300))
+    ANALYTICS_CACHE_TTL_CLOSED = int(os.environ.get('ANALYTICS_CACHE_TTL_CLOSED', 86400))
+    
+    # Background jobs (app/jobs.py, run by worker.py). A leased job that isn't
+    # finished within JOB_LEASE_SECONDS is handed to another worker; failures
+    # retry with exponential backoff until JOB_MAX_ATTEMPTS, then go dead.
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    JOB_RETRY_BASE = int(os.environ.get('JOB_RETRY_BASE', 10))
+    JOB_RETRY_MAX = int(os.environ.get('JOB_RETRY_MAX', 3600))
+    WORKER_POOL = os.environ.get('WORKER_POOL', 'thread')  # thread or process
+    WORKER_CONCURRENCY = int(os.environ.get('WORKER_CONCURRENCY', 2))
+    WORKER_POLL_INTERVAL = float(os.environ.get('WORKER_POLL_INTERVAL', 1.0))
+    
+    # Customer notifications (app/notifications.py): written to an outbox with
+    # the change and sent by the worker. Changes to a repair within
+    # NOTIFY_COALESCE_SECONDS go out as one message with the latest status.
+    NOTIFY_STATUSES = [status.strip() for status in os.environ.get(
+        'NOTIFY_STATUSES', 'Waiting for Parts,Completed,Ready for Pickup').split(',') if status.strip()]
+    NOTIFY_COALESCE_SECONDS = int(os.environ.get('NOTIFY_COALESCE_SECONDS', 60))
+    NOTIFY_BATCH_SIZE = int(os.environ.get('NOTIFY_BATCH_SIZE', 50))
+    NOTIFY_MAX_ATTEMPTS = int(os.environ.get('NOTIFY_MAX_ATTEMPTS', 5))
+    
+    # Email over SMTP, off unless MAIL_SERVER is set (otherwise every booking
+    # would queue messages that fail against a server that isn't there). For
+    # a local debugging server: MAIL_SERVER=localhost with
+    # python -m aiosmtpd -n -l localhost:1025
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')
+    MAIL_ENABLED = os.environ.get('MAIL_ENABLED', 'True' if MAIL_SERVER else 'False') == 'True'
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 1025))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'False') == 'True'
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_SENDER = os.environ.get('MAIL_SENDER')
+    MAIL_RATE_PER_MINUTE = int(os.environ.get('MAIL_RATE_PER_MINUTE', 60))
+    
+    # SMS: empty (off), 'log' (app log only) or 'package.module:ClassName'
+    SMS_PROVIDER = os.environ.get('SMS_PROVIDER', '')
+    SMS_RATE_PER_MINUTE = int(os.environ.get('SMS_RATE_PER_MINUTE', 30))
+    
     # Application settings
     SITE_NAME = 'MafadzaTechSolutions'
     SITE_TAGLINE = 'Professional Device Repair Services'
@@ -36,6 +122,24 @@ class Config:
         'Ready for Pickup'
     ]
     
+    # Country calling code for phone numbers entered without one (South Africa)
+    DEFAULT_COUNTRY_CODE = os.environ.get('DEFAULT_COUNTRY_CODE', '27')
+    
+    # Tracking IDs reserved per worker in one database round trip
+    TRACKING_ID_BLOCK_SIZE = int(os.environ.get('TRACKING_ID_BLOCK_SIZE', 20))
+    
+    # Public tracking page cache (per worker). Repair updates flush every
+    # worker on the host through the stamp file; the TTL bounds the rest.
+    TRACKING_CACHE_SIZE = int(os.environ.get('TRACKING_CACHE_SIZE', 1024))
+    TRACKING_CACHE_TTL = int(os.environ.get('TRACKING_CACHE_TTL', 60))
+    TRACKING_CACHE_STAMP_FILE = os.environ.get('TRACKING_CACHE_STAMP_FILE')
+    
+    # Largest batch accepted by the bulk intake endpoint
+    BULK_INTAKE_MAX = int(os.environ.get('BULK_INTAKE_MAX', 500))
+    
+    # Admin repair list page size (keyset paginated)
+    REPAIRS_PER_PAGE = int(os.environ.get('REPAIRS_PER_PAGE', 50))
+    
     # Device types
     DEVICE_TYPES = ['Laptop', 'Phone', 'Tablet', 'Desktop', 'Other']
     
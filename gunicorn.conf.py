@@ -0,0 +1,78 @@
+"""
+Gunicorn settings for MafadzaTechSolutions
+Loaded automatically from the working directory (or with -c gunicorn.conf.py).
+
+Environment:
+  WEB_WORKER_CLASS  gthread (default), gevent or sync
+  WEB_CONCURRENCY   worker processes (default 2)
+  WEB_THREADS       threads per gthread worker (default 4)
+  WEB_CONNECTIONS   concurrent greenlets per gevent worker (default 50)
+  PORT              bind port (default 10000)
+
+gthread needs nothing extra: each thread holds a pooled connection while
+it waits on the database, so one worker overlaps several requests' I/O.
+gevent (pip install gevent) multiplexes many more requests per worker; the
+app switches psycopg2 to cooperative waits when it detects gevent's patched
+sockets. SQLite calls still block the whole worker under gevent, so do not
+use gevent with SQLite.
+
+The app reads WEB_WORKER_CLASS, WEB_THREADS and WEB_CONNECTIONS to size its
+connection pool (app/database.py), so they are exported to the workers here.
+
+Comparing worker classes
+  python loadtest.py --compare-workers sync,gthread,gevent --rate 40 --duration 30
+
+Measured on 1 vCPU (load generator on the same machine), SQLite with 10k
+repairs, 2 workers, threads=4, connections=50, default mix
+(book=1,track=8,dashboard=1). Overall latency:
+
+  rate     worker class   p50 ms   p95 ms   p99 ms
+  20/s     sync              5.7     21.4     92.7
+           gthread           6.0     21.5     60.0
+           gevent            8.2     40.8    201.1
+  40/s     sync              9.8    560.3    834.5
+           gthread          12.1   1497.4   2561.1
+           gevent           10.4    883.2   1350.8
+
+On SQLite the work is CPU-bound and the database calls block, so extra
+concurrency only adds contention once the CPU is saturated; sync or a
+small gthread pool is the right choice there. The gains are on PostgreSQL,
+where most of a request is spent waiting on the network and a sync worker
+holds the whole process while it waits. Measure that with
+--database postgresql://... before switching production to gevent.
+"""
+
+import importlib.util
+import multiprocessing
+import os
+import sys
+
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+if worker_class == 'gevent' and importlib.util.find_spec('gevent') is None:
+    print("gevent is not installed - falling back to gthread workers", file=sys.stderr)
+    worker_class = 'gthread'
+
+workers = int(os.environ.get('WEB_CONCURRENCY', min(2, multiprocessing.cpu_count() * 2)))
+# Only gthread uses threads (gunicorn turns sync into gthread when threads > 1)
+threads = int(os.environ.get('WEB_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('WEB_CONNECTIONS', 50))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = 2000
+max_requests_jitter = 200
+
+# Each worker builds its own app, engine and caches after the fork (and after
+# gevent has patched the standard library)
+preload_app = False
+
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+# Tell the app how much concurrency one worker has
+os.environ['WEB_WORKER_CLASS'] = worker_class
+os.environ['WEB_THREADS'] = str(threads)
+os.environ['WEB_CONNECTIONS'] = str(worker_connections)
@@ -1,14 +1,38 @@
+import argparse
+import sys
 from app import create_app, db
 from config import Config
 from app.models import Admin
+from app.schema import SCHEMA_VERSION, SchemaOutOfDate, check_schema, upgrade_database
 from werkzeug.security import generate_password_hash
 
-app = create_app(Config)
+parser = argparse.ArgumentParser(description='Create or upgrade the database schema')
+parser.add_argument('--check', action='store_true',
+                    help='Only check the schema version; exit 1 if the database is behind')
+args = parser.parse_args()
+
+class InitConfig(Config):
+    # Migrate explicitly below (or not at all with --check)
+    SCHEMA_AUTO_UPGRADE = False
+
+app = create_app(InitConfig)
 
 with app.app_context():
-    # Create all tables
-    db.create_all()
-    print("Database tables created!")
+    if args.check:
+        try:
+            check_schema()
+        except SchemaOutOfDate as e:
+            print(f"✗ {e}. Run 'python init_db.py' or 'flask db upgrade'.")
+            sys.exit(1)
+        print(f"✓ Database schema is current ({SCHEMA_VERSION})")
+        sys.exit(0)
+    
+    # Create or migrate all tables
+    previous = upgrade_database()
+    if previous == SCHEMA_VERSION:
+        print(f"Database schema already current ({SCHEMA_VERSION})")
+    else:
+        print(f"Database migrated from {previous or 'empty'} to {SCHEMA_VERSION}!")
     
     # Create admin user if it doesn't exist
     admin = Admin.query.filter_by(username='admin').first()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Local load test for MafadzaTechSolutions
+Starts the app under gunicorn (run:app) against a local SQLite file or a
+PostgreSQL URL, seeds it, then replays a mix of bookings, tracking lookups
+and admin dashboard views at a target request rate.
+
+Usage:
+  python loadtest.py --rate 50 --duration 60 --workers 2
+  python loadtest.py --mix book=1,track=8,dashboard=1 --database postgresql://localhost/loadtest
+  python loadtest.py --url http://127.0.0.1:8000 --rate 20   # already running server
+  python loadtest.py --compare-workers sync,gthread,gevent --rate 40
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from seed_data import generate, make_config, parse_size
+
+ADMIN_USERNAME = 'loadtest'
+ADMIN_PASSWORD = 'loadtest-password'
+DEFAULT_MIX = 'book=1,track=8,dashboard=1'
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects (e.g. after a booking) instead of following them"""
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def prepare_database(database_url, size):
+    """Seed the database and create the admin used for dashboard traffic"""
+    from app import create_app, db
+    from app.models import Admin, Repair
+
+    app = create_app(make_config(database_url))
+    with app.app_context():
+        if Repair.query.count() == 0 and size:
+            generate(size, echo=lambda message: print(f"  {message}"))
+        if not Admin.query.filter_by(username=ADMIN_USERNAME).first():
+            admin = Admin(username=ADMIN_USERNAME, email='loadtest@example.com')
+            admin.set_password(ADMIN_PASSWORD)
+            db.session.add(admin)
+            db.session.commit()
+        tracking_ids = [row[0] for row in db.session.query(Repair.tracking_id).limit(10000)]
+        db.session.remove()
+        db.engine.dispose()
+    return tracking_ids
+
+def start_server(database_url, port, workers, worker_class, threads, connections):
+    """
+    Start gunicorn with gunicorn.conf.py (or the threaded Werkzeug server if
+    gunicorn is missing). Worker settings go through the same environment
+    variables as a deployment.
+    """
+    env = dict(os.environ, DATABASE_URL=database_url, CREATE_DEFAULT_ADMIN='False',
+               WEB_CONCURRENCY=str(workers), WEB_WORKER_CLASS=worker_class,
+               WEB_THREADS=str(threads), WEB_CONNECTIONS=str(connections))
+    if shutil.which('gunicorn') or _has_module('gunicorn'):
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app',
+                   '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    else:
+        print("  gunicorn not installed - using the threaded Werkzeug server")
+        command = [sys.executable, '-c',
+                   f"from run import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+
+    process = subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    wait_until_ready(f'http://127.0.0.1:{port}', process)
+    return process
+
+def _has_module(name):
+    import importlib.util
+    return importlib.util.find_spec(name) is not None
+
+def wait_until_ready(base_url, process=None, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError('Server exited during startup')
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=2)
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.25)
+    raise RuntimeError(f'Server at {base_url} did not become ready')
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {'book', 'track', 'dashboard'}
+    if unknown:
+        raise SystemExit(f"Unknown routes in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+class Client:
+    """Per-thread HTTP client with its own cookie jar (admin session)"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            NoRedirect
+        )
+        self.logged_in = False
+
+    def request(self, path, data=None):
+        """Return the HTTP status; redirects count as responses, not errors"""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(self.base_url + path, data=body, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def login(self):
+        if not self.logged_in:
+            self.request('/admin/login', {'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+            self.logged_in = True
+
+def make_actions(tracking_ids):
+    counter = iter(range(10**9))
+    lock = threading.Lock()
+
+    def book(client):
+        with lock:
+            index = next(counter)
+        return client.request('/book-repair', {
+            'name': 'Load Test',
+            'phone': f'07388{index % 100000:05d}',
+            'device_type': 'Phone',
+            'brand': 'Apple',
+            'model': 'iPhone 13',
+            'problem': 'Load test booking',
+            'deposit': '10'
+        })
+
+    def track(client):
+        return client.request('/track-repair', {'tracking_id': random.choice(tracking_ids)})
+
+    def dashboard(client):
+        return client.request('/admin/dashboard')
+
+    return {'book': book, 'track': track, 'dashboard': dashboard}
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def run_load(base_url, tracking_ids, rate, duration, mix, concurrency):
+    """
+    Open-loop load: request i is due at start + i / rate. Latency is measured
+    from the due time, so queueing delay counts against the server.
+    """
+    actions = make_actions(tracking_ids)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    local = threading.local()
+    results = {name: {'latencies': [], 'errors': 0} for name in names}
+    results_lock = threading.Lock()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = Client(base_url)
+        return local.client
+
+    def fire(name, due):
+        if name == 'dashboard':
+            # Log this thread in once, outside the measured request
+            client().login()
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            status = actions[name](client())
+            failed = status >= 400
+        except Exception:
+            failed = True
+        elapsed_ms = (time.perf_counter() - due) * 1000
+        with results_lock:
+            results[name]['latencies'].append(elapsed_ms)
+            results[name]['errors'] += failed
+
+    total = int(rate * duration)
+    rng = random.Random(11)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index in range(total):
+            due = started + index / rate
+            # Keep the submit loop just ahead of schedule
+            while due - time.perf_counter() > 0.5:
+                time.sleep(0.05)
+            pool.submit(fire, rng.choices(names, weights=weights)[0], due)
+    elapsed = time.perf_counter() - started
+
+    report = {'target_rate': rate, 'duration_s': round(elapsed, 2), 'routes': {}}
+    all_latencies, all_errors = [], 0
+    for name, data in results.items():
+        latencies = data['latencies']
+        all_latencies += latencies
+        all_errors += data['errors']
+        report['routes'][name] = summarize(latencies, data['errors'], elapsed)
+    report['overall'] = summarize(all_latencies, all_errors, elapsed)
+    return report
+
+def summarize(latencies, errors, elapsed):
+    count = len(latencies)
+    return {
+        'requests': count,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 1),
+        'p95_ms': round(percentile(latencies, 0.95), 1),
+        'p99_ms': round(percentile(latencies, 0.99), 1)
+    }
+
+def print_report(report):
+    print(f"\n{'route':<12}{'requests':>10}{'rps':>9}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print("-" * 70)
+    rows = list(report['routes'].items()) + [('overall', report['overall'])]
+    for name, row in rows:
+        print(f"{name:<12}{row['requests']:>10}{row['throughput_rps']:>9.1f}{row['error_rate']:>9.1%}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay booking/tracking/admin traffic against a local server')
+    parser.add_argument('--database', help='Database URL (default: a fresh SQLite file)')
+    parser.add_argument('--url', help='Use an already running server instead of starting one')
+    parser.add_argument('--seed', default='10k', help='Repairs to generate into an empty database')
+    parser.add_argument('--rate', type=float, default=20, help='Target requests per second')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Route weights (default {DEFAULT_MIX})')
+    parser.add_argument('--concurrency', type=int, default=64, help='Client threads')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--worker-class', default='gthread', help='gunicorn worker class')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gthread worker')
+    parser.add_argument('--connections', type=int, default=50, help='greenlets per gevent worker')
+    parser.add_argument('--compare-workers', metavar='CLASSES',
+                        help='Run once per worker class (e.g. sync,gthread,gevent) and compare')
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MafadzaTechSolutions - Load Test")
+    print("=" * 60)
+
+    workdir = None
+    database = args.database
+    if not database:
+        workdir = tempfile.mkdtemp(prefix='mafadza-load-')
+        database = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+
+    print(f"Database: {database}")
+    tracking_ids = prepare_database(database, parse_size(args.seed))
+
+    mix = parse_mix(args.mix)
+    try:
+        if args.compare_workers:
+            reports = {}
+            for worker_class in args.compare_workers.split(','):
+                worker_class = worker_class.strip()
+                print(f"\n{worker_class} workers")
+                reports[worker_class] = load_server(database, tracking_ids, args, mix, worker_class)
+                print_report(reports[worker_class])
+            print_comparison(reports)
+            report = {'worker_classes': reports}
+        else:
+            report = load_server(database, tracking_ids, args, mix, args.worker_class)
+            print_report(report)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.output}")
+
+def load_server(database, tracking_ids, args, mix, worker_class):
+    """Run the load against --url, or a fresh server with the given worker class"""
+    process = None
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        process = start_server(database, port, args.workers, worker_class,
+                               args.threads, args.connections)
+
+    try:
+        print(f"Load: {args.rate:g} req/s for {args.duration:g}s, mix {args.mix}")
+        report = run_load(base_url, tracking_ids, args.rate, args.duration, mix, args.concurrency)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+    report['worker_class'] = worker_class
+    return report
+
+def print_comparison(reports):
+    print(f"\n{'worker class':<14}{'rps':>8}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print("-" * 61)
+    for worker_class, report in reports.items():
+        row = report['overall']
+        print(f"{worker_class:<14}{row['throughput_rps']:>8.1f}{row['error_rate']:>9.1%}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+if __name__ == '__main__':
+    main()
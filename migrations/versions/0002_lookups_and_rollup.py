@@ -0,0 +1,87 @@
+"""Customer phone lookup key, report indexes, rollup and tracking sequence
+
+Revision ID: 0002_lookups_and_rollup
+Revises: 0001_baseline
+Create Date: 2026-10-17 21:05:00
+
+Databases created with db.create_all() before migrations existed may already
+have some of this, so every step checks first.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_lookups_and_rollup'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+REPAIR_INDEXES = {
+    'ix_repair_created_at_id': ['created_at', 'id'],
+    'ix_repair_status_created_at': ['status', 'created_at'],
+    'ix_repair_device_type_created_at': ['device_type', 'created_at'],
+}
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    customer_columns = {column['name'] for column in inspector.get_columns('customer')}
+    if 'phone_normalized' not in customer_columns:
+        with op.batch_alter_table('customer', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('phone_normalized', sa.String(length=16), nullable=True))
+
+    # Also when the column already exists: rows from before it was kept up to
+    # date can still be NULL, which the unique index and lookups would miss
+    from app.customers import merge_duplicate_customers
+    merge_duplicate_customers(bind)
+
+    customer_indexes = {index['name'] for index in inspector.get_indexes('customer')}
+    if 'ix_customer_phone_normalized' not in customer_indexes:
+        op.create_index('ix_customer_phone_normalized', 'customer', ['phone_normalized'], unique=True)
+
+    repair_indexes = {index['name'] for index in inspector.get_indexes('repair')}
+    for name, columns in REPAIR_INDEXES.items():
+        if name not in repair_indexes:
+            op.create_index(name, 'repair', columns)
+
+    if not inspector.has_table('repair_daily_stats'):
+        op.create_table('repair_daily_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('device_type', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=30), nullable=False),
+        sa.Column('repair_count', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'device_type', 'status', name='uq_repair_daily_stats_bucket')
+        )
+        op.create_index('ix_repair_daily_stats_day', 'repair_daily_stats', ['day'])
+        # Same buckets as `flask rollup rebuild`
+        op.execute(
+            "INSERT INTO repair_daily_stats (day, device_type, status, repair_count, revenue) "
+            "SELECT date(created_at), device_type, COALESCE(status, 'Received'), "
+            "COUNT(id), COALESCE(SUM(actual_cost), 0.0) FROM repair "
+            "WHERE created_at IS NOT NULL "
+            "GROUP BY date(created_at), device_type, COALESCE(status, 'Received')"
+        )
+
+    if not inspector.has_table('tracking_sequence'):
+        # Empty is fine: the allocator seeds each day past existing tracking IDs
+        op.create_table('tracking_sequence',
+        sa.Column('day', sa.String(length=8), nullable=False),
+        sa.Column('next_value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day')
+        )
+
+
+def downgrade():
+    op.drop_table('tracking_sequence')
+    op.drop_index('ix_repair_daily_stats_day', table_name='repair_daily_stats')
+    op.drop_table('repair_daily_stats')
+    for name in REPAIR_INDEXES:
+        op.drop_index(name, table_name='repair')
+    op.drop_index('ix_customer_phone_normalized', table_name='customer')
+    with op.batch_alter_table('customer', schema=None) as batch_op:
+        batch_op.drop_column('phone_normalized')
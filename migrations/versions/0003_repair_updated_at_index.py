@@ -0,0 +1,26 @@
+"""Index repair.updated_at for the stats API's change check
+
+Revision ID: 0003_repair_updated_at_index
+Revises: 0002_lookups_and_rollup
+Create Date: 2026-10-17 21:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_repair_updated_at_index'
+down_revision = '0002_lookups_and_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('repair')}
+    if 'ix_repair_updated_at' not in indexes:
+        op.create_index('ix_repair_updated_at', 'repair', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_repair_updated_at', table_name='repair')
@@ -0,0 +1,50 @@
+"""Payment ledger: per-repair totals, voidable payments, payment.repair_id index
+
+Revision ID: 0004_payment_ledger
+Revises: 0003_repair_updated_at_index
+Create Date: 2026-10-17 22:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_payment_ledger'
+down_revision = '0003_repair_updated_at_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('voided_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('void_reason', sa.String(length=200), nullable=True))
+    op.create_index('ix_payment_repair_id', 'payment', ['repair_id'])
+
+    with op.batch_alter_table('repair', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_paid', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('balance_due', sa.Float(), nullable=False, server_default='0'))
+
+    # Same figures as `flask ledger rebuild`
+    op.execute(
+        "UPDATE repair SET total_paid = COALESCE((SELECT SUM(payment.amount) FROM payment "
+        "WHERE payment.repair_id = repair.id AND payment.voided_at IS NULL), 0)"
+    )
+    op.execute(
+        "UPDATE repair SET balance_due = CASE WHEN COALESCE(actual_cost, 0) > 0 "
+        "THEN actual_cost ELSE COALESCE(estimated_cost, 0) END - total_paid"
+    )
+    op.create_index('ix_repair_balance_due', 'repair', ['balance_due'])
+
+
+def downgrade():
+    op.drop_index('ix_repair_balance_due', table_name='repair')
+    with op.batch_alter_table('repair', schema=None) as batch_op:
+        batch_op.drop_column('balance_due')
+        batch_op.drop_column('total_paid')
+
+    op.drop_index('ix_payment_repair_id', table_name='payment')
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.drop_column('void_reason')
+        batch_op.drop_column('voided_at')
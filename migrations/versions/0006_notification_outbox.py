@@ -0,0 +1,45 @@
+"""Customer notification outbox
+
+Revision ID: 0006_notification_outbox
+Revises: 0005_job_queue
+Create Date: 2026-10-17 23:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_notification_outbox'
+down_revision = '0005_job_queue'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('repair_id', sa.Integer(), nullable=False),
+        sa.Column('channel', sa.String(length=10), nullable=False),
+        sa.Column('recipient', sa.String(length=120), nullable=False),
+        sa.Column('event', sa.String(length=20), nullable=False),
+        sa.Column('repair_status', sa.String(length=30), nullable=True),
+        sa.Column('state', sa.String(length=10), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('send_after', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['repair_id'], ['repair.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notification_state_send_after', 'notification', ['state', 'send_after'])
+    op.create_index('ix_notification_repair_channel', 'notification', ['repair_id', 'channel'])
+    op.create_index('ix_notification_channel_sent_at', 'notification', ['channel', 'sent_at'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_channel_sent_at', table_name='notification')
+    op.drop_index('ix_notification_repair_channel', table_name='notification')
+    op.drop_index('ix_notification_state_send_after', table_name='notification')
+    op.drop_table('notification')
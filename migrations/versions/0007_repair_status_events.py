@@ -0,0 +1,51 @@
+"""Append-only repair status history
+
+Revision ID: 0007_repair_status_events
+Revises: 0006_notification_outbox
+Create Date: 2026-10-18 00:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_repair_status_events'
+down_revision = '0006_notification_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('repair_status_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('repair_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=30), nullable=False),
+        sa.Column('at', sa.DateTime(), nullable=False),
+        sa.Column('changed_by', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['changed_by'], ['admin.id'], ),
+        sa.ForeignKeyConstraint(['repair_id'], ['repair.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Earlier history was overwritten; reconstruct what the timestamps show:
+    # booked at created_at, completed at completed_at, the current status at updated_at
+    op.execute(
+        "INSERT INTO repair_status_event (repair_id, status, at) "
+        "SELECT id, 'Received', created_at FROM repair WHERE created_at IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO repair_status_event (repair_id, status, at) "
+        "SELECT id, 'Completed', completed_at FROM repair WHERE completed_at IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO repair_status_event (repair_id, status, at, changed_by) "
+        "SELECT id, status, COALESCE(updated_at, completed_at, created_at), updated_by FROM repair "
+        "WHERE status IS NOT NULL AND status NOT IN ('Received', 'Completed')"
+    )
+    op.create_index('ix_repair_status_event_repair_at', 'repair_status_event', ['repair_id', 'at'])
+
+
+def downgrade():
+    op.drop_index('ix_repair_status_event_repair_at', table_name='repair_status_event')
+    op.drop_table('repair_status_event')
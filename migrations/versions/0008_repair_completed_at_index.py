@@ -0,0 +1,26 @@
+"""Index repair.completed_at for turnaround analytics
+
+Revision ID: 0008_repair_completed_at_index
+Revises: 0007_repair_status_events
+Create Date: 2026-10-17 23:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_repair_completed_at_index'
+down_revision = '0007_repair_status_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('repair')}
+    if 'ix_repair_completed_at' not in indexes:
+        op.create_index('ix_repair_completed_at', 'repair', ['completed_at'])
+
+
+def downgrade():
+    op.drop_index('ix_repair_completed_at', table_name='repair')
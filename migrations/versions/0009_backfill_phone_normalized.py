@@ -0,0 +1,26 @@
+"""Fill in customer.phone_normalized rows 0002 skipped
+
+Revision ID: 0009_backfill_phone_normalized
+Revises: 0008_repair_completed_at_index
+Create Date: 2026-10-18 10:30:00
+
+0002 only normalized phones when it added the column itself, so databases
+that already had it could keep NULL keys on older customers.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_backfill_phone_normalized'
+down_revision = '0008_repair_completed_at_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    from app.customers import merge_duplicate_customers
+    merge_duplicate_customers(op.get_bind())
+
+
+def downgrade():
+    pass
@@ -0,0 +1,32 @@
+"""Derive repair.is_paid and deposit_paid from the ledger; no negative balances
+
+Revision ID: 0010_ledger_payment_flags
+Revises: 0009_backfill_phone_normalized
+Create Date: 2026-10-18 11:15:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_ledger_payment_flags'
+down_revision = '0009_backfill_phone_normalized'
+branch_labels = None
+depends_on = None
+
+BILLABLE = "(CASE WHEN COALESCE(actual_cost, 0) > 0 THEN actual_cost ELSE COALESCE(estimated_cost, 0) END)"
+
+
+def upgrade():
+    # Same figures as `flask ledger rebuild`
+    op.execute(
+        f"UPDATE repair SET "
+        f"balance_due = CASE WHEN {BILLABLE} - total_paid > 0 THEN {BILLABLE} - total_paid ELSE 0 END, "
+        f"is_paid = ({BILLABLE} > 0 AND {BILLABLE} - total_paid <= 0.005), "
+        f"deposit_paid = total_paid"
+    )
+
+
+def downgrade():
+    # Balances as 0004 computed them; the flags keep their derived values
+    op.execute(f"UPDATE repair SET balance_due = {BILLABLE} - total_paid")
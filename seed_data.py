@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for MafadzaTechSolutions
+Bulk-inserts realistic customers, repairs and payments for load and
+benchmark testing (e.g. 10k, 100k or 1M repairs)
+
+Usage:
+  python seed_data.py --repairs 100k --database sqlite:///bench.db
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from config import Config
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+BATCH_SIZE = 5000
+
+# Rough shape of a small repair shop's book
+DEVICE_WEIGHTS = {'Phone': 55, 'Laptop': 30, 'Tablet': 8, 'Desktop': 5, 'Other': 2}
+BRANDS = {
+    'Phone': ['Apple', 'Samsung', 'Huawei', 'Xiaomi', 'Google', 'Other'],
+    'Laptop': ['Dell', 'HP', 'Lenovo', 'Apple', 'Asus', 'Acer'],
+    'Tablet': ['Apple', 'Samsung', 'Huawei', 'Lenovo'],
+    'Desktop': ['Dell', 'HP', 'Lenovo', 'Other'],
+    'Other': ['Other']
+}
+MODELS = {
+    'Apple': ['iPhone 12', 'iPhone 13', 'iPhone 14 Pro', 'MacBook Air', 'iPad 9'],
+    'Samsung': ['Galaxy S21', 'Galaxy S23', 'Galaxy A52', 'Galaxy Tab S8'],
+    'Dell': ['XPS 13', 'XPS 15', 'Latitude 5420', 'Inspiron 15'],
+    'HP': ['Pavilion 15', 'EliteBook 840', 'ProBook 450'],
+    'Lenovo': ['ThinkPad T14', 'IdeaPad 3', 'Yoga 7'],
+}
+PROBLEMS = [
+    'Screen cracked after accidental drop',
+    'Battery drains quickly, needs replacement',
+    'Water damage, device won\'t turn on',
+    'Keyboard not working properly',
+    'Charging port loose, intermittent charging',
+    'Overheating and shutting down under load',
+    'No sound from speakers',
+    'Camera shows black screen',
+    'Slow performance, needs service and cleanup',
+    'Hinge broken, display wobbles',
+]
+FIRST_NAMES = ['Thabo', 'Lerato', 'Sipho', 'Naledi', 'Tshilidzi', 'Mpho', 'Ayanda', 'Kagiso',
+               'John', 'Sarah', 'Rudzani', 'Zanele', 'Lufuno', 'Pieter', 'Fatima', 'Tendai']
+LAST_NAMES = ['Mafadza', 'Nemutanzhela', 'Mokoena', 'Dlamini', 'Smith', 'Nkosi', 'Ndlovu',
+              'van der Merwe', 'Khumalo', 'Mudau', 'Naidoo', 'Botha', 'Sithole', 'Ramabulana']
+PAYMENT_METHODS = ['Cash', 'Ecocash', 'Bank Transfer', 'Card']
+OPEN_STATUSES = ['Received', 'Diagnosing', 'Waiting for Parts', 'Repairing', 'Testing']
+
+def weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def pick_status(rng, age_days):
+    """Old repairs are almost all finished; recent ones are spread out"""
+    if age_days > 30:
+        roll = rng.random()
+        if roll < 0.65:
+            return 'Completed'
+        if roll < 0.93:
+            return 'Ready for Pickup'
+        return rng.choice(OPEN_STATUSES)
+    return rng.choice(OPEN_STATUSES + ['Completed', 'Ready for Pickup'])
+
+def generate(repairs, seed=42, days=3 * 365, echo=print):
+    """
+    Bulk-insert `repairs` repairs (and about a third as many customers,
+    plus deposit/final payments) into the current app's database.
+    Must run inside an app context on a database with no repairs.
+    """
+    from sqlalchemy import insert
+    from app import db
+    from app.models import Customer, Repair, Payment, RepairStatusEvent, TrackingSequence
+    from app.rollup import rebuild as rebuild_rollup
+    from app.search import rebuild_index
+
+    if Repair.query.count() > 0:
+        echo("Repairs already exist - use an empty database")
+        return False
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+
+    # Customers
+    customer_count = max(1, repairs // 3)
+    first_customer_id = (db.session.query(db.func.max(Customer.id)).scalar() or 0) + 1
+    batch = []
+    for index in range(customer_count):
+        phone = f"+2760{index:07d}"
+        batch.append({
+            'id': first_customer_id + index,
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'phone': phone,
+            'phone_normalized': phone,
+            'email': f"customer{index}@example.com" if rng.random() < 0.6 else None,
+            'created_at': now - timedelta(days=rng.uniform(0, days))
+        })
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(insert(Customer), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Customer), batch)
+    db.session.commit()
+    echo(f"✓ {customer_count:,} customers")
+
+    # Repairs and payments
+    first_repair_id = (db.session.query(db.func.max(Repair.id)).scalar() or 0) + 1
+    per_day = {}
+    repair_batch, payment_batch, event_batch = [], [], []
+    payments = 0
+
+    for index in range(repairs):
+        created_at = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        age_days = (now - created_at).days
+        device_type = weighted(rng, DEVICE_WEIGHTS)
+        brand = rng.choice(BRANDS[device_type])
+        status = pick_status(rng, age_days)
+
+        day = created_at.strftime('%Y%m%d')
+        per_day[day] = per_day.get(day, 0) + 1
+
+        estimated_cost = round(rng.uniform(30, 600), 2)
+        deposit = round(estimated_cost * rng.uniform(0.1, 0.3), 2) if rng.random() < 0.4 else 0.0
+        completed_at = actual_cost = None
+        is_paid = False
+        if status in ('Completed', 'Ready for Pickup'):
+            # Lognormal turnaround around three days
+            hours = rng.lognormvariate(math.log(72), 0.8)
+            completed_at = min(created_at + timedelta(hours=hours), now)
+            actual_cost = round(estimated_cost * rng.uniform(0.8, 1.2), 2)
+            is_paid = rng.random() < 0.9
+
+        # Bulk inserts skip the ledger's mapper events, so fill its totals here
+        total_paid = deposit + (round(actual_cost - deposit, 2) if is_paid and actual_cost > deposit else 0.0)
+        billable = actual_cost or estimated_cost
+
+        repair_id = first_repair_id + index
+        repair_batch.append({
+            'id': repair_id,
+            'tracking_id': f"MFZ{day}{str(per_day[day]).zfill(4)}",
+            'customer_id': first_customer_id + rng.randrange(customer_count),
+            'device_type': device_type,
+            'brand': brand,
+            'model': rng.choice(MODELS.get(brand, ['Generic'])),
+            'serial_number': f"SN{rng.randrange(10**9):09d}",
+            'problem_description': rng.choice(PROBLEMS),
+            'status': status,
+            'estimated_cost': estimated_cost,
+            'actual_cost': actual_cost or 0.0,
+            'deposit_paid': total_paid,
+            'is_paid': is_paid,
+            'total_paid': total_paid,
+            'balance_due': max(round(billable - total_paid, 2), 0.0),
+            'created_at': created_at,
+            'updated_at': completed_at or created_at,
+            'completed_at': completed_at
+        })
+
+        # Status history: booked, then the current status (bulk inserts skip
+        # the history listeners). Open repairs moved on halfway through their age.
+        event_batch.append({'repair_id': repair_id, 'status': 'Received', 'at': created_at})
+        if completed_at:
+            event_batch.append({'repair_id': repair_id, 'status': 'Completed', 'at': completed_at})
+        if status not in ('Received', 'Completed'):
+            event_batch.append({'repair_id': repair_id, 'status': status,
+                                'at': completed_at or created_at + (now - created_at) / 2})
+
+        if deposit:
+            payment_batch.append({
+                'repair_id': repair_id,
+                'amount': deposit,
+                'payment_method': rng.choice(PAYMENT_METHODS),
+                'notes': 'Initial deposit',
+                'created_at': created_at
+            })
+        if is_paid and actual_cost > deposit:
+            payment_batch.append({
+                'repair_id': repair_id,
+                'amount': round(actual_cost - deposit, 2),
+                'payment_method': rng.choice(PAYMENT_METHODS),
+                'notes': 'Final payment',
+                'created_at': completed_at
+            })
+
+        if len(repair_batch) >= BATCH_SIZE:
+            db.session.execute(insert(Repair), repair_batch)
+            db.session.execute(insert(Payment), payment_batch)
+            db.session.execute(insert(RepairStatusEvent), event_batch)
+            db.session.commit()
+            payments += len(payment_batch)
+            repair_batch, payment_batch, event_batch = [], [], []
+            echo(f"  ... {index + 1:,} repairs")
+
+    if repair_batch:
+        db.session.execute(insert(Repair), repair_batch)
+    if payment_batch:
+        db.session.execute(insert(Payment), payment_batch)
+    if event_batch:
+        db.session.execute(insert(RepairStatusEvent), event_batch)
+    payments += len(payment_batch)
+
+    # Keep the tracking ID allocator ahead of the generated IDs
+    table = TrackingSequence.__table__
+    for day, count in per_day.items():
+        db.session.execute(table.delete().where(table.c.day == day))
+    db.session.execute(insert(TrackingSequence), [
+        {'day': day, 'next_value': count + 1} for day, count in per_day.items()
+    ])
+    db.session.commit()
+    echo(f"✓ {repairs:,} repairs, {payments:,} payments")
+
+    # Derived tables are not maintained by bulk inserts
+    rebuild_rollup()
+    rebuild_index()
+    echo(f"✓ Rollup and search index rebuilt ({time.perf_counter() - started:.1f}s total)")
+    return True
+
+def parse_size(value):
+    value = value.lower()
+    return SIZES[value] if value in SIZES else int(value.replace('_', '').replace(',', ''))
+
+def make_config(database_url):
+    """Config for a standalone database URL"""
+    class DataConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        CREATE_DEFAULT_ADMIN = False
+    return DataConfig
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic repair data')
+    parser.add_argument('--repairs', default='10k', help='Number of repairs: 10k, 100k, 1m or an integer')
+    parser.add_argument('--database', default=Config.SQLALCHEMY_DATABASE_URI, help='Database URL')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=3 * 365, help='History length in days')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    print("=" * 60)
+    print("MafadzaTechSolutions - Synthetic Data Generator")
+    print("=" * 60)
+
+    app = create_app(make_config(args.database))
+    with app.app_context():
+        if not generate(parse_size(args.repairs), seed=args.seed, days=args.days):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -99,10 +99,12 @@ def initialize_database():
 from app import create_app, db
 from config import Config
 
+from app.schema import upgrade_database
+
 app = create_app(Config)
 with app.app_context():
-    db.create_all()
-    print("Database tables created successfully!")
+    upgrade_database()
+    print("Database schema migrated successfully!")
     
     # Create admin user
     from app.models import Admin
@@ -1 +1,1064 @@
+import csv
+import gzip
+import io
+import json
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.database import write_transaction
+from app.jobs import Worker
+from app.models import Admin, Customer, Job, Notification, Payment, Repair
+from app.reports import query_plan, repairs_between
+from app.tracking import TrackingIdAllocator
+from config import Config
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'test.db')
+        TESTING = True
+
+    app = create_app(TestConfig)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+def book(client, index, **fields):
+    data = {
+        'name': f'Customer {index}',
+        'phone': f'07100{index:05d}',
+        'device_type': 'Phone',
+        'brand': 'Apple',
+        'model': 'iPhone',
+        'problem': 'Cracked screen'
+    }
+    data.update(fields)
+    return client.post('/book-repair', data=data)
+
+def login(app, client):
+    with app.app_context():
+        admin = Admin(username='tester', email='tester@example.com')
+        admin.set_password('secret-pass')
+        db.session.add(admin)
+        db.session.commit()
+    client.post('/admin/login', data={'username': 'tester', 'password': 'secret-pass'})
+
+def test_tracking_ids_unique_across_workers_and_threads(app):
+    """Thousands of IDs from several allocators (workers) and threads never collide"""
+    with app.app_context():
+        workers = [TrackingIdAllocator(db.engine, block_size=7) for _ in range(4)]
+
+    def allocate(worker):
+        return [worker.allocate() for _ in range(250)]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        batches = list(pool.map(allocate, [workers[i % 4] for i in range(16)]))
+
+    ids = [tracking_id for batch in batches for tracking_id in batch]
+    assert len(ids) == 4000
+    assert len(set(ids)) == len(ids)
+    assert all(re.fullmatch(r'MFZ\d{8}\d{4,}', tracking_id) for tracking_id in ids)
+
+def test_parallel_bookings_have_unique_tracking_ids(app):
+    """Concurrent book_repair requests all succeed with distinct tracking IDs"""
+    lock = threading.Lock()
+    statuses = []
+
+    def worker(start):
+        client = app.test_client()
+        for index in range(start, start + 25):
+            response = book(client, index)
+            with lock:
+                statuses.append(response.status_code)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(worker, range(0, 200, 25)))
+
+    assert statuses == [302] * 200
+    with app.app_context():
+        tracking_ids = [repair.tracking_id for repair in Repair.query.all()]
+    assert len(tracking_ids) == 200
+    assert len(set(tracking_ids)) == 200
+
+def test_tracking_suffix_widens_after_9999(app):
+    with app.app_context():
+        allocator = TrackingIdAllocator(db.engine, block_size=5000)
+        now = datetime(2024, 12, 25, 10, 0)
+        ids = [allocator.allocate(now) for _ in range(10001)]
+
+    assert ids[0] == 'MFZ202412250001'
+    assert ids[9998] == 'MFZ202412259999'
+    assert ids[9999] == 'MFZ2024122510000'
+    assert len(set(ids)) == len(ids)
+
+def test_tracking_sequence_skips_existing_ids(app):
+    """A new day's sequence starts past IDs issued by the old random generator"""
+    with app.app_context():
+        db.session.add(Repair(
+            tracking_id='MFZ202412250042',
+            device_type='Phone',
+            brand='Apple',
+            model='iPhone',
+            problem_description='Legacy booking'
+        ))
+        db.session.commit()
+
+        allocator = TrackingIdAllocator(db.engine)
+        assert allocator.allocate(datetime(2024, 12, 25)) == 'MFZ202412250043'
+
+def test_keyset_pagination_is_stable_when_created_at_ties(app):
+    """(created_at, id) cursors walk tied timestamps without gaps; bad cursors restart"""
+    from urllib.parse import parse_qs, urlparse
+    from app.pagination import decode_cursor, encode_cursor, keyset_page
+
+    client = app.test_client()
+    login(app, client)
+    for index in range(7):
+        book(client, index)
+
+    with app.app_context():
+        tied = datetime(2025, 6, 1, 12, 0)
+        for repair in Repair.query.order_by(Repair.id):
+            repair.created_at = tied if repair.id <= 5 else datetime(2025, 6, 2)
+            repair.status = 'Testing' if repair.id % 2 else 'Received'
+        db.session.commit()
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(Repair.query, cursor, per_page=2)
+            seen.extend(repair.id for repair in rows)
+            if cursor is None:
+                break
+        assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+        filtered = Repair.query.filter_by(status='Testing')
+        first, cursor = keyset_page(filtered, None, per_page=2)
+        rest, end = keyset_page(filtered, cursor, per_page=2)
+        assert [r.id for r in first] == [7, 5] and [r.id for r in rest] == [3, 1] and end is None
+
+        assert decode_cursor(encode_cursor(first[1])) == (tied, 5)
+        for malformed in ('garbage', '2025-06-01T12:00:00~x', 'not-a-date~3'):
+            assert decode_cursor(malformed) is None
+            assert [r.id for r in keyset_page(Repair.query, malformed, per_page=3)[0]] == [7, 6, 5]
+
+    response = client.get('/admin/repairs?status=Testing&per_page=2')
+    next_link = re.search(r'href="([^"]*after=[^"]*)"', response.get_data(as_text=True)).group(1)
+    after = parse_qs(urlparse(next_link.replace('&amp;', '&')).query)['after'][0]
+    page = client.get('/admin/repairs', query_string={'status': 'Testing', 'per_page': 2, 'after': after})
+    with app.app_context():
+        tracking = {r.id: r.tracking_id for r in Repair.query}
+    body = page.get_data(as_text=True)
+    assert tracking[3] in body and tracking[1] in body and tracking[7] not in body
+    assert client.get('/admin/repairs?after=garbage&per_page=3').status_code == 200
+
+def test_tracking_cache_read_through_and_invalidation(app):
+    client = app.test_client()
+    location = book(client, 1).headers['Location']
+    tracking_id = location.rsplit('/', 1)[-1]
+    cache = app.extensions['tracking_cache']
+
+    assert client.get(location).status_code == 200
+    assert client.post('/track-repair', data={'tracking_id': tracking_id}).status_code == 200
+    assert cache.stats()['hits'] >= 1
+
+    with app.app_context():
+        repair_id = Repair.query.filter_by(tracking_id=tracking_id).one().id
+
+    login(app, client)
+    client.post(f'/admin/repair/{repair_id}', data={'status': 'Ready for Pickup'})
+
+    response = client.get(f'/track-repair?tracking_id={tracking_id}')
+    assert b'Ready for Pickup' in response.data
+
+def test_tracking_cache_invalidation_reaches_other_workers(app, tmp_path):
+    """A status change made through one worker flushes another worker's cached view"""
+    class OtherWorkerConfig(Config):
+        SQLALCHEMY_DATABASE_URI = app.config['SQLALCHEMY_DATABASE_URI']
+        TESTING = True
+
+    other = create_app(OtherWorkerConfig)
+    stamp_file = str(tmp_path / 'tracking.stamp')
+    app.extensions['tracking_cache'].stamp_file = stamp_file
+    other.extensions['tracking_cache'].stamp_file = stamp_file
+
+    client, other_client = app.test_client(), other.test_client()
+    tracking_id = book(client, 1).headers['Location'].rsplit('/', 1)[-1]
+    page = f'/track-repair?tracking_id={tracking_id}'
+    assert b'Received' in other_client.get(page).data
+    assert b'Received' in other_client.get(page).data
+    assert other.extensions['tracking_cache'].stats()['hits'] >= 1
+
+    with app.app_context():
+        repair_id = Repair.query.filter_by(tracking_id=tracking_id).one().id
+    login(app, client)
+    client.post(f'/admin/repair/{repair_id}', data={'status': 'Ready for Pickup'})
+
+    assert b'Ready for Pickup' in other_client.get(page).data
+    with other.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+def test_bulk_intake_is_all_or_nothing(app):
+    client = app.test_client()
+    login(app, client)
+    booking = {
+        'name': 'Acme Corp',
+        'phone': '0115550000',
+        'device_type': 'Laptop',
+        'brand': 'Dell',
+        'model': 'Latitude',
+        'problem': 'Annual service',
+        'deposit': 10
+    }
+
+    response = client.post('/admin/api/repairs/bulk', json=[booking, dict(booking, model='')])
+    assert response.status_code == 400
+    assert response.json['errors'][0]['index'] == 1
+
+    response = client.post('/admin/api/repairs/bulk', json=[booking] * 40)
+    assert response.status_code == 201
+    assert len(set(response.json['tracking_ids'])) == 40
+
+    with app.app_context():
+        assert Repair.query.count() == 40
+        assert Customer.query.count() == 1
+        assert Payment.query.count() == 40
+
+def test_search_finds_phones_in_any_form_and_follows_changes(app):
+    """Full-text search: phone forms, reindexing on change, ranking and pages"""
+    from app.search import _like_search, search_repairs
+
+    client = app.test_client()
+    login(app, client)
+    book(client, 1, phone='+27 71 599 1599', name='Thandi Nkosi', problem='Battery drains overnight')
+    book(client, 2, name='Sipho Dube', brand='Samsung', model='Galaxy S21', problem='Screen flickers, not Apple')
+    for index in range(3, 8):
+        book(client, index, problem='Charging port loose')
+
+    with app.app_context():
+        for phone in ('0715991599', '+27715991599', '27715991599', '071 599-1599', '(071) 599 1599'):
+            repairs, _ = search_repairs(phone)
+            assert [r.customer.name for r in repairs] == ['Thandi Nkosi'], phone
+            assert [r.customer.name for r in _like_search(phone, None, 0, 10)[0]] == ['Thandi Nkosi'], phone
+
+        assert search_repairs('nkosi battery')[0][0].customer.name == 'Thandi Nkosi'
+        # A brand match outranks the same word in a problem description
+        assert [r.brand for r in search_repairs('samsung')[0]] == ['Samsung']
+        assert search_repairs('apple')[0][0].brand == 'Apple'
+
+        first, more = search_repairs('charging', page=1, per_page=3)
+        rest, end = search_repairs('charging', page=2, per_page=3)
+        assert (len(first), more, len(rest), end) == (3, True, 2, False)
+        assert not {r.id for r in first} & {r.id for r in rest}
+
+        customer = Customer.query.filter_by(name='Sipho Dube').one()
+        customer.name = 'Sipho Mokoena'
+        repair = Repair.query.filter_by(brand='Samsung').one()
+        repair.model = 'Galaxy S23'
+        db.session.commit()
+        assert search_repairs('dube') == ([], False)
+        assert [r.model for r in search_repairs('mokoena s23')[0]] == ['Galaxy S23']
+
+        assert _like_search('100%', None, 0, 10) == ([], False)
+        assert _like_search('Charging_port', None, 0, 10) == ([], False)
+
+    response = client.get('/admin/repairs', query_string={'search': '0715991599'})
+    assert b'Thandi Nkosi' in response.data and b'Sipho' not in response.data
+
+def test_normalize_phone_to_e164():
+    from app.utils import normalize_phone
+
+    for phone in ('071 599 1599', '+27 71 599 1599', '0027 71-599-1599', '27715991599', '715991599'):
+        assert normalize_phone(phone) == '+27715991599', phone
+    assert normalize_phone('+44 20 7946 0958') == '+442079460958'
+    assert normalize_phone('020 7946 0958', country_code='44') == '+442079460958'
+    for phone in (None, '', 'abc', '123', '+0123456789', '+1234567890123456'):
+        assert normalize_phone(phone) is None, phone
+
+def test_customers_dedupe_merges_into_oldest_and_moves_repairs(app):
+    with app.app_context():
+        for name, phone, email in (('Thandi', '071 599 1599', None), ('Thandi N', '+27 71 599 1599', 't@example.com'),
+                                   ('T Nkosi', '0027715991599', None), ('Sipho', '082 000 0000', None)):
+            db.session.execute(text("INSERT INTO customer (name, phone, email) VALUES (:name, :phone, :email)"),
+                               {'name': name, 'phone': phone, 'email': email})
+        db.session.commit()
+        for customer_id in (1, 2, 3, 3, 4):
+            db.session.add(Repair(tracking_id=f'MFZ20240101{customer_id}{Repair.query.count()}', device_type='Phone',
+                                  brand='Apple', model='iPhone', problem_description='Screen',
+                                  customer_id=customer_id))
+        db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['customers', 'dedupe', '--dry-run'])
+    assert 'Would merge 2 duplicate customer(s), re-pointing 3 repair(s)' in result.output
+    with app.app_context():
+        assert Customer.query.count() == 4
+
+    result = runner.invoke(args=['customers', 'dedupe'])
+    assert result.exit_code == 0 and '✓ Merged 2 duplicate customer(s)' in result.output
+    with app.app_context():
+        keeper, other = Customer.query.order_by(Customer.id).all()
+        assert (keeper.id, keeper.name, keeper.email) == (1, 'Thandi', 't@example.com')
+        assert keeper.phone_normalized == '+27715991599' and other.phone_normalized == '+27820000000'
+        assert sorted(repair.customer_id for repair in Repair.query) == [1, 1, 1, 1, 4]
+
+def test_booking_rejects_non_finite_deposits(app):
+    from app.booking import parse_booking
+
+    for deposit in ('inf', '-inf', 'nan', 'abc'):
+        with pytest.raises(ValueError, match='Deposit must be a number'):
+            parse_booking({'name': 'A', 'phone': '0715991599', 'device_type': 'Phone',
+                           'brand': 'Apple', 'model': 'iPhone', 'problem': 'Cracked', 'deposit': deposit})
+
+    client = app.test_client()
+    assert book(client, 1, deposit='inf').status_code != 302
+    with app.app_context():
+        assert Repair.query.count() == 0 and Payment.query.count() == 0
+
+def test_report_range_queries_use_created_at_indexes(app):
+    """Date-range report queries are planned as index range scans, not table scans"""
+    with app.app_context():
+        start, end = date(2024, 12, 1), date(2025, 1, 1)
+
+        plan = ' '.join(query_plan(repairs_between(start, end)))
+        assert 'ix_repair_created_at_id' in plan
+
+        plan = ' '.join(query_plan(repairs_between(start, end, status='Completed')))
+        assert 'ix_repair_status_created_at' in plan
+
+        plan = ' '.join(query_plan(repairs_between(start, end, device_type='Laptop')))
+        assert 'ix_repair_device_type_created_at' in plan
+
+def test_calculate_stats_sql_and_list_paths_agree(app):
+    from app.utils import calculate_stats
+
+    client = app.test_client()
+    for index in range(6):
+        book(client, index)
+
+    with app.app_context():
+        updates = [('Completed', 100.0), ('Ready for Pickup', 50.5), ('Waiting for Parts', None),
+                   ('Repairing', 20.0), ('Received', None), ('Completed', 0.0)]
+        for repair, (status, cost) in zip(Repair.query.order_by(Repair.id), updates):
+            repair.status, repair.actual_cost = status, cost
+        db.session.commit()
+
+        stats = calculate_stats()
+        assert (stats['total'], stats['completed'], stats['waiting_parts'], stats['in_progress']) == (6, 3, 1, 2)
+        assert stats['revenue'] == 170.5
+        assert stats['by_status']['Completed'] == 2 and stats['by_status']['Testing'] == 0
+        assert calculate_stats(Repair.query.all()) == stats
+
+        narrowed = calculate_stats(filters=[Repair.status == 'Completed'])
+        assert (narrowed['total'], narrowed['revenue']) == (2, 100.0)
+        assert calculate_stats([]) == calculate_stats(filters=[Repair.id < 0])
+
+def test_reports_accept_arbitrary_date_ranges(app):
+    client = app.test_client()
+    login(app, client)
+    book(client, 1)
+
+    today = date.today()
+    response = client.get(f'/admin/reports?start={today.isoformat()}&end={today.isoformat()}')
+    assert response.status_code == 200
+    assert b'No repairs found' not in response.data
+
+    response = client.get('/admin/reports?start=2020-01-01&end=2020-01-31')
+    assert b'No repairs found' in response.data
+
+    response = client.get(f'/admin/reports?start={today.replace(day=1).isoformat()}')
+    assert b'No repairs found' not in response.data
+    assert f"{today.replace(day=1):%d %b %Y} – {datetime.utcnow():%d %b %Y}" in response.get_data(as_text=True)
+
+    for query in ('year=0', 'year=99999', 'month=13', 'end=2020-01-31', 'start=2020-02-01&end=2020-01-01',
+                  'start=not-a-date'):
+        response = client.get(f'/admin/reports?{query}')
+        assert response.status_code == 302, query
+    assert b'Year must be between' in client.get('/admin/reports?year=0', follow_redirects=True).data
+    assert client.get('/admin/api/turnaround?year=99999').status_code == 400
+
+def test_rollup_upserts_buckets_and_rebuild_clears_drift(app):
+    """Bucket deltas go through INSERT ... ON CONFLICT; a rebuild matches the repairs table"""
+    from app.models import RepairDailyStats
+    from app.rollup import apply_delta, find_drift, rebuild
+
+    client = app.test_client()
+    login(app, client)
+    for index in range(3):
+        book(client, index, device_type='Laptop' if index else 'Phone')
+
+    with app.app_context():
+        repair_id = Repair.query.filter_by(device_type='Laptop').first().id
+    client.post(f'/admin/repair/{repair_id}', data={'status': 'Completed', 'actual_cost': '80'})
+
+    with app.app_context():
+        assert find_drift() == {}
+        day = db.session.get(Repair, repair_id).created_at.date()
+        bucket = RepairDailyStats.query.filter_by(day=day, device_type='Laptop', status='Completed').one()
+        assert (bucket.repair_count, bucket.revenue) == (1, 80.0)
+
+        apply_delta(date(2020, 1, 1), 'Tablet', 'Received', 1, 10.0)
+        apply_delta(date(2020, 1, 1), 'Tablet', 'Received', 2, 5.0)
+        db.session.commit()
+        bucket = RepairDailyStats.query.filter_by(day=date(2020, 1, 1), device_type='Tablet').one()
+        assert (bucket.repair_count, bucket.revenue) == (3, 15.0)
+        assert set(find_drift()) == {(date(2020, 1, 1), 'Tablet', 'Received')}
+
+        assert rebuild() == 3
+        assert find_drift() == {}
+
+def test_exports_stream_csv_jsonl_and_gzip(app):
+    client = app.test_client()
+    login(app, client)
+    for index in range(3):
+        book(client, index, deposit='25')
+
+    response = client.get('/admin/export/repairs')
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert response.mimetype == 'text/csv'
+    assert rows[0][0] == 'tracking_id'
+    assert len(rows) == 4
+
+    response = client.get('/admin/export/payments?format=jsonl&gzip=1')
+    assert response.mimetype == 'application/gzip'
+    payments = [json.loads(line) for line in gzip.decompress(response.data).decode().splitlines()]
+    assert [payment['amount'] for payment in payments] == [25.0] * 3
+
+    today = date.today().isoformat()
+    response = client.get(f'/admin/export/repairs?format=jsonl&start={today}&end={today}')
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(records) == 3
+    assert records[0]['customer_name'] == 'Customer 0'
+
+def test_exports_cover_exactly_the_requested_range(app):
+    client = app.test_client()
+    login(app, client)
+    for index in range(4):
+        book(client, index)
+
+    with app.app_context():
+        days = [datetime(2020, 1, 5), datetime(2020, 1, 31, 23, 59), datetime(2020, 2, 1), datetime.utcnow()]
+        tracking = []
+        for repair, created_at in zip(Repair.query.order_by(Repair.id), days):
+            repair.created_at = created_at
+            tracking.append(repair.tracking_id)
+        db.session.commit()
+
+    def exported(query):
+        response = client.get(f'/admin/export/repairs?format=jsonl&{query}')
+        return sorted(json.loads(line)['tracking_id'] for line in response.get_data(as_text=True).splitlines())
+
+    assert exported('start=2020-01-01&end=2020-01-31') == sorted(tracking[:2])
+    assert exported('month=2&year=2020') == [tracking[2]]
+    assert exported('start=2020-01-10') == sorted(tracking[1:])
+    assert exported('') == sorted(tracking)
+    for query in ('end=2020-01-31', 'year=0', 'start=2020-13-01'):
+        assert client.get(f'/admin/export/repairs?{query}').status_code == 400, query
+    assert client.get('/admin/api/status-times?year=99999').status_code == 400
+
+def test_gzip_export_streams_before_the_last_row():
+    """Each gzip chunk is sync-flushed, so the first one decodes on its own"""
+    from app.export import CHUNK_SIZE, REPAIR_COLUMNS, stream_export
+
+    fetched = []
+
+    def rows():
+        for index in range(CHUNK_SIZE * 3):
+            fetched.append(index)
+            yield (f'MFZ{index:012d}',) + (None,) * (len(REPAIR_COLUMNS) - 1)
+
+    stream = stream_export(REPAIR_COLUMNS, rows(), fmt='jsonl', compress=True)
+    first = next(stream)
+    assert len(fetched) < CHUNK_SIZE * 3
+    lines = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(first).decode().splitlines()
+    assert len(lines) == CHUNK_SIZE and json.loads(lines[0])['tracking_id'] == 'MFZ000000000000'
+
+    records = gzip.decompress(first + b''.join(stream)).decode().splitlines()
+    assert len(records) == CHUNK_SIZE * 3
+
+def test_perf_metrics_and_server_timing(app):
+    app.extensions['perf'].sample_rate = 1.0
+    client = app.test_client()
+    login(app, client)
+
+    response = client.get('/admin/dashboard')
+    assert 'db;dur=' in response.headers['Server-Timing']
+
+    metrics = client.get('/admin/api/perf').json['endpoints']['admin.dashboard']
+    assert metrics['count'] == 1
+    assert metrics['sql_per_request'] >= 1
+
+def test_sqlite_pragmas_and_write_retry(app):
+    with app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+
+        attempts = []
+
+        def work():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OperationalError('INSERT ...', {}, Exception('database is locked'))
+            db.session.add(Admin(username='retry', email='retry@example.com'))
+
+        write_transaction(work)
+        assert len(attempts) == 2
+        assert Admin.query.filter_by(username='retry').count() == 1
+
+def test_admin_identity_cache(app, tmp_path):
+    app.extensions['admin_cache'].stamp_file = str(tmp_path / 'admin.stamp')
+    client = app.test_client()
+    login(app, client)
+    cache = app.extensions['admin_cache'].cache
+
+    client.get('/admin/dashboard')
+    client.get('/admin/dashboard')
+    assert cache.stats()['hits'] >= 1
+
+    with app.app_context():
+        admin_id = Admin.query.filter_by(username='tester').one().id
+        identity = app.extensions['admin_cache'].get(admin_id)
+        with pytest.raises(AttributeError):
+            identity.username = 'changed'
+
+        admin = db.session.get(Admin, admin_id)
+        admin.username = 'renamed'
+        db.session.commit()
+
+    assert b'renamed' in client.get('/admin/dashboard').data
+
+def test_schema_version_matches_migrations_head(app):
+    """Boot trusts SCHEMA_VERSION, so it must be the newest migration"""
+    from alembic.script import ScriptDirectory
+    from app.schema import SCHEMA_VERSION, schema_version
+
+    with app.app_context():
+        config = app.extensions['migrate'].migrate.get_config()
+        assert ScriptDirectory.from_config(config).get_current_head() == SCHEMA_VERSION
+        assert schema_version() == SCHEMA_VERSION
+
+def test_legacy_database_is_upgraded_or_reported(tmp_path):
+    """A create_all database without a version is stamped, migrated and backfilled"""
+    from flask_migrate import upgrade
+    from app.schema import SchemaOutOfDate, check_schema, ensure_schema, upgrade_database
+
+    class LegacyConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'legacy.db')
+        SCHEMA_AUTO_UPGRADE = False
+        TESTING = True
+
+    app = create_app(LegacyConfig)
+    with app.app_context():
+        upgrade(revision='0001_baseline')
+        with db.engine.begin() as connection:
+            connection.execute(text("DROP TABLE alembic_version"))
+            connection.execute(text(
+                "INSERT INTO customer (id, name, phone, email) VALUES "
+                "(1, 'Old', '071 000 0001', NULL), (2, 'Dup', '+27710000001', 'dup@example.com')"
+            ))
+            connection.execute(text(
+                "INSERT INTO repair (tracking_id, customer_id, device_type, brand, model, "
+                "problem_description, status, actual_cost, created_at) VALUES "
+                "('MFZ202401010001', 2, 'Phone', 'Apple', 'iPhone', 'Screen', 'Completed', 100, "
+                "'2024-01-01 10:00:00')"
+            ))
+
+        assert ensure_schema(app) is False
+        with pytest.raises(SchemaOutOfDate):
+            check_schema()
+
+        upgrade_database()
+        check_schema()
+        customers = db.session.query(Customer.id, Customer.phone_normalized, Customer.email).all()
+        assert customers == [(1, '+27710000001', 'dup@example.com')]
+        assert db.session.execute(text("SELECT customer_id FROM repair")).scalar() == 1
+        assert db.session.execute(text(
+            "SELECT repair_count, revenue FROM repair_daily_stats")).one() == (1, 100.0)
+        db.session.remove()
+        db.engine.dispose()
+
+def test_phone_backfill_migration_merges_null_keys(tmp_path):
+    """Customers left with a NULL phone_normalized are keyed and merged by migration"""
+    from flask_migrate import upgrade
+    from app.schema import SCHEMA_VERSION, schema_version
+
+    class BehindConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'behind.db')
+        SCHEMA_AUTO_UPGRADE = False
+        TESTING = True
+
+    app = create_app(BehindConfig)
+    with app.app_context():
+        upgrade(revision='0008_repair_completed_at_index')
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO customer (id, name, phone, phone_normalized) VALUES "
+                "(1, 'Old', '071 000 0001', NULL), (2, 'New', '+27710000001', '+27710000001'), "
+                "(3, 'Other', '082 000 0002', NULL)"
+            ))
+            connection.execute(text(
+                "INSERT INTO repair (tracking_id, customer_id, device_type, brand, model, problem_description) "
+                "VALUES ('MFZ202401010001', 2, 'Phone', 'Apple', 'iPhone', 'Screen')"
+            ))
+
+        result = app.test_cli_runner().invoke(args=['customers', 'dedupe'])
+        assert result.exit_code != 0 and 'flask db upgrade' in result.output
+
+        upgrade()
+        assert schema_version() == SCHEMA_VERSION
+        assert db.session.query(Customer.id, Customer.phone_normalized).order_by(Customer.id).all() == \
+            [(1, '+27710000001'), (3, '+27820000002')]
+        assert db.session.execute(text("SELECT customer_id FROM repair")).scalar() == 1
+        db.session.remove()
+        db.engine.dispose()
+
+def test_static_assets_fingerprinted_and_precompressed(app, tmp_path):
+    """Hashed asset URLs in pages, served pre-compressed with immutable caching"""
+    import shutil
+    from app.assets import build_assets, init_assets
+    brotli = pytest.importorskip('brotli')
+
+    static_dir = str(tmp_path / 'static')
+    shutil.copytree(app.static_folder, static_dir)
+    manifest = build_assets(static_dir, echo=lambda message: None)
+    assert re.fullmatch(r'build/css/style\.[0-9a-f]{12}\.css', manifest['css/style.css'])
+    app.static_folder = static_dir
+    init_assets(app)
+
+    client = app.test_client()
+    page = client.get('/').get_data(as_text=True)
+    assert f"/static/{manifest['css/style.css']}" in page
+    assert f"/static/{manifest['js/main.js']}" in page
+
+    with open(f'{static_dir}/css/style.css', 'rb') as f:
+        original = f.read()
+    url = f"/static/{manifest['css/style.css']}"
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert response.mimetype == 'text/css'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert brotli.decompress(response.data) == original
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == original
+
+    response = client.get(url)
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == original
+
+    # Unbuilt paths keep Flask's normal handling
+    response = client.get('/static/css/style.css')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+    response.close()
+
+def test_conditional_get_short_circuits_before_rendering(app):
+    """Matching validators get a 304 without a template render; changes get a 200"""
+    from flask import template_rendered
+
+    client = app.test_client()
+    location = book(client, 1).headers['Location']
+    tracking_id = location.rsplit('/', 1)[-1]
+    assert client.get(location).status_code == 200  # shows the booking flash
+
+    rendered = []
+    template_rendered.connect(lambda sender, template, context, **extra: rendered.append(template.name), app)
+
+    url = f'/track-repair?tracking_id={tracking_id}'
+    first = client.get(url)
+    etag, last_modified = first.headers['ETag'], first.headers['Last-Modified']
+    assert first.status_code == 200 and 'no-cache' in first.headers['Cache-Control']
+    rendered.clear()
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b'' and rendered == []
+    assert client.get(url, headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get(location, headers={'If-None-Match': etag}).status_code == 200
+    assert client.post('/track-repair', data={'tracking_id': tracking_id},
+                       headers={'If-None-Match': etag}).status_code == 200
+
+    login(app, client)
+    stats = client.get('/admin/api/stats')
+    assert client.get('/admin/api/stats', headers={'If-None-Match': stats.headers['ETag']}).status_code == 304
+
+    with app.app_context():
+        repair_id = Repair.query.filter_by(tracking_id=tracking_id).one().id
+    client.post(f'/admin/repair/{repair_id}', data={'status': 'Testing'})
+    client.get('/admin/dashboard')  # consume the update flash
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    response = client.get('/admin/api/stats', headers={'If-None-Match': stats.headers['ETag']})
+    assert response.status_code == 200 and response.get_json()['total'] == 1
+
+def test_fragment_cache_skips_queries_until_repairs_change(app):
+    """Cached dashboard fragments skip their query; a booking flushes them"""
+    import os
+    from sqlalchemy import event
+
+    client = app.test_client()
+    login(app, client)
+    book(client, 1)
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+    assert client.get('/admin/dashboard').status_code == 200
+    recent = [s for s in statements if 'ORDER BY repair.created_at DESC' in s]
+    assert len(recent) == 1
+    # Cards and breakdown share one grouped stats query
+    assert len([s for s in statements if 'GROUP BY repair.status' in s]) == 1
+
+    statements.clear()
+    page = client.get('/admin/dashboard').get_data(as_text=True)
+    assert not [s for s in statements if 'ORDER BY repair.created_at DESC' in s]
+    assert not [s for s in statements if 'GROUP BY repair.status' in s]
+    assert app.extensions['fragment_cache'].cache.stats()['hits'] >= 3
+    assert re.search(r'Total Repairs\s*</div>\s*<div[^>]*>1</div>', page)
+
+    book(client, 3)
+    statements.clear()
+    page = client.get('/admin/dashboard').get_data(as_text=True)
+    assert len([s for s in statements if 'GROUP BY repair.status' in s]) == 1
+    assert re.search(r'Total Repairs\s*</div>\s*<div[^>]*>2</div>', page)
+
+    tracking_id = book(client, 2).headers['Location'].rsplit('/', 1)[-1]
+    assert tracking_id.encode() in client.get('/admin/dashboard').data
+
+    bytecode_dir = app.jinja_env.bytecode_cache.directory
+    assert any(name.startswith('__jinja2_') for name in os.listdir(bytecode_dir))
+
+def test_payment_ledger_keeps_repair_balances(app):
+    """Payment inserts, edits, voids, moves and deletes keep per-repair totals exact"""
+    from app.ledger import find_drift, outstanding_balances
+
+    client = app.test_client()
+    login(app, client)
+    book(client, 1, deposit='50')
+    book(client, 2)
+
+    with app.app_context():
+        first, second = Repair.query.order_by(Repair.id).all()
+        first.estimated_cost, second.estimated_cost = 300.0, 100.0
+        db.session.commit()
+        assert (first.total_paid, first.balance_due) == (50.0, 250.0)
+        assert second.balance_due == 100.0
+        first_id, second_id = first.id, second.id
+
+    client.post(f'/admin/repair/{first_id}/payments', data={'amount': '100', 'payment_method': 'Cash'})
+    client.post(f'/admin/repair/{first_id}/payments', data={'amount': '-5'})
+    for amount in ('nan', 'inf', '-inf', 'ten'):
+        response = client.post(f'/admin/repair/{first_id}/payments', data={'amount': amount},
+                               follow_redirects=True)
+        assert response.status_code == 200 and b'Please enter a valid amount' in response.data, amount
+
+    with app.app_context():
+        repair = db.session.get(Repair, first_id)
+        assert (repair.total_paid, repair.balance_due) == (150.0, 150.0)
+        updated_at = repair.updated_at
+
+        payment = Payment.query.filter_by(repair_id=first_id, amount=100.0).one()
+        payment.amount = 120.0
+        db.session.commit()
+        assert repair.total_paid == 170.0
+        assert repair.updated_at == updated_at
+
+        payment.repair_id = second_id
+        db.session.commit()
+        assert repair.total_paid == 50.0
+        # Paid beyond the bill: nothing owed, not a negative balance
+        second = db.session.get(Repair, second_id)
+        assert (second.balance_due, second.is_paid, second.deposit_paid) == (0.0, True, 120.0)
+
+        repair.actual_cost = 80.0
+        db.session.commit()
+        assert repair.balance_due == 30.0
+        payment_id = payment.id
+
+    client.post(f'/admin/payments/{payment_id}/void', data={'reason': 'Entered twice'})
+
+    with app.app_context():
+        assert db.session.get(Repair, second_id).total_paid == 0.0
+        db.session.delete(Payment.query.filter_by(repair_id=first_id).one())
+        db.session.commit()
+        assert db.session.get(Repair, first_id).balance_due == 80.0
+        assert find_drift() == []
+
+        plan = ' '.join(query_plan(outstanding_balances(limit=10)))
+        assert 'ix_repair_balance_due' in plan
+
+    data = client.get('/admin/api/outstanding').json
+    assert data['count'] == 2 and data['total_due'] == 180.0
+    assert data['repairs'][0]['balance_due'] == 100.0
+
+def test_deposit_without_estimate_leaves_nothing_owed_until_billed(app):
+    """A booking deposit before any estimate is held, not a credit; is_paid follows payments"""
+    client = app.test_client()
+    login(app, client)
+    book(client, 1, deposit='50')
+
+    with app.app_context():
+        repair = Repair.query.one()
+        assert (repair.total_paid, repair.balance_due, repair.is_paid, repair.deposit_paid) == (50.0, 0.0, False, 50.0)
+        repair_id = repair.id
+
+    client.post(f'/admin/repair/{repair_id}', data={'status': 'Completed', 'actual_cost': '200', 'is_paid': 'on'})
+    with app.app_context():
+        repair = db.session.get(Repair, repair_id)
+        assert (repair.balance_due, repair.is_paid) == (150.0, False)
+
+    client.post(f'/admin/repair/{repair_id}/payments', data={'amount': '150'})
+    with app.app_context():
+        repair = db.session.get(Repair, repair_id)
+        assert (repair.total_paid, repair.balance_due, repair.is_paid, repair.deposit_paid) == (200.0, 0.0, True, 200.0)
+        payment_id = Payment.query.filter_by(amount=150.0).one().id
+
+    client.post(f'/admin/payments/{payment_id}/void')
+    with app.app_context():
+        repair = db.session.get(Repair, repair_id)
+        assert (repair.balance_due, repair.is_paid) == (150.0, False)
+        repair.is_paid, repair.balance_due = True, 0.0
+        db.session.commit()
+
+    app.test_cli_runner().invoke(args=['ledger', 'rebuild'])
+    with app.app_context():
+        repair = db.session.get(Repair, repair_id)
+        assert (repair.balance_due, repair.is_paid, repair.deposit_paid) == (150.0, False, 50.0)
+
+def test_job_queue_leases_retries_and_dead_letters(app):
+    """Jobs run once on a worker; failures back off, then go dead; lost leases are reclaimed"""
+    from datetime import timedelta
+    from app.jobs import TASKS, Worker, claim, enqueue, release_expired, run_job, task
+
+    calls = []
+
+    @task('test.flaky')
+    def flaky(fail=False):
+        calls.append(fail)
+        if fail:
+            raise RuntimeError('provider unavailable')
+
+    client = app.test_client()
+    login(app, client)
+    client.post('/admin/jobs/enqueue', data={'task': 'rollup.rebuild'})
+    client.post('/admin/jobs/enqueue', data={'task': 'rollup.rebuild'})
+
+    try:
+        with app.app_context():
+            assert Job.query.filter_by(task='rollup.rebuild').count() == 1
+            write_transaction(lambda: [enqueue('test.flaky', {'fail': False}),
+                                       enqueue('test.flaky', {'fail': True}, max_attempts=2)])
+
+        assert Worker(app, concurrency=2, poll_interval=0.05).run(once=True) == 3
+
+        with app.app_context():
+            assert sorted(job.status for job in Job.query) == ['done', 'done', 'queued']
+            failing = Job.query.filter_by(status='queued').one()
+            assert failing.attempts == 1 and 'provider unavailable' in failing.last_error
+            assert failing.run_at > datetime.utcnow()
+
+            # Second attempt is its last
+            failing.run_at = datetime.utcnow()
+            db.session.commit()
+            job_id, = claim('tester', limit=5)
+            assert claim('someone-else', limit=5) == []
+            assert run_job(job_id, 'tester') == 'dead'
+
+        assert client.post(f'/admin/jobs/{job_id}/retry').status_code == 302
+        with app.app_context():
+            # A worker that died mid-job loses its lease
+            assert claim('crashed', limit=1, lease_seconds=1) == [job_id]
+            assert release_expired(datetime.utcnow() + timedelta(seconds=2)) == (1, 0)
+            assert db.session.get(Job, job_id).status == 'queued'
+
+        assert calls == [False, True, True]
+        stats = client.get('/admin/api/jobs').json
+        assert stats['depth'] == {'queued': 1, 'running': 0, 'done': 2, 'dead': 0}
+        assert stats['finished']['count'] == 2
+        assert b'test.flaky' in client.get('/admin/jobs').data
+    finally:
+        TASKS.pop('test.flaky', None)
+
+class RecordingSMTPHandler(__import__('socketserver').StreamRequestHandler):
+    """Just enough SMTP for smtplib: records each session's recipients"""
+
+    def handle(self):
+        recipients = []
+        self.server.sessions.append(recipients)
+        self.wfile.write(b'220 test\r\n')
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+            if command.startswith('RCPT TO:'):
+                recipients.append(line.decode().strip()[8:].strip('<> '))
+            if command == 'DATA':
+                self.wfile.write(b'354 go ahead\r\n')
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+            if command == 'QUIT':
+                self.wfile.write(b'221 bye\r\n')
+                return
+            self.wfile.write(b'250 ok\r\n')
+
+def test_status_notifications_coalesce_batch_and_rate_limit(app):
+    """Outbox rows sent by the worker: one SMTP session per batch, bursts coalesced, rate capped"""
+    import socketserver
+    from app.notifications import init_notifications
+
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), RecordingSMTPHandler)
+    server.sessions = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = app.test_client()
+    book(client, 9, email='nobody@example.com')
+    with app.app_context():
+        # No MAIL_SERVER configured: nothing is queued to fail against localhost
+        assert app.extensions['notification_providers'] == {}
+        assert Notification.query.count() == 0 and Job.query.count() == 0
+
+    app.config.update(MAIL_ENABLED=True, MAIL_SERVER='127.0.0.1', MAIL_PORT=server.server_address[1],
+                      MAIL_RATE_PER_MINUTE=3, NOTIFY_COALESCE_SECONDS=0)
+    init_notifications(app)
+
+    client = app.test_client()
+    login(app, client)
+    try:
+        book(client, 1, email='customer1@example.com')
+        # Bulk intake queues the same booking confirmation as the form
+        response = client.post('/admin/api/repairs/bulk', json=[{
+            'name': 'Customer 2', 'phone': '0710000002', 'email': 'customer2@example.com',
+            'device_type': 'Phone', 'brand': 'Apple', 'model': 'iPhone', 'problem': 'Cracked screen'
+        }])
+        assert response.status_code == 201
+        assert Worker(app, poll_interval=0.05).run(once=True) == 1
+        assert server.sessions == [['customer1@example.com', 'customer2@example.com']]
+
+        with app.app_context():
+            first_id, second_id = [repair.id for repair in Repair.query.order_by(Repair.id)][1:]
+        client.post(f'/admin/repair/{first_id}', data={'status': 'Completed'})
+        client.post(f'/admin/repair/{first_id}', data={'status': 'Ready for Pickup'})
+        client.post(f'/admin/repair/{second_id}', data={'status': 'Diagnosing'})
+        client.post(f'/admin/repair/{second_id}', data={'status': 'Waiting for Parts'})
+
+        with app.app_context():
+            pending = Notification.query.filter_by(state='pending').order_by(Notification.repair_id).all()
+            assert [(n.repair_id, n.repair_status) for n in pending] == \
+                [(first_id, 'Ready for Pickup'), (second_id, 'Waiting for Parts')]
+
+        # Only one message left in this minute's allowance of three
+        Worker(app, poll_interval=0.05).run(once=True)
+        assert len(server.sessions) == 2 and server.sessions[1] == ['customer1@example.com']
+        with app.app_context():
+            assert Notification.query.filter_by(state='pending').one().repair_id == second_id
+            sender = Job.query.filter_by(task='notifications.send', status='queued').one()
+            assert sender.run_at > datetime.utcnow()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_status_history_powers_time_in_status(app):
+    """Every status change appends an event in its transaction; LEAD()/ROW_NUMBER() turn them into stays"""
+    from datetime import timedelta
+    from app.history import bottlenecks, time_in_status
+    from app.models import RepairStatusEvent
+
+    client = app.test_client()
+    login(app, client)
+    book(client, 1)
+    book(client, 2)
+
+    with app.app_context():
+        first, second = Repair.query.order_by(Repair.id).all()
+        opened = first.created_at
+
+        def move(repair, status, hours):
+            changed_at = repair.created_at + timedelta(hours=hours)
+            repair.status, repair.updated_at = status, changed_at
+            db.session.commit()
+
+        move(first, 'Waiting for Parts', 2)
+        move(first, 'Repairing', 26)
+        first.internal_notes = 'Screen fitted'
+        db.session.commit()
+        move(first, 'Completed', 30)
+        move(second, 'Waiting for Parts', 1)
+
+        second.status = 'Testing'
+        db.session.flush()
+        db.session.rollback()
+
+        assert [event.status for event in RepairStatusEvent.query.filter_by(repair_id=first.id)
+                .order_by(RepairStatusEvent.at)] == ['Received', 'Waiting for Parts', 'Repairing', 'Completed']
+        assert RepairStatusEvent.query.count() == 6
+
+        now = opened + timedelta(hours=40)
+        stays = {row['status']: row for row in time_in_status(now=now)}
+        assert stays['Repairing']['avg_hours'] == 4.0
+        assert stays['Waiting for Parts']['stays'] == 2 and stays['Waiting for Parts']['open'] == 1
+        assert stays['Completed']['avg_hours'] is None
+        assert stays['Received']['max_hours'] <= 2.0
+
+        waiting, = bottlenecks(now=second.created_at + timedelta(hours=11))
+        assert (waiting['status'], waiting['repairs'], waiting['avg_hours']) == ('Waiting for Parts', 1, 10.0)
+        first_id = first.id
+
+    assert b'Status History' in client.get(f'/admin/repair/{first_id}').data
+    data = client.get('/admin/api/status-times').json
+    assert data['bottlenecks'][0]['status'] == 'Waiting for Parts'
+
+def test_turnaround_percentiles_by_group_and_cached_per_period(app):
+    """Single-pass fallback percentiles match percentile_cont(); a period's report is computed once"""
+    from datetime import timedelta
+    from statistics import quantiles
+    from app.analytics import interpolated, turnaround_percentiles, turnaround_report
+
+    client = app.test_client()
+    login(app, client)
+    for index in range(1, 7):
+        book(client, index)
+
+    hours = [5, 1, 30, 12, 3, 48]
+    with app.app_context():
+        for repair, spent in zip(Repair.query.order_by(Repair.id), hours):
+            repair.created_at = datetime(2026, 3, 10, 9)
+            repair.completed_at = repair.created_at + timedelta(hours=spent)
+            repair.brand = 'Apple' if spent < 20 else 'Samsung'
+        db.session.commit()
+
+        start, end = date(2026, 3, 1), date(2026, 5, 1)
+        overall, = turnaround_percentiles(start, end, None)
+        expected = quantiles(hours, n=100, method='inclusive')
+        assert overall['key'] == 'all' and overall['count'] == 6
+        assert overall['p50_hours'] == round(expected[49], 1) == 8.5
+        assert overall['p90_hours'] == round(expected[89], 1)
+        assert interpolated([10.0], 0.99) == 10.0
+
+        brands = {row['key']: row for row in turnaround_percentiles(start, end, 'brand')}
+        assert (brands['Apple']['count'], brands['Apple']['p50_hours']) == (4, 4.0)
+        assert brands['Samsung']['mean_hours'] == 39.0
+        assert [row['key'] for row in turnaround_percentiles(start, end, 'month')] == ['2026-03']
+        assert turnaround_percentiles(date(2026, 4, 1), end) == []
+
+        report = turnaround_report(start, end)
+        Repair.query.first().completed_at = datetime(2026, 3, 20)
+        db.session.commit()
+        assert turnaround_report(start, end) is report
+        assert turnaround_report(start, end, 'Phone') is not report
+
+    page = client.get('/admin/analytics?start=2026-03-01&end=2026-04-30')
+    assert b'By Brand' in page.data and b'Samsung' in page.data
+    assert client.get('/admin/api/turnaround?start=2026-03-01&end=2026-04-30').json['overall']['count'] == 6
+    assert client.get('/admin/analytics').status_code == 200
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Background job worker for MafadzaTechSolutions
+Leases due jobs from the job table and runs them on a thread or process
+pool (see app/jobs.py). Several workers can share one database; each job
+is leased to one of them at a time.
+
+Usage:
+  python worker.py
+  python worker.py --pool process --concurrency 4
+  python worker.py --once
+"""
+
+import argparse
+import signal
+
+from app import create_app
+from app.jobs import Worker
+from config import Config
+
+def main():
+    parser = argparse.ArgumentParser(description='Run queued background jobs')
+    parser.add_argument('--pool', choices=('thread', 'process'), default=Config.WORKER_POOL,
+                        help='Run jobs on threads (I/O-bound work) or processes (CPU-bound work)')
+    parser.add_argument('--concurrency', type=int, default=Config.WORKER_CONCURRENCY,
+                        help='Jobs run at once')
+    parser.add_argument('--poll-interval', type=float, default=Config.WORKER_POLL_INTERVAL,
+                        help='Seconds between queue polls when idle')
+    parser.add_argument('--once', action='store_true',
+                        help='Exit once no job is due or running')
+    args = parser.parse_args()
+
+    app = create_app(Config)
+    worker = Worker(app, pool=args.pool, concurrency=args.concurrency,
+                    poll_interval=args.poll_interval, config_class=Config)
+
+    # Finish running jobs on shutdown; anything killed mid-job is re-leased
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+
+    print("=" * 60)
+    print("MafadzaTechSolutions - Job Worker")
+    print("=" * 60)
+    print(f"{worker.worker_id}: {args.concurrency} {args.pool} slot(s)")
+
+    processed = worker.run(once=args.once)
+    print(f"✓ Stopped after {processed} job(s)")
+
+if __name__ == '__main__':
+    main()